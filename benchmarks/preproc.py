@@ -0,0 +1,69 @@
+"""
+Benchmark pivoting bucketed totals in yatta.plotting._preproc_data.
+
+Usage: python benchmarks/preproc.py
+"""
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from yatta.periods import report_range
+from yatta.plotting import _preproc_data
+
+SIZES = [(100, 10_000), (1_000, 100_000), (10_000, 1_000_000)]
+START_DATE = datetime(2020, 6, 1)
+
+
+def synthetic_totals(n_tasks, n_records, bucket, seed=0):
+    """
+    Build bucketed totals of random records spread over one month.
+
+    Args:
+        n_tasks (int): Number of distinct tasks.
+        n_records (int): Number of records.
+        bucket (str): "weekday" or "week".
+        seed (int): Random seed.
+
+    Returns:
+        (pd.DataFrame): Dataframe shaped like yatta.db.get_period_totals() output.
+    """
+    rng = np.random.default_rng(seed)
+    task_ids = rng.integers(0, n_tasks, n_records)
+    offsets = rng.integers(0, 30 * 24 * 3600, n_records)
+    records = pd.DataFrame(
+        {
+            "start": pd.Timestamp(START_DATE) + pd.to_timedelta(offsets, unit="s"),
+            "task_id": task_ids,
+            "task_name": np.char.add("task", task_ids.astype(str)),
+            "duration": rng.integers(60, 4 * 3600, n_records),
+        }
+    )
+    day = records["start"].dt.normalize()
+    if bucket == "weekday":
+        key = day.dt.weekday
+    else:
+        key = day - pd.to_timedelta(day.dt.weekday, unit="D")
+    return (
+        records.assign(start=day, bucket=key)
+        .groupby(["bucket", "task_id", "task_name"], as_index=False)
+        .agg(start=("start", "min"), duration=("duration", "sum"))
+    )
+
+
+def main():
+    print(f"{'tasks':>8} {'records':>10} {'week (s)':>10} {'month (s)':>10}")
+    for n_tasks, n_records in SIZES:
+        timings = []
+        for period in ("week", "month"):
+            start, end, bucket = report_range(period, START_DATE)
+            data = synthetic_totals(n_tasks, n_records, bucket)
+            t0 = time.perf_counter()
+            _preproc_data(data, bucket, start, end)
+            timings.append(time.perf_counter() - t0)
+        print(f"{n_tasks:>8} {n_records:>10} {timings[0]:>10.3f} {timings[1]:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
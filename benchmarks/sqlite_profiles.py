@@ -0,0 +1,129 @@
+"""
+Benchmark commit latency and concurrent read throughput of SQLite settings.
+
+Each profile is a set of the PRAGMAs configurable in the [database] table. The
+writer commits one record per transaction, like `yatta stop`, while reader
+processes poll today's totals, like a status bar.
+
+Usage: python benchmarks/sqlite_profiles.py [n_commits] [n_readers]
+"""
+import multiprocessing as mp
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from yatta import db as db
+from yatta.config import Config
+
+PROFILES = {
+    "rollback journal, full sync": {"journal_mode": "delete", "synchronous": "full"},
+    "wal, full sync": {"journal_mode": "wal", "synchronous": "full"},
+    "wal, normal sync (default)": dict(Config.default_dict["database"]),
+}
+STATUS_QUERY = "SELECT SUM(seconds) FROM daily_totals WHERE day = date('now')"
+
+
+def connect(path, settings):
+    connection = sqlite3.connect(path, timeout=30)
+    cursor = connection.cursor()
+    db.apply_pragmas(cursor, settings)
+    cursor.close()
+    return connection
+
+
+def create_database(path, n_records=10_000):
+    """
+    Create a database with the yatta schema and some history.
+    """
+    from sqlalchemy import create_engine
+
+    engine = create_engine(f"sqlite:///{path}")
+    db.Base.metadata.create_all(engine)
+    db.migrate(engine)
+    engine.dispose()
+    start = datetime.now() - timedelta(days=365)
+    connection = sqlite3.connect(path)
+    connection.executemany(
+        "INSERT INTO tasks (id, name, total) VALUES (?, ?, 0)",
+        [(i, f"task{i}") for i in range(1, 21)],
+    )
+    connection.executemany(
+        'INSERT INTO records (task_id, start, "end", duration) '
+        + "VALUES (?, ?, ?, 1200)",
+        (
+            (
+                i % 20 + 1,
+                _timestamp(start + timedelta(minutes=30 * i)),
+                _timestamp(start + timedelta(minutes=30 * i + 20)),
+            )
+            for i in range(n_records)
+        ),
+    )
+    connection.commit()
+    connection.close()
+
+
+def _timestamp(dt):
+    return dt.strftime(db.utils.DATETIME_FORMAT)
+
+
+def reader(path, settings, stop, counts, index):
+    connection = connect(path, settings)
+    reads = 0
+    while not stop.is_set():
+        connection.execute(STATUS_QUERY).fetchone()
+        reads += 1
+    counts[index] = reads
+    connection.close()
+
+
+def run_profile(path, settings, n_commits, n_readers):
+    connection = connect(path, settings)
+    stop = mp.Event()
+    counts = mp.Array("l", n_readers)
+    readers = [
+        mp.Process(target=reader, args=(path, settings, stop, counts, i))
+        for i in range(n_readers)
+    ]
+    for process in readers:
+        process.start()
+    latencies = []
+    t0 = time.perf_counter()
+    for i in range(n_commits):
+        start = datetime.now() + timedelta(seconds=i)
+        t = time.perf_counter()
+        connection.execute(
+            'INSERT INTO records (task_id, start, "end", duration) '
+            + "VALUES (1, ?, ?, 1)",
+            (_timestamp(start), _timestamp(start + timedelta(seconds=1))),
+        )
+        connection.commit()
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    for process in readers:
+        process.join()
+    connection.close()
+    return latencies, sum(counts) / elapsed
+
+
+def main(n_commits=200, n_readers=4):
+    print(f"{n_commits} commits with {n_readers} concurrent readers")
+    print(f"{'profile':<30}{'commit p50':>12}{'commit p95':>12}{'reads/s':>12}")
+    for name, settings in PROFILES.items():
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "yatta.db")
+            create_database(path)
+            latencies, reads = run_profile(path, settings, n_commits, n_readers)
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1e3
+        p95 = latencies[int(0.95 * len(latencies))] * 1e3
+        print(f"{name:<30}{p50:>10.2f}ms{p95:>10.2f}ms{reads:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
@@ -0,0 +1,172 @@
+"""
+Benchmark the yatta CLI against synthetic databases of increasing size.
+
+Every command runs in a fresh process, with the yatta app dirs pointed at a
+temporary directory holding the synthetic database, so timings include
+interpreter and import overhead like a real invocation. Results are written as
+JSON so runs of different versions can be compared.
+
+Usage: python benchmarks/suite.py [--sizes 10000,100000] [--output results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+YATTA = [sys.executable, "-c", "from yatta.console import main; main()"]
+# name and argument lists of the commands timed for every database size
+COMMANDS = [
+    ("cold start", ["--version"]),
+    ("list records", ["list", "records"]),
+    ("list tasks", ["list", "tasks"]),
+    ("timesheet -w", ["timesheet", "-w"]),
+    ("plot -d", ["plot", "-d"]),
+    ("plot -w", ["plot", "-w"]),
+    ("plot -m", ["plot", "-m"]),
+]
+
+
+def synthetic_csv(n_records, n_tasks, years, seed=0):
+    """
+    Generate CSV lines for `yatta import`, spread evenly over the past years.
+
+    Args:
+        n_records (int): Number of records.
+        n_tasks (int): Number of distinct tasks.
+        years (int): Number of years of history, ending now.
+        seed (int): Random seed.
+
+    Yields:
+        (str): Header, then one line per record.
+    """
+    rng = random.Random(seed)
+    end = datetime.now().replace(microsecond=0)
+    step = timedelta(days=365 * years) / n_records
+    start = end - step * n_records
+    yield "task,start,end,duration\n"
+    for i in range(n_records):
+        begin = start + step * i
+        duration = rng.randint(1, max(1, int(step.total_seconds() * 0.9)))
+        finish = begin + timedelta(seconds=duration)
+        yield (
+            f"task{rng.randrange(n_tasks)},{begin.strftime(DATETIME_FORMAT)},"
+            + f"{finish.strftime(DATETIME_FORMAT)},{duration}\n"
+        )
+
+
+def yatta(env, *args, **kwargs):
+    """
+    Run a yatta command, returning its wall time in seconds.
+    """
+    t0 = time.perf_counter()
+    subprocess.run(
+        YATTA + list(args),
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        **kwargs,
+    )
+    return time.perf_counter() - t0
+
+
+def create_database(env, n_records, n_tasks, years):
+    process = subprocess.Popen(
+        YATTA + ["import", "-"],
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        text=True,
+    )
+    process.stdin.writelines(synthetic_csv(n_records, n_tasks, years))
+    process.stdin.close()
+    if process.wait():
+        raise RuntimeError("Creating the synthetic database failed")
+
+
+def summarize(name, size, timings):
+    return {
+        "command": name,
+        "records": size,
+        "runs": len(timings),
+        "min": min(timings),
+        "median": statistics.median(timings),
+    }
+
+
+def bench_size(size, n_tasks, years, repeat):
+    results = []
+    with tempfile.TemporaryDirectory(prefix="yatta-bench-") as tmp_dir:
+        env = dict(os.environ)
+        for var in ("XDG_DATA_HOME", "XDG_CONFIG_HOME", "XDG_CACHE_HOME"):
+            env[var] = os.path.join(tmp_dir, var.lower())
+            os.makedirs(env[var])
+        env["COLUMNS"] = "120"
+        t0 = time.perf_counter()
+        create_database(env, size, n_tasks, years)
+        results.append(summarize("import", size, [time.perf_counter() - t0]))
+        for name, args in COMMANDS:
+            timings = [yatta(env, *args) for _ in range(repeat)]
+            results.append(summarize(name, size, timings))
+        starts, stops = [], []
+        for _ in range(repeat):
+            starts.append(yatta(env, "start", "-b", "task0"))
+            stops.append(yatta(env, "stop"))
+        results.append(summarize("start -b", size, starts))
+        results.append(summarize("stop", size, stops))
+    return results
+
+
+def _version():
+    try:
+        from importlib.metadata import version
+    except ImportError:  # python < 3.8
+        from importlib_metadata import version
+    return version("yatta")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'records':>10} {'command':<14} {'min (s)':>9} {'median (s)':>11}")
+    for size in map(int, args.sizes.split(",")):
+        for result in bench_size(size, args.tasks, args.years, args.repeat):
+            print(
+                f"{size:>10} {result['command']:<14} {result['min']:>9.3f} "
+                + f"{result['median']:>11.3f}"
+            )
+            results.append(result)
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "yatta": _version(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "tasks": args.tasks,
+                "years": args.years,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
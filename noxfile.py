@@ -2,7 +2,7 @@ import nox
 
 nox.options.sessions = "isort", "black", "lint", "tests", "coverage"
 
-locations = "src", "tests", "noxfile.py"
+locations = "src", "tests", "benchmarks", "noxfile.py"
 
 
 @nox.session(python=["3.8", "3.7", "3.6"])
@@ -12,6 +12,13 @@ def tests(session):
     session.run("pytest", external=True, *args)
 
 
+@nox.session(python="3.8")
+def benchmark(session):
+    """Time CLI commands against synthetic databases."""
+    session.run("poetry", "install", external=True)
+    session.run("python", "benchmarks/suite.py", *session.posargs)
+
+
 @nox.session(python="3.8")
 def lint(session):
     args = session.posargs or locations
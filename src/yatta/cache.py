@@ -0,0 +1,189 @@
+"""
+Persistent cache of rendered reports.
+
+Timesheets and plots of past periods only change when records are edited, so
+their output is kept in a small SQLite database in the cache dir, keyed by the
+command, its arguments and a hash of the config. Entries are valid while the
+data versions of the tasks and records tables are unchanged; triggers bump
+these on every write, whichever process makes it. The least recently used
+entries are evicted once the cache grows beyond the [cache] max_size setting
+(in bytes, 0 disables the cache).
+
+A hit only reads the data versions through sqlite3, so the report is printed
+without importing pandas or SQLAlchemy.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from yatta.config import get_config
+from yatta.utils import get_app_dirs
+
+DATA_DIR, CONFIG_DIR, CACHE_DIR = get_app_dirs()
+DB_PATH = os.path.join(DATA_DIR, "yatta.db")
+CACHE_PATH = os.path.join(CACHE_DIR, "reports.db")
+# seconds to wait for another process writing to the cache
+TIMEOUT = 1
+
+logger = logging.getLogger(__name__)
+
+CACHE_SCHEMA = [
+    "CREATE TABLE reports (key TEXT PRIMARY KEY, data_version TEXT NOT NULL, "
+    + "output TEXT NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)",
+    "CREATE TABLE stats (name TEXT PRIMARY KEY, count INTEGER NOT NULL)",
+    "INSERT INTO stats (name, count) VALUES ('hits', 0), ('misses', 0)",
+    "PRAGMA user_version = 1",
+]
+
+
+def _connect():
+    connection = sqlite3.connect(CACHE_PATH, timeout=TIMEOUT)
+    # losing the cache in a crash only costs a re-render
+    connection.execute("PRAGMA synchronous = off")
+    if not connection.execute("PRAGMA user_version").fetchone()[0]:
+        with connection:
+            for statement in CACHE_SCHEMA:
+                connection.execute(statement)
+    return connection
+
+
+def data_version():
+    """
+    Versions of the tasks and records, or None if the database isn't set up.
+    """
+    if not os.path.exists(DB_PATH):
+        return None
+    connection = sqlite3.connect(DB_PATH, timeout=TIMEOUT)
+    try:
+        rows = connection.execute(
+            "SELECT name, version FROM data_version ORDER BY name"
+        ).fetchall()
+    except sqlite3.OperationalError:  # database from before data versions
+        return None
+    finally:
+        connection.close()
+    return ",".join(f"{name}={version}" for name, version in rows)
+
+
+def _cache_key(command, key):
+    config = get_config()
+    settings = {
+        table: {name: config.get_user_value(table, name) for name in values}
+        for table, values in config.default_dict.items()
+    }
+    # report labels leave out the current year
+    key = [command, list(key), settings, datetime.now().year]
+    return hashlib.sha1(json.dumps(key, default=str).encode()).hexdigest()
+
+
+def cached_output(command, key, render):
+    """
+    The output of a report, from the cache while the data it shows is unchanged.
+
+    Args:
+        command (str): Name of the report command.
+        key (tuple): Values the output depends on besides the data and the
+                     config, e.g. the report's dates, converted with str().
+        render (callable): Renders the output on a cache miss.
+
+    Returns:
+        (str): The output.
+    """
+    max_size = get_config().get_user_value("cache", "max_size")
+    version = data_version() if max_size > 0 else None
+    if version is None:
+        return render()
+    key = _cache_key(command, key)
+    connection = None
+    try:
+        connection = _connect()
+        with connection:
+            output = _lookup(connection, key, version)
+    except sqlite3.Error as e:
+        logger.warning(f"Report cache unavailable: {e}")
+        if connection is not None:
+            connection.close()
+        return render()
+    try:
+        if output is None:
+            output = render()
+            with connection:
+                _store(connection, key, version, output, max_size)
+    except sqlite3.Error as e:
+        logger.warning(f"Failed to cache report: {e}")
+    finally:
+        connection.close()
+    return output
+
+
+def _lookup(connection, key, version):
+    row = connection.execute(
+        "SELECT output FROM reports WHERE key = ? AND data_version = ?",
+        (key, version),
+    ).fetchone()
+    if row:
+        connection.execute(
+            "UPDATE reports SET used = ? WHERE key = ?", (time.time(), key)
+        )
+    connection.execute(
+        "UPDATE stats SET count = count + 1 WHERE name = ?",
+        ("hits" if row else "misses",),
+    )
+    return row[0] if row else None
+
+
+def _store(connection, key, version, output, max_size):
+    # any write to the data invalidates every entry
+    connection.execute("DELETE FROM reports WHERE data_version != ?", (version,))
+    size = len(output.encode())
+    connection.execute(
+        "INSERT OR REPLACE INTO reports (key, data_version, output, size, used) "
+        + "VALUES (?, ?, ?, ?, ?)",
+        (key, version, output, size, time.time()),
+    )
+    # evict the least recently used entries beyond max_size
+    total, evicted = 0, []
+    for entry, entry_size in connection.execute(
+        "SELECT key, size FROM reports ORDER BY used DESC"
+    ):
+        total += entry_size
+        if total > max_size:
+            evicted.append((entry,))
+    connection.executemany("DELETE FROM reports WHERE key = ?", evicted)
+
+
+def stats():
+    """
+    Usage of the cache.
+
+    Returns:
+        (dict): Number of "entries", their total "size" in bytes, and the
+                number of "hits" and "misses" since the cache was cleared.
+    """
+    connection = _connect()
+    try:
+        entries, size = connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM reports"
+        ).fetchone()
+        counts = dict(connection.execute("SELECT name, count FROM stats"))
+    finally:
+        connection.close()
+    return dict(entries=entries, size=size, **counts)
+
+
+def clear():
+    """
+    Remove all cached reports and reset the hit and miss counts.
+    """
+    connection = _connect()
+    try:
+        with connection:
+            connection.execute("DELETE FROM reports")
+            connection.execute("UPDATE stats SET count = 0")
+        connection.execute("VACUUM")
+    finally:
+        connection.close()
@@ -0,0 +1,88 @@
+"""
+Entry point of the yatta CLI, forwarding commands to `yatta server` if it runs.
+
+Read-only commands are sent to the server with the working directory, umask,
+terminal width and YATTA_* environment, and their output is streamed back,
+sparing the interpreter the imports and database setup of a fresh process.
+Anything else, or everything while no server runs, falls back to yatta.console
+in process.
+
+Only the standard library and appdirs are imported until falling back.
+"""
+import json
+import os
+import socket
+import struct
+import sys
+
+from appdirs import user_cache_dir
+
+SOCKET_FILE = os.path.join(user_cache_dir("yatta"), "server.sock")
+# commands that neither prompt, open an editor nor start processes
+SERVED_COMMANDS = ("list", "timesheet", "plot", "status", "export")
+# frames sent back by the server: a kind (b"o" stdout, b"e" stderr or b"x" exit
+# status) and the length of the payload that follows
+FRAME_HEADER = struct.Struct(">cI")
+ENV_PREFIX = "YATTA_"
+
+
+def _request(argv):
+    from shutil import get_terminal_size
+
+    umask = os.umask(0)  # only readable by setting it
+    os.umask(umask)
+    return {
+        "argv": argv,
+        "cwd": os.getcwd(),
+        "columns": get_terminal_size().columns,
+        "isatty": sys.stdout.isatty(),
+        "umask": umask,
+        "env": {k: v for k, v in os.environ.items() if k.startswith(ENV_PREFIX)},
+    }
+
+
+def forward(argv, sockfile=SOCKET_FILE):
+    """
+    Run a command on the command server, copying its output to stdout/stderr.
+
+    Args:
+        argv (list): Command line arguments, without the program name.
+        sockfile (str): Path of the server's socket.
+
+    Returns:
+        status (int): Exit status of the command, or None if it wasn't run
+                      because it can't be served or no server is running.
+    """
+    if not argv or argv[0] not in SERVED_COMMANDS or not os.path.exists(sockfile):
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(sockfile)
+    except OSError:  # left behind by a server that was killed
+        client.close()
+        return None
+    outputs = {b"o": sys.stdout.buffer, b"e": sys.stderr.buffer}
+    with client:
+        client.sendall(json.dumps(_request(argv)).encode() + b"\n")
+        stream = client.makefile("rb")
+        while True:
+            header = stream.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                # output may already be written, so don't run the command again
+                sys.stderr.write("yatta server hung up before the command ended\n")
+                return 1
+            kind, size = FRAME_HEADER.unpack(header)
+            payload = stream.read(size)
+            if kind == b"x":
+                return int(payload)
+            outputs[kind].write(payload)
+            outputs[kind].flush()
+
+
+def main():
+    status = forward(sys.argv[1:])
+    if status is None:
+        from yatta.console import main
+
+        main()
+    sys.exit(status)
@@ -0,0 +1,38 @@
+import click
+
+
+@click.group()
+def cache():
+    """
+    Manage the cache of rendered timesheets and plots.
+    """
+
+
+@cache.command()
+def clear():
+    """
+    Remove all cached reports.
+    """
+    from yatta import cache as report_cache
+
+    report_cache.clear()
+    print("Cleared the report cache!")
+
+
+@cache.command()
+def stats():
+    """
+    Show the size and hit rate of the report cache.
+    """
+    from yatta import cache as report_cache
+    from yatta.config import get_config
+
+    usage = report_cache.stats()
+    max_size = get_config().get_user_value("cache", "max_size")
+    lookups = usage["hits"] + usage["misses"]
+    hit_rate = usage["hits"] / lookups if lookups else 0
+    print(
+        f"Cached reports: {usage['entries']} "
+        + f"({usage['size'] / 1024:.1f} of {max_size / 1024:.0f} KiB)"
+    )
+    print(f"Hits: {usage['hits']}, misses: {usage['misses']} ({hit_rate:.1%} hit rate)")
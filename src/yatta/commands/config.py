@@ -5,7 +5,7 @@ import colorama as co
 from tomlkit import dumps
 
 from yatta.completion_helpers import get_figlet_fonts, get_table_formats
-from yatta.config import Config
+from yatta.config import get_config
 from yatta.utils import get_app_dirs
 
 DATA_DIR, CONFIG_DIR, CACHE_DIR = get_app_dirs()
@@ -68,7 +68,7 @@ def font(font):
     """
     Select figlet font for displaying stopwatch.
     """
-    Config().set_user_value("formatting", "figlet_font", font)
+    get_config().set_user_value("formatting", "figlet_font", font)
 
 
 @config.command()
@@ -77,7 +77,7 @@ def table_style(style):
     """
     Select tabulate table style.
     """
-    Config().set_user_value("formatting", "table_style", style)
+    get_config().set_user_value("formatting", "table_style", style)
 
 
 @config.command()
@@ -86,7 +86,7 @@ def plot_columns(columns):
     """
     Set maximum number of columns for plots.
     """
-    Config().set_user_value("plotting", "columns", columns)
+    get_config().set_user_value("plotting", "columns", columns)
 
 
 @config.command()
@@ -95,7 +95,16 @@ def background(run_in_background):
     """
     Always run yatta in the background.
     """
-    Config().set_user_value("general", "run_in_background", run_in_background)
+    get_config().set_user_value("general", "run_in_background", run_in_background)
+
+
+@config.command()
+@click.argument("seconds", type=click.INT)
+def heartbeat(seconds):
+    """
+    Mark tracked tasks as alive every SECONDS (0 to disable) for crash recovery.
+    """
+    get_config().set_user_value("general", "heartbeat_interval", seconds)
 
 
 @config.command()
@@ -104,7 +113,7 @@ def show_legend(show):
     """
     Always display a legend with applicable plots.
     """
-    Config().set_user_value("plotting", "show_legend", show_legend)
+    get_config().set_user_value("plotting", "show_legend", show)
 
 
 @config.command()
@@ -115,9 +124,9 @@ def list(defaults):
     """
     co.init(autoreset=True)
     if defaults:
-        print(f"\n{co.Fore.BLUE}{dumps(Config().default)}")
+        print(f"\n{co.Fore.BLUE}{dumps(get_config().default)}")
     else:
-        print(f"\n{co.Fore.GREEN}{Config()}")
+        print(f"\n{co.Fore.GREEN}{get_config()}")
 
 
 @config.command()
@@ -128,4 +137,4 @@ def restore_defaults():
     """
     Restore settings to default values.
     """
-    Config().restore_defaults()
+    get_config().restore_defaults()
@@ -0,0 +1,77 @@
+import click
+
+
+@click.group(name="db")
+def database():
+    """
+    Maintain the yatta database.
+    """
+
+
+@database.command()
+def rebuild_rollups():
+    """
+    Regenerate the daily totals used for reports.
+    """
+    from yatta import db as db
+
+    db.rebuild_rollups()
+    print("Rebuilt daily totals!")
+
+
+@database.command()
+def reconcile():
+    """
+    Check task totals against their records and fix any drift.
+    """
+    from yatta import db as db
+    from yatta.utils import time_print
+
+    drifted = db.reconcile_totals()
+    for name, stored, actual in drifted:
+        print(f"Fixed {name}: {time_print(stored or 0)} -> {time_print(actual)}")
+    print(f"Reconciled task totals, {len(drifted)} fixed!")
+
+
+@database.command()
+@click.argument("before", required=False)
+@click.option("--vacuum", is_flag=True, help="Shrink the database file afterwards.")
+def archive(before, vacuum):
+    """
+    Move records started BEFORE a date into per-year archive databases.
+
+    Defaults to the start of the current year. Archived records still count in
+    reports and task totals, and are listed by `list records --all/--after`.
+    """
+    from datetime import datetime
+
+    import parsedatetime as pdt
+    from tabulate import tabulate
+
+    from yatta import db as db
+    from yatta.config import get_config
+
+    if before:
+        before = datetime(*pdt.Calendar().parse(before)[0][:6])
+    else:
+        before = datetime(datetime.now().year, 1, 1)
+    try:
+        moved = db.archive_records(before)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    for year, count in moved.items():
+        print(f"Archived {count} records from {year}")
+    if vacuum:
+        db.vacuum()
+    archives = [
+        (a.year, a.path, a.first_start, a.last_start, a.records)
+        for a in db.get_archives()
+    ]
+    print(
+        "\n"
+        + tabulate(
+            archives,
+            headers=["year", "path", "first start", "last start", "records"],
+            tablefmt=get_config().get_user_value("formatting", "table_style"),
+        )
+    )
@@ -2,7 +2,6 @@ import logging
 
 import click
 
-from yatta import db as db
 from yatta.completion_helpers import get_matching_tasks
 
 logger = logging.getLogger(__name__)
@@ -22,38 +21,89 @@ def delete():
 @click.confirmation_option(prompt="Are you sure you want to delete specified task(s)?")
 def tasks(task_name_or_id):
     """
-    Delete a task and all its associated records.
+    Delete tasks and all their associated records.
     """
+    from yatta import db as db
+
+    _tasks = []
     for name_id in task_name_or_id:
-        query = db.get_tasks(name_id)
-        _task = query.first()
+        _task = db.get_tasks(name_id).first()
         if not _task:
             print(f"Task '{name_id}' does not exist.")
             return
-        try:
-            # delete task from tasks table; cascade delete associated records
-            db.delete_task(_task)
-            print(f"Deleted task {name_id}!")
-        except Exception as e:
-            db.session.rollback()
-            logger.error(e)
+        _tasks.append(_task)
+    try:
+        # records are removed with their task by ON DELETE CASCADE
+        db.delete_tasks(_tasks)
+        print(f"Deleted task(s) {', '.join(task_name_or_id)}!")
+    except Exception as e:
+        db.session.rollback()
+        logger.error(e)
+
+
+def _parse_duration(value):
+    """
+    Parse a duration like '90', '90s', '15m' or '2h' into seconds.
+    """
+    units = {"s": 1, "m": 60, "h": 3600}
+    try:
+        if value[-1:].lower() in units:
+            return int(float(value[:-1]) * units[value[-1].lower()])
+        return int(value)
+    except ValueError:
+        raise click.BadParameter(f"'{value}' is not a duration like 90s, 15m or 2h.")
+
+
+def _parse_date(value):
+    """
+    Parse a date like '2020-06-01' or 'last month' into a datetime.
+    """
+    from datetime import datetime
+
+    import parsedatetime as pdt
+
+    # parsedatetime returns the current time, with a status of 0, for input
+    # it doesn't understand
+    parsed, status = pdt.Calendar().parse(value)
+    if not status:
+        raise click.BadParameter(
+            f"'{value}' is not a date like 2020-06-01 or 1 week ago."
+        )
+    return datetime(*parsed[:6])
 
 
 @delete.command()
-@click.argument("record_id", nargs=-1)
+@click.argument("record_id", nargs=-1, type=click.INT)
+@click.option("-t", "--task", help="Only delete records of this task.")
+@click.option("--before", help="Only delete records started before this date.")
+@click.option(
+    "--shorter-than", help="Only delete records shorter than this, e.g. 90s, 15m, 2h."
+)
 @click.confirmation_option(prompt="Are you sure you want to delete specifed record(s)?")
-def records(record_id):
-    """
-    Delete a single record by its ID.
-    """
-    for _id in record_id:
-        query = db.get_records(record_id=_id)
-        _record = query.first()
-        if not _record:
-            print(f"Record id '{_id}' does not exist.")
-        try:
-            db.delete_record(_record)
-            print(f"Deleted record {_id}!")
-        except Exception as e:
-            db.session.rollback()
-            logger.error(e)
+def records(record_id, task, before, shorter_than):
+    """
+    Delete records by ID and/or all records matching the given filters.
+    """
+    from yatta import db as db
+
+    if not (record_id or task or before or shorter_than):
+        raise click.UsageError("Give record IDs or at least one filter.")
+    if task:
+        _task = db.get_tasks(task).first()
+        if not _task:
+            print(f"Task '{task}' does not exist.")
+            return
+    else:
+        _task = None
+    if before:
+        before = _parse_date(before)
+    if shorter_than:
+        shorter_than = _parse_duration(shorter_than)
+    try:
+        count = db.delete_records(
+            record_ids=record_id, task=_task, before=before, shorter_than=shorter_than
+        )
+        print(f"Deleted {count} record(s)!")
+    except Exception as e:
+        db.session.rollback()
+        logger.error(e)
@@ -2,10 +2,7 @@ import logging
 from datetime import datetime
 
 import click
-import parsedatetime as pdt
-from sqlalchemy.exc import IntegrityError
 
-from yatta import db as db
 from yatta.completion_helpers import get_matching_tasks
 
 logger = logging.getLogger(__name__)
@@ -28,6 +25,10 @@ def tasks(task_name_or_id, name=None, tags=None, description=None):
     """
     Edit task attributes.
     """
+    from sqlalchemy.exc import IntegrityError
+
+    from yatta import db as db
+
     integrity_error_msg = (
         "Edits were not saved! It's possible you tried "
         + "to change the task name to that of an existing "
@@ -87,9 +88,17 @@ def records(record_id, start_time=None, end_time=None):
     """
     Edit record details.
     """
+    import parsedatetime as pdt
+
+    from yatta import db as db
+
     if record_id == "0":
-        query = db.get_records()
-        record_id = query.all()[-1].id
+        # edit the most recent record
+        last_record = db.get_records(newest_first=True).first()
+        if not last_record:
+            print("There are no records yet.")
+            return
+        record_id = last_record.id
     query = db.get_records(record_id=record_id)
     _record = query.first()
     if not _record:
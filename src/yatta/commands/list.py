@@ -1,10 +1,8 @@
 import click
-from tabulate import tabulate
 
-from yatta import db as db
 from yatta import utils as utils
 from yatta.completion_helpers import get_matching_tasks
-from yatta.config import Config
+from yatta.config import get_config
 
 
 @click.group()
@@ -23,17 +21,23 @@ def tasks(task_name=None):
     """
     List all tasks or show info for a particular task.
     """
-    query = db.get_tasks(task_name)
+    from tabulate import tabulate
+
+    from yatta import db as db
+    from yatta.profiling import phase
+
+    query = db.get_task_totals(task_name)
     _tasks = db.query_to_df(query)
-    _tasks["total"] = _tasks["total"].apply(utils.time_print)
-    print(
-        "\n"
-        + tabulate(
-            _tasks,
-            headers=_tasks.columns,
-            tablefmt=Config().get_user_value("formatting", "table_style"),
+    with phase("render"):
+        _tasks["total"] = _tasks["total"].apply(utils.time_print)
+        print(
+            "\n"
+            + tabulate(
+                _tasks,
+                headers=_tasks.columns,
+                tablefmt=get_config().get_user_value("formatting", "table_style"),
+            )
         )
-    )
 
 
 @list.command()
@@ -52,20 +56,52 @@ def tasks(task_name=None):
     help="Number of recent records to return. (Default: 10)",
 )
 @click.option("-a", "--all", is_flag=True, help="List all records.")
-def records(all, max_entries, record_id=None, task=None):
+@click.option(
+    "-b", "--before-id", type=click.INT, help="Only list records older than this ID."
+)
+@click.option("--after", help="Only list records started after this date.")
+def records(all, max_entries, before_id, after, record_id=None, task=None):
     """
     List recent records from all tasks or a particular task.
     """
-    query = db.get_records(record_id=record_id, task_name_or_id=task)
-    _records = db.query_to_df(query)
+    from datetime import datetime
+
+    import parsedatetime as pdt
+    from tabulate import tabulate
+
+    from yatta import db as db
+    from yatta.profiling import phase
+
+    if after:
+        after = datetime(*pdt.Calendar().parse(after)[0][:6])
+    try:
+        query = db.get_records(
+            record_id=record_id,
+            task_name_or_id=task,
+            before_id=before_id,
+            after=after,
+            newest_first=not all,
+            limit=None if all else max_entries,
+            # reach into the archives for full listings and date ranges
+            archived=bool(all or after),
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    # task_name is looked up from the tasks and comes first in the query
+    columns = ["task_id", "task_name", "start", "end", "duration"]
+    _records = db.query_to_df(query)[columns]
     if not all:
-        _records = _records.tail(max_entries)
-    _records["duration"] = _records["duration"].apply(utils.time_print)
-    print(
-        "\n"
-        + tabulate(
-            _records,
-            headers=_records.columns,
-            tablefmt=Config().get_user_value("formatting", "table_style"),
+        # fetched newest first, show them oldest first
+        _records = _records.iloc[::-1]
+    with phase("render"):
+        _records["duration"] = _records["duration"].apply(utils.time_print)
+        print(
+            "\n"
+            + tabulate(
+                _records,
+                headers=_records.columns,
+                tablefmt=get_config().get_user_value("formatting", "table_style"),
+            )
         )
-    )
+    if not all and len(_records) == max_entries:
+        print(f"\nOlder records: yatta list records --before-id {_records.index[0]}")
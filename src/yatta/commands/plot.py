@@ -1,18 +1,13 @@
 import logging
-from calendar import monthrange
+import sys
 from datetime import datetime
 
 import click
-import parsedatetime as pdt
 
-from yatta import db as db
-from yatta import plotting as plt
-from yatta.config import Config
+from yatta.config import get_config
 
 logger = logging.getLogger(__name__)
 
-cal = pdt.Calendar()
-
 
 @click.command()
 @click.option("-d", "--day", "period", help="Plot today's timesheet.", flag_value="day")
@@ -27,57 +22,65 @@ cal = pdt.Calendar()
 @click.option(
     "-m", "--month", "period", help="Plot this month's timesheet.", flag_value="month"
 )
+@click.option(
+    "-q",
+    "--quarter",
+    "period",
+    help="Plot this quarter's timesheet.",
+    flag_value="quarter",
+)
+@click.option(
+    "-y", "--year", "period", help="Plot this year's timesheet.", flag_value="year"
+)
 @click.option(
     "-s", "--start-date", help="Plot data from this date onward.", default="now"
 )
+@click.option("--from", "from_date", help="Plot a custom range from this date.")
+@click.option("--to", "to_date", help="Last day of a custom range. (Default: today)")
 @click.option(
     "-c",
     "--columns",
     type=click.INT,
     help="Maximum columns on screen for plot to occupy.",
-    default=Config().get_user_value("plotting", "columns"),
+    default=lambda: get_config().get_user_value("plotting", "columns"),
 )
 @click.option("--show-legend", is_flag=True, default=True)
-def plot(period, start_date, columns, show_legend):
+def plot(period, start_date, from_date, to_date, columns, show_legend):
     """
     Visualize summary data.
     """
+    import parsedatetime as pdt
+
+    from yatta import cache as cache
+    from yatta.periods import report_range
+    from yatta.profiling import phase
+
+    cal = pdt.Calendar()
     # check if user wants to always show legend, change show_legend accordingly
-    if not Config().user["plotting"]["show_legend"]:
+    if not get_config().get_user_value("plotting", "show_legend"):
         show_legend = False
-    start_date = datetime(*cal.parse(start_date)[0][:6])
-    day_of_week = start_date.weekday()
-    year, month, day = start_date.timetuple()[:3]
-    if period == "day":
-        start_date = datetime(year, month, day)
-    elif period == "week":
-        # week straddles two months
-        if day_of_week > day:
-            diff = day_of_week - day
-            month = month - 1
-            # week straddles two years
-            if month == 0:
-                month = 12
-                year = year - 1
-            day = monthrange(year, month)[1] - diff
-            start_date = datetime(year, month, day)
-        else:
-            start_date = datetime(year, month, day - day_of_week)
-    elif period == "month":
-        start_date = datetime(year, month, 1)
-    else:
-        logger.error("Invalid plot period!")
+    start_date, end_date, bucket = report_range(
+        period,
+        datetime(*cal.parse(start_date)[0][:6]),
+        from_date and datetime(*cal.parse(from_date)[0][:6]),
+        to_date and datetime(*cal.parse(to_date)[0][:6]),
+    )
+    # colorama strips colors from output that isn't a terminal, do the same
+    color = sys.stdout.isatty()
+
+    def render():
+        from yatta import db as db
+        from yatta import plotting as plt
+
+        totals = db.get_period_totals(start_date, end_date, bucket)
+        with phase("preprocess"):
+            data = plt._preproc_data(totals, bucket, start_date, end_date)
+        with phase("render"):
+            if data.empty:
+                return "No data for this period!\n"
+            elif bucket is None:
+                return plt.hbar_frame(data, columns, color)
+            return plt.hbar_stack_frame(data, columns, show_legend, color)
 
-    query = db.get_records()
-    data = plt._preproc_data(db.query_to_df(query), period, start_date)
-    if not data.empty:
-        if period == "day":
-            plt.hbar(data, columns)
-        elif period == "week":
-            plt.hbar_stack(data, columns, show_legend)
-        elif period == "month":
-            plt.hbar_stack(data, columns, show_legend)
-        else:
-            logger.error("Invalid plot period!")
-    else:
-        print("No data for this period!")
+    key = (start_date, end_date, bucket, columns, show_legend, color)
+    click.echo(cache.cached_output("plot", key, render), nl=False)
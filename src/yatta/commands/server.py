@@ -0,0 +1,37 @@
+import click
+
+
+@click.command()
+@click.option("--stop", is_flag=True, help="Stop the running server.")
+@click.option(
+    "--foreground", is_flag=True, help="Serve from this process until interrupted."
+)
+def server(stop, foreground):
+    """
+    Keep yatta loaded in a background process that answers report commands.
+
+    While it runs, list, timesheet, plot, status and export are forwarded to it
+    and skip the startup of a fresh process. Restart it after upgrading yatta.
+    """
+    from yatta.server import CommandServer
+
+    command_server = CommandServer()
+    if stop:
+        if not command_server.is_running():
+            raise click.ClickException("The yatta server isn't running.")
+        command_server.stop()
+        print("Stopped the yatta server.")
+    elif command_server.is_running():
+        raise click.ClickException("The yatta server is already running.")
+    elif foreground:
+        # found by `yatta server --stop` and the check above, like a daemon
+        command_server.writepid()
+        try:
+            command_server.run()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            command_server.delpid()
+    else:
+        print("Starting the yatta server.")
+        command_server.start()
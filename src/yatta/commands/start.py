@@ -1,23 +1,28 @@
 import logging
-import os
-import time
 from multiprocessing import Process
 
 import click
-from pyfiglet import Figlet
 
-from yatta import db as db
 from yatta.completion_helpers import get_matching_tasks
-from yatta.config import Config
-from yatta.daemon import daemon_start, dummy_stopwatch
-from yatta.utils import get_app_dirs
-
-DATA_DIR, CONFIG_DIR, CACHE_DIR = get_app_dirs()
-PID_FILE = os.path.join(CACHE_DIR, "yatta.pid")
+from yatta.config import get_config
 
 logger = logging.getLogger(__name__)
 
 
+def _get_or_create_task(task_name_or_id, tags, description):
+    from yatta import db as db
+
+    query = db.get_tasks(task_name_or_id)
+    task = query.first()
+    if not task:
+        task = db.Task(name=task_name_or_id, tags=tags, description=description)
+        task.total = 0
+        db.validate_task(task)
+        db.session.add(task)
+        db.session.commit()
+    return task
+
+
 @click.command()
 @click.argument("task", type=click.STRING, autocompletion=get_matching_tasks)
 @click.option("-t", "--tags", default="", help="Add relevant tags to task.")
@@ -28,31 +33,67 @@ logger = logging.getLogger(__name__)
 @click.option("-b", "--background", help="Run yatta in the background.", is_flag=True)
 def start(task, tags, description, font, background, **kwargs):
     """
-    Start tracking a task.
+    Start tracking a task, alongside any tasks already being tracked.
     """
-    # first check if there is already a task being recorded
-    if not os.path.exists(PID_FILE):
-        # create task if it doesn't exist
-        task_name_or_id = task
-        query = db.get_tasks(task_name_or_id)
-        if not query.first():
-            task = db.Task(name=task_name_or_id, tags=tags, description=description)
-            task.total = 0
-            db.validate_task(task)
-            db.session.add(task)
-            db.session.commit()
-        else:
-            task = query.first()
-        font = Figlet(font=Config().get_user_value("formatting", "figlet_font"))
-        if (
-            background
-            or Config().get_user_value("general", "run_in_background") == "true"
-        ):
-            daemon_start(task.name)
-        else:
-            Process(target=daemon_start, args=(task.name,)).start()
-            # stagger processes so pidfile gets created first
-            time.sleep(0.01)
-            Process(target=dummy_stopwatch, args=(task.name, font)).start()
+    from pyfiglet import Figlet
+
+    from yatta import db as db
+    from yatta.daemon import (
+        daemon_request,
+        daemon_start,
+        dummy_stopwatch,
+        orphaned_timers,
+        wait_for_daemon,
+    )
+
+    orphans, state = orphaned_timers()
+    if not state and orphans:
+        print(
+            "Tasks were being tracked when yatta was killed. "
+            + "Run `yatta stop` to save them first."
+        )
+        return
+    # create task if it doesn't exist
+    task_id = _get_or_create_task(task, tags, description).id
+    if state:
+        # track it alongside the running tasks
+        state = daemon_request("start", task=task_id)
+        if "error" in state:
+            print(state["error"])
+            return
     else:
-        print("You are already tracking a task. Try `yatta status` for more details.")
+        # SQLite connections must not be carried across a fork
+        db.session.close()
+        Process(target=daemon_start, args=(task_id,)).start()
+        # make sure the daemon is listening before returning or showing the stopwatch
+        if not wait_for_daemon():
+            logger.error("The stopwatch daemon failed to start.")
+            return
+    if not (background or get_config().get_user_value("general", "run_in_background")):
+        font = Figlet(font=get_config().get_user_value("formatting", "figlet_font"))
+        dummy_stopwatch(task_id, font)
+
+
+@click.command()
+@click.argument("task", type=click.STRING, autocompletion=get_matching_tasks)
+@click.option("-t", "--tags", default="", help="Add relevant tags to task.")
+@click.option("-d", "--description", default="", help="Additional task info.")
+@click.option(
+    "-f",
+    "--from",
+    "from_task",
+    help="Task to stop, if several are being tracked.",
+    type=click.STRING,
+    autocompletion=get_matching_tasks,
+)
+def switch(task, tags, description, from_task):
+    """
+    Stop the active task and start tracking another.
+    """
+    from yatta.daemon import daemon_request, daemon_switch
+
+    if not daemon_request("status"):
+        print("No tasks are being tracked right now.")
+        return
+    task = _get_or_create_task(task, tags, description)
+    daemon_switch(task.id, from_task)
@@ -1,18 +1,12 @@
 import logging
-from calendar import monthrange
 from datetime import datetime
 
 import click
-import parsedatetime as pdt
-from tabulate import tabulate
 
-from yatta import db as db
-from yatta.config import Config
-from yatta.plotting import _preproc_data, _weekday_to_label
+from yatta.config import get_config
 from yatta.utils import time_print
 
 logger = logging.getLogger(__name__)
-cal = pdt.Calendar()
 
 
 @click.command()
@@ -27,66 +21,71 @@ cal = pdt.Calendar()
     flag_value="week",
     default=True,
 )
+@click.option(
+    "-m", "--month", "period", help="Print this month's timesheet.", flag_value="month"
+)
+@click.option(
+    "-q",
+    "--quarter",
+    "period",
+    help="Print this quarter's timesheet.",
+    flag_value="quarter",
+)
+@click.option(
+    "-y", "--year", "period", help="Print this year's timesheet.", flag_value="year"
+)
 @click.option(
     "-s", "--start-date", help="Report data from this date onward.", default="now"
 )
-def timesheet(period, start_date):
+@click.option("--from", "from_date", help="Report a custom range from this date.")
+@click.option("--to", "to_date", help="Last day of a custom range. (Default: today)")
+def timesheet(period, start_date, from_date, to_date):
     """
     View daily and weekly timesheet summary.
     """
-    start_date = datetime(*cal.parse(start_date)[0][:6])
-    day_of_week = start_date.weekday()
-    year, month, day = start_date.timetuple()[:3]
-    if period == "day":
-        start_date = datetime(year, month, day)
-    elif period == "week":
-        # week straddles two months
-        if day_of_week > day:
-            diff = day_of_week - day
-            month = month - 1
-            # week straddles two years
-            if month == 0:
-                month = 12
-                year = year - 1
-            day = monthrange(year, month)[1] - diff
-            start_date = datetime(year, month, day)
-        else:
-            start_date = datetime(year, month, day - day_of_week)
-    elif period == "month":
-        start_date = datetime(year, month, 1)
-    else:
-        logger.error("Invalid timesheet period!")
+    import parsedatetime as pdt
 
-    query = db.get_records()
-    data = _preproc_data(db.query_to_df(query), period, start_date)
-    if not data.empty:
-        if period == "day":
-            data.index = [_weekday_to_label(day_of_week)]
-            data["TOTAL"] = data.sum(axis=1)
-            for col in data:
-                data[col] = data[col].apply(time_print)
-            print(
-                "\n"
-                + tabulate(
-                    data,
-                    headers=data.columns,
-                    tablefmt=Config().get_user_value("formatting", "table_style"),
-                )
-            )
-        elif period == "week":
-            data["TOTAL"] = data.sum(axis=1)
-            data.loc["TOTAL"] = data.sum()
-            for col in data:
-                data[col] = data[col].apply(time_print)
-            print(
+    from yatta import cache as cache
+    from yatta.periods import report_range
+    from yatta.profiling import phase
+
+    cal = pdt.Calendar()
+    start_date, end_date, bucket = report_range(
+        period,
+        datetime(*cal.parse(start_date)[0][:6]),
+        from_date and datetime(*cal.parse(from_date)[0][:6]),
+        to_date and datetime(*cal.parse(to_date)[0][:6]),
+    )
+
+    def render():
+        from tabulate import tabulate
+
+        from yatta import db as db
+        from yatta.plotting import _preproc_data, _weekday_to_label
+
+        totals = db.get_period_totals(start_date, end_date, bucket)
+        with phase("preprocess"):
+            data = _preproc_data(totals, bucket, start_date, end_date)
+            if not data.empty:
+                data["TOTAL"] = data.sum(axis=1)
+                if bucket is None:
+                    data.index = [_weekday_to_label(start_date.weekday())]
+                else:
+                    data.loc["TOTAL"] = data.sum()
+                for col in data:
+                    data[col] = data[col].apply(time_print)
+        with phase("render"):
+            if data.empty:
+                return "No data for this period!\n"
+            return (
                 "\n"
                 + tabulate(
                     data,
                     headers=data.columns,
-                    tablefmt=Config().get_user_value("formatting", "table_style"),
+                    tablefmt=get_config().get_user_value("formatting", "table_style"),
                 )
+                + "\n"
             )
-        else:
-            logger.error("Invalid timesheet period!")
-    else:
-        print("No data for this period!")
+
+    key = (start_date, end_date, bucket)
+    print(cache.cached_output("timesheet", key, render), end="")
@@ -0,0 +1,178 @@
+import csv
+import json
+import time
+from datetime import datetime
+from operator import itemgetter
+
+import click
+
+from yatta import utils as utils
+from yatta.completion_helpers import get_matching_tasks
+
+FORMATS = ("csv", "jsonl")
+FIELDS = ("task", "start", "end", "duration")
+# ISO 8601 datetimes accepted on import, with a space or "T" between date and time
+# (datetime.fromisoformat needs python 3.7)
+ISO_FORMATS = [
+    fmt.replace(" ", sep)
+    for fmt in (utils.DATETIME_FORMAT, "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M")
+    for sep in (" ", "T")
+] + ["%Y-%m-%d"]
+
+
+def _guess_format(filename):
+    return "jsonl" if filename.endswith((".jsonl", ".json")) else "csv"
+
+
+def _canonical(value):
+    """
+    Return a datetime string in the format the database stores.
+
+    Strings already in utils.DATETIME_FORMAT are passed through untouched,
+    anything else is parsed as one of the ISO_FORMATS.
+    """
+    if len(value) == 26 and value[10] == " " and value[19] == ".":
+        return value
+    for fmt in ISO_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime(utils.DATETIME_FORMAT)
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid isoformat string: {value!r}")
+
+
+def _read_rows(stream, fmt):
+    """
+    Read records from a stream.
+
+    Returns:
+        (tuple): The rows, and a function returning the task, start, end and
+                 duration (None if not given) of a row.
+    """
+    if fmt == "jsonl":
+        rows = (json.loads(line) for line in stream if line.strip())
+        return rows, _jsonl_fields
+    # plain rows are much cheaper than csv.DictReader's dicts
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:  # empty file
+        return [], None
+    missing = [field for field in FIELDS[:3] if field not in header]
+    if missing:
+        raise click.ClickException(f"Missing column(s): {', '.join(missing)}")
+    pick = itemgetter(*[header.index(field) for field in FIELDS if field in header])
+    if "duration" in header:
+        return reader, pick
+    return reader, lambda row: pick(row) + (None,)
+
+
+def _jsonl_fields(row):
+    return row["task"], row["start"], row["end"], row.get("duration")
+
+
+def _parse_rows(rows, fields):
+    for line, row in enumerate(rows, 1):
+        try:
+            task, start, end, duration = fields(row)
+            start = _canonical(start)
+            end = _canonical(end)
+            if duration in (None, ""):
+                duration = (
+                    datetime.strptime(end, utils.DATETIME_FORMAT)
+                    - datetime.strptime(start, utils.DATETIME_FORMAT)
+                ).total_seconds()
+            yield task, start, end, int(duration)
+        except (IndexError, KeyError, TypeError, ValueError) as e:
+            raise click.ClickException(f"Invalid record on line {line}: {e!r}")
+
+
+@click.command(name="import")
+@click.argument("file", type=click.File("r"))
+@click.option(
+    "-f",
+    "--format",
+    "fmt",
+    type=click.Choice(FORMATS),
+    default=None,
+    help="Input format, guessed from the file name if not given.",
+)
+@click.option(
+    "--batch-size",
+    type=click.INT,
+    default=50000,
+    show_default=True,
+    help="Records written per transaction.",
+)
+def import_(file, fmt, batch_size):
+    """
+    Import records from a CSV or JSONL FILE ('-' for stdin).
+
+    Each record needs a task, start and end, and optionally a duration in
+    seconds. Records that already exist are skipped.
+    """
+    from yatta import db as db
+
+    fmt = fmt or _guess_format(file.name)
+    t0 = time.perf_counter()
+    imported, skipped = db.import_records(
+        _parse_rows(*_read_rows(file, fmt)), batch_size=batch_size
+    )
+    elapsed = time.perf_counter() - t0
+    total = imported + skipped
+    print(
+        f"Imported {imported} records ({skipped} duplicates skipped) "
+        + f"in {elapsed:.2f}s, {total / max(elapsed, 1e-9):,.0f} rows/s"
+    )
+
+
+def _write_rows(stream, fmt, rows):
+    if fmt == "csv":
+        writer = csv.writer(stream, lineterminator="\n")
+        writer.writerow(FIELDS)
+        writer.writerows(rows)
+    else:
+        dumps = json.dumps
+        for row in rows:
+            stream.write(dumps(dict(zip(FIELDS, row))) + "\n")
+
+
+@click.command()
+@click.option(
+    "-o",
+    "--output",
+    type=click.File("w"),
+    default="-",
+    help="File to write to. (Default: stdout)",
+)
+@click.option(
+    "-f",
+    "--format",
+    "fmt",
+    type=click.Choice(FORMATS),
+    default=None,
+    help="Output format, guessed from the file name if not given.",
+)
+@click.option(
+    "-t",
+    "--task",
+    help="Task name or ID to export records from.",
+    type=click.STRING,
+    autocompletion=get_matching_tasks,
+)
+@click.option("--start", help="Only export records started on or after this date.")
+@click.option("--end", help="Only export records started before this date.")
+def export(output, fmt, task, start, end):
+    """
+    Export records as CSV or JSONL, in the format read by import.
+    """
+    import parsedatetime as pdt
+
+    from yatta import db as db
+
+    calendar = pdt.Calendar()
+    if start:
+        start = datetime(*calendar.parse(start)[0][:6])
+    if end:
+        end = datetime(*calendar.parse(end)[0][:6])
+    fmt = fmt or _guess_format(output.name)
+    _write_rows(output, fmt, db.export_records(task, start, end))
@@ -1,23 +1,116 @@
 """
 Functions to generate custom tab completions for click.
+
+Completions run in a fresh process on every TAB press, so they are served from
+small index files in the cache dir rather than through yatta.db.
 """
-import tabulate
-from pyfiglet import Figlet
+import os
+import sqlite3
+from bisect import bisect_left
+
+from yatta.utils import get_app_dirs
+
+DATA_DIR, CONFIG_DIR, CACHE_DIR = get_app_dirs()
+DB_PATH = os.path.join(DATA_DIR, "yatta.db")
+TASK_INDEX = os.path.join(CACHE_DIR, "task_index")
+FONT_INDEX = os.path.join(CACHE_DIR, "font_index")
+
+
+def _read_index(path):
+    """
+    Read an index file, returning its key and entries, or (None, []).
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            key, *entries = f.read().split("\n")
+    except (FileNotFoundError, ValueError):
+        return None, []
+    return key, entries
+
+
+def _write_index(path, key, entries):
+    # write atomically, so concurrent completions never see a partial index
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        f.write("\n".join([key, *entries]))
+    os.replace(tmp_file, path)
+
+
+def _prefix_matches(entries, prefix):
+    """
+    Entries of a sorted list starting with prefix.
+    """
+    start = end = bisect_left(entries, prefix)
+    while end < len(entries) and entries[end].startswith(prefix):
+        end += 1
+    return entries[start:end]
 
-from yatta import db as db
-from yatta.config import Config
+
+def _tasks_version(connection):
+    query = "SELECT version FROM data_version WHERE name = 'tasks'"
+    try:
+        return connection.execute(query).fetchone()[0]
+    except sqlite3.OperationalError:
+        # database from before data versions; migrate it first
+        from yatta import db as db
+
+        db.setup_db()
+        return connection.execute(query).fetchone()[0]
+
+
+def task_names():
+    """
+    All task names in sorted order, from the index if it is up to date.
+    """
+    if not os.path.exists(DB_PATH):
+        return []
+    connection = sqlite3.connect(DB_PATH)
+    try:
+        key = str(_tasks_version(connection))
+        cached_key, names = _read_index(TASK_INDEX)
+        if cached_key != key:
+            # names are sorted by codepoint, the order bisect relies on
+            names = [
+                name
+                for (name,) in connection.execute(
+                    "SELECT name FROM tasks ORDER BY name COLLATE BINARY"
+                )
+                if name and "\n" not in name
+            ]
+            _write_index(TASK_INDEX, key, names)
+    finally:
+        connection.close()
+    return names
 
 
 def get_matching_tasks(ctx, args, incomplete):
-    task_names = [task.name for task in db.get_tasks().all()]
-    return [task_name for task_name in task_names if incomplete in task_name]
+    return _prefix_matches(task_names(), incomplete)
+
+
+def figlet_fonts():
+    """
+    All figlet font names in sorted order, cached until pyfiglet's fonts change.
+    """
+    from importlib.util import find_spec
+
+    # locate the fonts dir without importing pyfiglet; installing a font or
+    # upgrading pyfiglet changes its mtime
+    package_dir = find_spec("pyfiglet").submodule_search_locations[0]
+    key = str(os.stat(os.path.join(package_dir, "fonts")).st_mtime_ns)
+    cached_key, fonts = _read_index(FONT_INDEX)
+    if cached_key != key:
+        from pyfiglet import FigletFont
+
+        fonts = sorted(FigletFont.getFonts())
+        _write_index(FONT_INDEX, key, fonts)
+    return fonts
 
 
 def get_figlet_fonts(ctx, args, incomplete):
-    f = Figlet(Config().get_user_value("formatting", "figlet_font"))
-    fonts = sorted(f.getFonts())
-    return [font for font in fonts if incomplete in font]
+    return _prefix_matches(figlet_fonts(), incomplete)
 
 
 def get_table_formats(ctx, args, incomplete):
+    import tabulate
+
     return [fmt for fmt in tabulate.tabulate_formats if incomplete in fmt]
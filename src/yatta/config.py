@@ -1,6 +1,7 @@
 import logging
 import os
 
+import click
 from tomlkit import document, dumps, parse, table
 
 from yatta.utils import get_app_dirs
@@ -10,6 +11,32 @@ CONFIG_FILE = os.path.join(CONFIG_DIR, "settings.toml")
 
 logger = logging.getLogger(__name__)
 
+# settings can be overridden with environment variables named like
+# YATTA_PLOTTING_COLUMNS, i.e. YATTA_<TABLE>_<KEY>
+ENV_PREFIX = "YATTA"
+BOOLEANS = {
+    "true": True,
+    "1": True,
+    "yes": True,
+    "false": False,
+    "0": False,
+    "no": False,
+}
+
+_config = None
+
+
+def get_config():
+    """
+    Get the process-wide Config, reloading it if settings.toml changed on disk.
+    """
+    global _config
+    if _config is None:
+        _config = Config()
+    else:
+        _config.reload_if_changed()
+    return _config
+
 
 class Config(object):
     """
@@ -17,20 +44,31 @@ class Config(object):
     """
 
     default_dict = {
-        "general": {"run_in_background": "false"},
+        "general": {"run_in_background": False, "heartbeat_interval": 0},
         "formatting": {"figlet_font": "doom", "table_style": "pretty"},
-        "plotting": {"columns": 75, "show_legend": "true"},
+        "plotting": {"columns": 75, "show_legend": True},
+        "database": {
+            "journal_mode": "wal",
+            "synchronous": "normal",
+            "mmap_size": 268435456,
+            "cache_size": -16000,
+            "temp_store": "memory",
+            "busy_timeout": 5000,
+        },
+        "cache": {"max_size": 4194304},
     }
 
     def __init__(self):
         self.default = construct_toml(self.default_dict)
+        self._stamp = None
         self.user = self._generate_user_config()
 
     def __str__(self):
         return dumps(self.user)
 
     def _generate_user_config(self):
-        if os.path.exists(CONFIG_FILE):
+        self._stamp = _file_stamp(CONFIG_FILE)
+        if self._stamp:
             # read user settings from file
             try:
                 with open(CONFIG_FILE, "r") as f:
@@ -42,10 +80,9 @@ class Config(object):
             for category, settings in self.default_dict.items():
                 if category not in config.keys():
                     config.add(category, table())
-                else:
-                    for setting, value in settings.items():
-                        if setting not in config[category].keys():
-                            config[category][setting] = value
+                for setting, value in settings.items():
+                    if setting not in config[category].keys():
+                        config[category][setting] = value
             # remove deprecated settings
             for category, settings in config.items():
                 # remove deprecated tables
@@ -57,15 +94,25 @@ class Config(object):
                         if setting not in self.default_dict[category]:
                             config[category].remove(setting)
         else:
-            # construct the default config toml if no config file exists
+            # use the default config if no config file exists; it is only
+            # written once a setting changes
             config = construct_toml(self.default_dict)
-        # write to file
-        self._write_to_config(config)
         return config
 
     def _write_to_config(self, toml_doc):
-        with open(CONFIG_FILE, "w") as f:
+        # write atomically, so concurrent readers never see a partial file
+        tmp_file = f"{CONFIG_FILE}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as f:
             f.write(dumps(toml_doc))
+        os.replace(tmp_file, CONFIG_FILE)
+        self._stamp = _file_stamp(CONFIG_FILE)
+
+    def reload_if_changed(self):
+        """
+        Re-read the config file if it was modified since it was last loaded.
+        """
+        if _file_stamp(CONFIG_FILE) != self._stamp:
+            self.user = self._generate_user_config()
 
     def _check_new_settings(self):
         """
@@ -87,13 +134,55 @@ class Config(object):
         self._write_to_config(self.user)
 
     def get_user_value(self, table, key):
-        return self.user[table][key]
+        default = self.default_dict[table][key]
+        name = f"{ENV_PREFIX}_{table}_{key}".upper()
+        value = os.environ.get(name)
+        if value is None:
+            name, value = f"{table}.{key}", self.user[table][key]
+        return _coerce(value, default, name)
 
     def set_user_value(self, table, key, value):
+        if self.user[table][key] == value:
+            return
         self.user[table][key] = value
         self._write_to_config(self.user)
 
 
+def _coerce(value, default, name):
+    """
+    Convert a setting to the type of its default, e.g. int for plotting.columns.
+
+    Raises:
+        click.BadParameter: If the value can't be converted.
+    """
+    if isinstance(value, str) and not isinstance(default, str):
+        # environment overrides, or booleans written as strings by older versions
+        if isinstance(default, bool):
+            if value.lower() not in BOOLEANS:
+                raise click.BadParameter(
+                    f"{value!r} is not one of {', '.join(BOOLEANS)}.", param_hint=name
+                )
+            return BOOLEANS[value.lower()]
+        try:
+            return type(default)(value)
+        except ValueError:
+            raise click.BadParameter(
+                f"{value!r} is not a valid {type(default).__name__}.", param_hint=name
+            )
+    return value
+
+
+def _file_stamp(path):
+    """
+    Modification time and size of a file, or None if it doesn't exist.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
 def construct_toml(config_dict):
     toml_doc = document()
     tables = {}
@@ -1,27 +1,101 @@
 #!/usr/bin/env python
+# imported first, to time startup
+from yatta import profiling as profiling  # isort:skip
+
+import importlib
 import logging
 
 import click
 
 from yatta import utils as utils
-from yatta.commands import config, delete, edit, list, plot, start, timesheet
-from yatta.daemon import daemon_status, daemon_stop
-
-try:
-    from importlib import metadata
-except ImportError:  # for Python < 3.8
-    import importlib_metadata as metadata
+from yatta.completion_helpers import get_matching_tasks
 
 APP_NAME = "yatta"
 DATA_DIR, CONFIG_DIR, CACHE_DIR = utils.get_app_dirs()
 
 CLICK_CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"],)
 
+# subcommands are only imported when invoked (or listed in --help), so each
+# command pays for its own dependencies
+LAZY_COMMANDS = {
+    "start": "yatta.commands.start.start",
+    "switch": "yatta.commands.start.switch",
+    "list": "yatta.commands.list.list",
+    "edit": "yatta.commands.edit.edit",
+    "delete": "yatta.commands.delete.delete",
+    "plot": "yatta.commands.plot.plot",
+    "timesheet": "yatta.commands.timesheet.timesheet",
+    "config": "yatta.commands.config.config",
+    "db": "yatta.commands.database.database",
+    "import": "yatta.commands.transfer.import_",
+    "export": "yatta.commands.transfer.export",
+    "server": "yatta.commands.server.server",
+    "cache": "yatta.commands.cache.cache",
+}
+
+
+class LazyGroup(click.Group):
+    """
+    A click group that imports its subcommands on first use.
+    """
+
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
 
-@click.group(context_settings=CLICK_CONTEXT_SETTINGS)
-@click.version_option(version=metadata.version(APP_NAME))
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_commands and cmd_name not in self.commands:
+            module_name, attr = self.lazy_commands[cmd_name].rsplit(".", 1)
+            module = importlib.import_module(module_name)
+            self.add_command(getattr(module, attr), cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+
+def print_version(ctx, param, value):
+    if not value or ctx.resilient_parsing:
+        return
+    try:
+        from importlib import metadata
+    except ImportError:  # for Python < 3.8
+        import importlib_metadata as metadata
+
+    click.echo(f"{ctx.find_root().info_name}, version {metadata.version(APP_NAME)}")
+    ctx.exit()
+
+
+@click.group(
+    cls=LazyGroup, lazy_commands=LAZY_COMMANDS, context_settings=CLICK_CONTEXT_SETTINGS
+)
+@click.option(
+    "--version",
+    is_flag=True,
+    expose_value=False,
+    is_eager=True,
+    callback=print_version,
+    help="Show the version and exit.",
+)
 @click.option("-l", "--log_level", default="warning")
-def main(log_level):
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Report time per phase and the slowest SQL statements on stderr. "
+    + "Use --profile-memory to add peak memory.",
+)
+@click.option(
+    "--profile-memory",
+    is_flag=True,
+    help="Profile like --profile, adding peak memory. Slows the command down.",
+)
+@click.option(
+    "--profile-dump",
+    is_flag=True,
+    help="Write cProfile stats of the command to the cache directory.",
+)
+@click.pass_context
+def main(ctx, log_level, profile, profile_memory, profile_dump):
     # setup logging
     numeric_level = getattr(logging, log_level.upper(), None)
     if not isinstance(numeric_level, int):
@@ -29,32 +103,44 @@ def main(log_level):
     logging.basicConfig(
         format="--> %(levelname)s in %(name)s: %(message)s", level=numeric_level
     )
+    command = ctx.invoked_subcommand
+    profiling.start_tracing()
+    if profile or profile_memory:
+        profiling.start(memory=profile_memory)
+        ctx.call_on_close(lambda: profiling.report(command))
+    if profile_dump:
+        stop = profiling.dump_stats(command, CACHE_DIR)
+        ctx.call_on_close(lambda: click.echo(f"Profile written to {stop()}", err=True))
 
 
 @click.command()
-def status():
+@click.argument(
+    "task", required=False, type=click.STRING, autocompletion=get_matching_tasks
+)
+def status(task):
     """
-    Check status of active task.
+    Check status of the tracked tasks, or of TASK.
     """
-    daemon_status()
+    from yatta.daemon import daemon_status
+
+    daemon_status(task)
 
 
 @click.command()
-def stop():
+@click.argument(
+    "task", required=False, type=click.STRING, autocompletion=get_matching_tasks
+)
+@click.option("-a", "--all", is_flag=True, help="Stop all tracked tasks.")
+def stop(task, all):
     """
-    Stop tracking the active task.
+    Stop tracking TASK, which can be left out while a single task is tracked.
     """
-    daemon_stop()
+    from yatta.daemon import daemon_stop
+
+    daemon_stop(task, all)
 
 
-# add cli commands and command groups to main
-main.add_command(start.start)
-main.add_command(list.list)
-main.add_command(edit.edit)
-main.add_command(delete.delete)
-main.add_command(plot.plot)
-main.add_command(timesheet.timesheet)
-main.add_command(config.config)
+# add cli commands to main
 main.add_command(status)
 main.add_command(stop)
 
@@ -1,26 +1,29 @@
 import atexit
 import curses
+import json
 import logging
 import os
+import select
 import signal
+import socket
+import sqlite3
+import struct
 import sys
 import time
 from datetime import datetime
 
 import colorama as co
 
-from yatta import db as db
-from yatta.utils import (
-    _read_tmp_info,
-    get_app_dirs,
-    stopwatch,
-    time_figlet_print,
-    time_print,
-)
+from yatta.config import get_config
+from yatta.utils import DATETIME_FORMAT, _write_tmp_info, get_app_dirs, time_print
 
 DATA_DIR, CONFIG_DIR, CACHE_DIR = get_app_dirs()
 TMP_FILE = os.path.join(CACHE_DIR, "active_task")
 PID_FILE = os.path.join(CACHE_DIR, "yatta.pid")
+SOCKET_FILE = os.path.join(CACHE_DIR, "yatta.sock")
+DB_PATH = os.path.join(DATA_DIR, "yatta.db")
+# seconds to wait for the daemon to answer a request
+REQUEST_TIMEOUT = 2
 
 logger = logging.getLogger(__name__)
 
@@ -51,7 +54,8 @@ class Daemon:
         # decouple from parent environment
         os.chdir("/")
         os.setsid()
-        os.umask(0)
+        # the daemon's files, e.g. its socket, are only for the current user
+        os.umask(0o077)
 
         # do second fork
         try:
@@ -77,13 +81,16 @@ class Daemon:
 
         # write pidfile
         atexit.register(self.delpid)
+        self.writepid()
 
+    def writepid(self):
         pid = str(os.getpid())
         with open(self.pidfile, "w+") as f:
             f.write(pid + "\n")
 
     def delpid(self):
-        os.remove(self.pidfile)
+        if os.path.exists(self.pidfile):
+            os.remove(self.pidfile)
 
     def start(self):
         """Start the daemon."""
@@ -96,10 +103,13 @@ class Daemon:
         except IOError:
             pid = None
 
-        if pid:
+        if pid and self.is_running():
             message = "pidfile {0} already exist. " + "Daemon already running?\n"
             sys.stderr.write(message.format(self.pidfile))
             sys.exit(1)
+        elif pid:
+            # left behind by a daemon that was killed
+            os.remove(self.pidfile)
 
         # Start the daemon
         self.daemonize()
@@ -134,6 +144,17 @@ class Daemon:
                 print(str(err.args))
                 sys.exit(1)
 
+    def is_running(self):
+        """Check whether the process in the pidfile is alive."""
+        try:
+            with open(self.pidfile, "r") as pf:
+                os.kill(int(pf.read().strip()), 0)
+        except (IOError, ValueError, ProcessLookupError):
+            return False
+        except PermissionError:
+            pass  # process exists, but belongs to someone else
+        return True
+
     def restart(self):
         """Restart the daemon."""
         self.stop()
@@ -146,87 +167,642 @@ class Daemon:
         start() or restart()."""
 
 
+def listen(sockfile):
+    """
+    Listen on a unix socket that only the current user can connect to.
+
+    Returns:
+        (socket.socket): The listening socket.
+    """
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o177)
+    try:
+        server.bind(sockfile)
+    finally:
+        os.umask(umask)
+    server.listen()
+    return server
+
+
+def same_user(conn):
+    """
+    Whether the peer of a unix socket connection runs as the current user.
+    """
+    if not hasattr(socket, "SO_PEERCRED"):  # e.g. macOS; the socket's mode applies
+        return True
+    credentials = conn.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+    )
+    _, uid, _ = struct.unpack("3i", credentials)
+    return uid == os.getuid()
+
+
+class TimerError(Exception):
+    """
+    A request the stopwatch daemon can't carry out, e.g. stopping a task that
+    isn't being tracked.
+    """
+
+
 class StopwatchDaemon(Daemon):
-    def __init__(self, pidfile, taskname=None):
+    """
+    Supervisor that times any number of tasks at once and answers requests on a
+    unix socket.
+
+    Requests and responses are single lines of JSON. Requests look like
+    {"cmd": "status"}, {"cmd": "start", "task": "name"},
+    {"cmd": "stop", "task": "name"}, {"cmd": "stop", "all": true} or
+    {"cmd": "switch", "task": "name", "from": "other"}, where tasks are given by
+    name or ID; the task to stop or switch from can be left out while a single
+    task is tracked. They are answered with the running timers, the timers
+    stopped by the request and the daemon's current time, which ends the stopped
+    intervals, or with an error. Timers are kept by task ID, and report the
+    task's current name, so a task can be renamed while it is tracked. The
+    daemon exits once its last timer stops.
+
+    Every timer also has a row in the active_timers table, written by the daemon
+    and removed when the timer's record is saved, or when its task is deleted,
+    so timers survive a killed daemon until `yatta stop` saves them.
+
+    A {"cmd": "watch"} connection is kept open: it receives the current state,
+    then the new state after every change, and is closed when the daemon stops.
+    """
+
+    def __init__(
+        self,
+        pidfile,
+        task=None,
+        heartbeat=0,
+        sockfile=SOCKET_FILE,
+        dbfile=DB_PATH,
+    ):
         Daemon.__init__(self, pidfile)
-        self.taskname = taskname
+        self.task = task
+        self.heartbeat = heartbeat
+        self.sockfile = sockfile
+        self.dbfile = dbfile
+        self.timers = {}  # task ID: start time
+        self.names = {}  # task ID: name, looked up on every request
+        self.running = False
+        self.watchers = []
 
     def run(self):
-        stopwatch(self.taskname)
+        atexit.register(self.delsock)
+        # exit cleanly on `kill`, leaving the timers for `yatta stop`
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        self.serve()
 
+    def delsock(self):
+        if os.path.exists(self.sockfile):
+            os.remove(self.sockfile)
 
-def daemon_start(taskname):
-    daemon = StopwatchDaemon(PID_FILE, taskname)
+    def serve(self):
+        """Start the first timer, then answer requests until the last stops."""
+        try:
+            if self.task is not None:
+                self.start_timer(self.existing(self.task), datetime.now())
+            self.delsock()
+            server = listen(self.sockfile)
+            self.running = True
+            next_beat = time.time() + self.heartbeat
+            with server:
+                while self.running:
+                    timeout = (
+                        max(next_beat - time.time(), 0) if self.heartbeat else None
+                    )
+                    ready, _, _ = select.select(
+                        [server] + self.watchers, [], [], timeout
+                    )
+                    for sock in ready:
+                        if sock is server:
+                            conn, _ = server.accept()
+                            if not self.handle(conn):
+                                conn.close()
+                        else:
+                            # watchers only ever hang up
+                            self.watchers.remove(sock)
+                            sock.close()
+                    if not ready and self.heartbeat:
+                        self.beat(datetime.now())
+                        next_beat = time.time() + self.heartbeat
+        finally:
+            for watcher in self.watchers:
+                watcher.close()
+            self.watchers = []
+            # the daemon runs in a multiprocessing child, which exits without
+            # running atexit handlers
+            self.delsock()
+            self.delpid()
+
+    def handle(self, conn):
+        """Answer a request, returning True if the connection should stay open."""
+        if not same_user(conn):
+            logger.warning("Refused a request from another user")
+            return False
+        conn.settimeout(REQUEST_TIMEOUT)
+        try:
+            request = json.loads(conn.makefile("rb").readline())
+            cmd = request["cmd"]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Bad request: {e}")
+            return False
+        now = datetime.now()
+        stopped, switched = [], None
+        if self.refresh_names():
+            self.write_tmp_info()
+        try:
+            if cmd == "start":
+                self.start_timer(self.existing(request["task"]), now)
+            elif cmd == "stop":
+                tasks = list(self.timers) if request.get("all") else None
+                for task in tasks or [self.pick(request.get("task"))]:
+                    stopped.append(self.stop_timer(task))
+            elif cmd == "switch":
+                task = self.existing(request["task"])
+                if task in self.timers:
+                    raise TimerError(f"You are already tracking {self.names[task]}.")
+                previous = self.pick(request.get("from"))
+                stopped.append(self.stop_timer(previous))
+                self.start_timer(task, now)
+                switched = {"from": previous, "to": task}
+            elif cmd == "watch":
+                self.watchers.append(conn)
+            elif cmd != "status":
+                raise TimerError(f"Unknown command: {cmd}")
+        except TimerError as e:
+            self.send(conn, {"error": str(e)})
+            return False
+        except KeyError as e:
+            self.send(conn, {"error": f"Request is missing {e}"})
+            return False
+        response = self.state(now, stopped)
+        if cmd in ("start", "stop", "switch"):
+            self.write_tmp_info()
+            for watcher in self.watchers:
+                self.send(watcher, dict(self.state(now, stopped), switched=switched))
+            # nothing left to track
+            self.running = bool(self.timers)
+        self.send(conn, response)
+        return cmd == "watch"
+
+    def pick(self, task):
+        """The timer a request refers to: the given one, or the only one."""
+        if task is not None:
+            task_id = self.task_id(task)
+            if task_id is None:  # deleted while it was tracked
+                names = {name: i for i, name in self.names.items() if i in self.timers}
+                task_id = names.get(task)
+            if task_id not in self.timers:
+                raise TimerError(f"{task} is not being tracked right now.")
+            return task_id
+        if not self.timers:
+            raise TimerError("No tasks are being tracked right now.")
+        if len(self.timers) > 1:
+            names = ", ".join(self.names[task] for task in self.timers)
+            raise TimerError(f"Name one of the tasks being tracked: {names}.")
+        return next(iter(self.timers))
+
+    def task_id(self, task):
+        """The ID of a task given by name or ID, None if there's no such task."""
+        try:
+            rows = self.query("SELECT id, name FROM tasks WHERE id = ?", [int(task)])
+        except ValueError:  # task names can't be integers
+            rows = self.query("SELECT id, name FROM tasks WHERE name = ?", [task])
+        self.names.update(rows)
+        return rows[0][0] if rows else None
+
+    def existing(self, task):
+        """The ID of a task given by name or ID, which must exist."""
+        task_id = self.task_id(task)
+        if task_id is None:
+            raise TimerError(f"{task} does not exist.")
+        return task_id
+
+    def refresh_names(self):
+        """
+        Look up the current names of the tracked tasks, returning whether any
+        was renamed.
+        """
+        if not self.timers:
+            return False
+        names = self.query(
+            "SELECT id, name FROM tasks WHERE id IN "
+            + f"({', '.join('?' * len(self.timers))})",
+            list(self.timers),
+        )
+        renamed = any(self.names.get(task) != name for task, name in names)
+        self.names.update(names)
+        return renamed
+
+    def start_timer(self, task_id, now):
+        if task_id in self.timers:
+            raise TimerError(f"You are already tracking {self.names[task_id]}.")
+        start = now.strftime(DATETIME_FORMAT)
+        # every running timer has a row, which its record is saved against
+        if not self.execute(
+            "INSERT OR REPLACE INTO active_timers (task_id, start, heartbeat) "
+            + "VALUES (?, ?, ?)",
+            [(task_id, start, start)],
+        ):
+            raise TimerError(f"Failed to start tracking {self.names[task_id]}.")
+        self.timers[task_id] = now
+        self.write_tmp_info()
+
+    def stop_timer(self, task_id):
+        # the timer's row is removed when its record is saved
+        return self.timer(task_id, self.timers.pop(task_id))
+
+    def beat(self, now):
+        """Record that the timers are still running."""
+        self.execute(
+            "UPDATE active_timers SET heartbeat = ? WHERE task_id = ? AND start = ?",
+            [
+                (now.strftime(DATETIME_FORMAT), task, start.strftime(DATETIME_FORMAT))
+                for task, start in self.timers.items()
+            ],
+        )
+
+    def execute(self, statement, rows):
+        """Update the active timers, returning whether it succeeded."""
+        connection = sqlite3.connect(self.dbfile, timeout=REQUEST_TIMEOUT)
+        try:
+            # a timer can't be added for a task that was deleted meanwhile
+            connection.execute("PRAGMA foreign_keys = ON")
+            with connection:
+                connection.executemany(statement, rows)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to update the active timers: {e}")
+            return False
+        finally:
+            connection.close()
+        return True
+
+    def query(self, statement, params):
+        """Read from the database, returning no rows if it fails."""
+        connection = sqlite3.connect(self.dbfile, timeout=REQUEST_TIMEOUT)
+        try:
+            return connection.execute(statement, params).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to look up the tasks: {e}")
+            return []
+        finally:
+            connection.close()
+
+    def write_tmp_info(self):
+        _write_tmp_info({self.names[task]: self.timers[task] for task in self.timers})
+
+    def send(self, conn, message):
+        try:
+            conn.sendall(json.dumps(message).encode() + b"\n")
+        except OSError as e:
+            logger.warning(f"Failed to answer request: {e}")
+
+    def timer(self, task_id, start):
+        return {
+            "task_id": task_id,
+            "task": self.names[task_id],
+            "start": start.strftime(DATETIME_FORMAT),
+        }
+
+    def state(self, now, stopped=()):
+        return {
+            "timers": [self.timer(task, start) for task, start in self.timers.items()],
+            "stopped": list(stopped),
+            "now": now.strftime(DATETIME_FORMAT),
+            "pid": os.getpid(),
+        }
+
+
+def daemon_request(cmd, sockfile=SOCKET_FILE, **kwargs):
+    """
+    Send a request to the stopwatch daemon.
+
+    Args:
+        cmd (str): "status", "start", "stop" or "switch".
+        sockfile (str): Path of the daemon's socket.
+        **kwargs: Additional request fields, e.g. task="name" for "start".
+
+    Returns:
+        (dict): The daemon's response, or None if no daemon is running.
+    """
+    client = _connect(cmd, sockfile, **kwargs)
+    if not client:
+        return None
+    with client:
+        return _read_state(client.makefile("rb"))
+
+
+def daemon_watch(sockfile=SOCKET_FILE):
+    """
+    Open a watch connection to the stopwatch daemon.
+
+    Returns:
+        (tuple): The connected socket, a file to read states from (see
+                 `_read_state`) and the current state; None if no daemon is running.
+    """
+    client = _connect("watch", sockfile)
+    if not client:
+        return None
+    client.settimeout(None)
+    # unbuffered, so states not read yet stay in the socket, where select sees them
+    stream = client.makefile("rb", buffering=0)
+    return client, stream, _read_state(stream)
+
+
+def _connect(cmd, sockfile, **kwargs):
+    request = json.dumps(dict(cmd=cmd, **kwargs)).encode() + b"\n"
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(REQUEST_TIMEOUT)
+    try:
+        client.connect(sockfile)
+        client.sendall(request)
+    except (FileNotFoundError, ConnectionRefusedError):
+        client.close()
+        _remove_stale_files(sockfile)
+        return None
+    except (socket.timeout, ConnectionResetError):  # the daemon is shutting down
+        client.close()
+        return None
+    return client
+
+
+def _read_state(stream):
+    """Read a state sent by the daemon; None once the daemon hangs up."""
+    try:
+        response = stream.readline()
+    except (socket.timeout, ConnectionResetError):  # the daemon is shutting down
+        return None
+    if not response:
+        return None
+    response = json.loads(response)
+    if "now" in response:
+        response["now"] = datetime.strptime(response["now"], DATETIME_FORMAT)
+    for timer in response.get("timers", []) + response.get("stopped", []):
+        timer["start"] = datetime.strptime(timer["start"], DATETIME_FORMAT)
+    return response
+
+
+def wait_for_daemon(timeout=REQUEST_TIMEOUT):
+    """Wait until a newly started daemon answers requests."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if daemon_request("status"):
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def _remove_stale_files(sockfile=SOCKET_FILE):
+    # files left behind by a daemon that was killed; its timers are kept in the
+    # database so `yatta stop` can still save them
+    for path in (sockfile, PID_FILE):
+        if os.path.exists(path) and not StopwatchDaemon(PID_FILE).is_running():
+            os.remove(path)
+
+
+def daemon_start(task):
+    heartbeat = int(get_config().get_user_value("general", "heartbeat_interval"))
+    daemon = StopwatchDaemon(PID_FILE, task, heartbeat)
     # start() will execute the hijacked run() func
     daemon.start()
 
 
-def daemon_stop():
-    daemon = StopwatchDaemon(PID_FILE)
-    daemon.stop()
-    try:
-        start, end, duration, taskname = _read_tmp_info()
-    except FileNotFoundError:
+def orphaned_timers():
+    """
+    Timers left by a daemon that was killed, or whose record was never saved.
+
+    The timers are read before the daemon's status, so timers started in between
+    aren't mistaken for orphans. A timer stopped in between may be, but its
+    record is only saved once, see yatta.db.save_timer().
+
+    Returns:
+        timers (list): ActiveTimer rows the daemon isn't running.
+        state (dict): The daemon's status, or None if it isn't running.
+    """
+    from yatta import db as db
+
+    timers = db.get_active_timers().all()
+    state = daemon_request("status")
+    running = {(t["task_id"], t["start"]) for t in state["timers"]} if state else set()
+    orphans = [t for t in timers if (t.task_id, t.start) not in running]
+    return orphans, state
+
+
+def daemon_stop(task=None, all=False):
+    """
+    Stop tracking a task, given by name or ID, or all tasks, saving their records.
+
+    Timers left behind by a killed daemon are saved as well, ending at their
+    last heartbeat if one is configured.
+    """
+    orphans, state = orphaned_timers()
+    orphans = [
+        timer
+        for timer in orphans
+        if all or task is None or task in (timer.task_id, timer.task_name)
+    ]
+    use_heartbeat = get_config().get_user_value("general", "heartbeat_interval")
+    for timer in orphans:
+        end = timer.heartbeat if use_heartbeat and timer.heartbeat else None
+        save_record(timer.task_id, timer.task_name, timer.start, end or datetime.now())
+    if state:
+        state = daemon_request("stop", task=task, all=all)
+    if state and "error" in state:
+        if not orphans:
+            print(state["error"])
+    elif state:
+        for timer in state["stopped"]:
+            save_record(timer["task_id"], timer["task"], timer["start"], state["now"])
+    elif not orphans:
+        print("No tasks are being tracked right now.")
+    if not state and os.path.exists(TMP_FILE):
+        os.remove(TMP_FILE)
+
+
+def daemon_switch(task_id, from_task=None):
+    """
+    Switch from a tracked task to another, saving a record for the previous one.
+    """
+    state = daemon_request("switch", task=task_id, **{"from": from_task})
+    if not state:
         print("No tasks are being tracked right now.")
         return
-    # create record
-    record = db.Record(task_name=taskname, start=start, end=end, duration=duration)
+    if "error" in state:
+        print(state["error"])
+        return
+    for timer in state["stopped"]:
+        save_record(timer["task_id"], timer["task"], timer["start"], state["now"])
+    print(f"{co.Fore.BLUE}Now tracking {_get_timer(state, task_id)['task']}")
+
+
+def save_record(task_id, taskname, start, end):
+    """
+    Save a tracked interval of a task to the database and print a summary.
+    """
+    from yatta import db as db
+
     # at this point, the task has already been added to db in track(),
     # just need to fetch it
-    task = db.get_tasks(taskname).first()
-    db.add_record(task, record)
-    db.update_task_total(task)
+    task = db.get_tasks(task_id).first()
     co.init(autoreset=True)
+    if task is None:  # deleted while it was tracked, along with its timer
+        print(
+            f"\n{co.Fore.RED}{taskname} no longer exists, so the time tracked "
+            + f"since {start:%Y-%m-%d %H:%M} was not saved."
+        )
+        return
+    record = db.save_timer(task, start, end)
+    if record is None:  # saved by another process in the meantime
+        return
     print(
         f"\n{co.Fore.GREEN}Worked on {task.name} for {record.duration/3600:.2f}"
         + f"hrs ({time_print(record.duration)}) \u2714"
     )
-    os.remove(TMP_FILE)
 
 
-# FIXME: #10 manually killing yatta with "kill" command doesn't remove pid file
-def daemon_status():
+def daemon_status(taskname=None):
     co.init(autoreset=True)
-    if os.path.exists(PID_FILE):
-        start, end, duration, taskname = _read_tmp_info()
+    state = daemon_request("status")
+    timers = [
+        timer
+        for timer in (state["timers"] if state else [])
+        if taskname in (None, timer["task"])
+    ]
+    for timer in timers:
+        start, end = timer["start"], state["now"]
+        duration = int((end - start).total_seconds())
         print(
-            f"\n\t{co.Fore.BLUE}Active task: {co.Fore.GREEN}{taskname}"
+            f"\n\t{co.Fore.BLUE}Active task: {co.Fore.GREEN}{timer['task']}"
             + f"\n\t{co.Fore.BLUE}Start: {co.Fore.GREEN}{start}"
             + f"\n\t{co.Fore.BLUE}Current: {co.Fore.GREEN}{end}"
-            + f"\n\t{co.Fore.BLUE}Duration: {co.Fore.GREEN}{time_print(int(duration))}"
+            + f"\n\t{co.Fore.BLUE}Duration: {co.Fore.GREEN}{time_print(duration)}"
         )
-    else:
-        print("No tasks are being tracked right now.")
+    if not timers:
+        print(
+            f"{taskname} is not being tracked right now."
+            if taskname
+            else "No tasks are being tracked right now."
+        )
+
+
+# figlet glyphs for the stopwatch digits, rendered once per font
+_glyph_cache = {}
+
+
+def _clock_glyphs(font):
+    """
+    Render each character of a HH:MM:SS clock with a figlet font.
 
+    Args:
+        font (pyfiglet.Figlet): A Figlet "font" object.
 
-def dummy_stopwatch(taskname, font):
+    Returns:
+        glyphs (dict): Lines of each character, padded so that all digits share
+                       the same width and all glyphs the same height.
     """
-    Start a (mostly) daemon-naive stopwatch to display w/ curses.
-    i.e., it does not check the active_task file
+    if font.font not in _glyph_cache:
+        glyphs = {
+            char: font.renderText(char).rstrip("\n").split("\n")
+            for char in "0123456789:"
+        }
+        height = max(len(lines) for lines in glyphs.values())
+        digit_width = max(len(line) for c in "0123456789" for line in glyphs[c])
+        for char, lines in glyphs.items():
+            width = digit_width if char != ":" else max(len(line) for line in lines)
+            lines += [""] * (height - len(lines))
+            glyphs[char] = [line.ljust(width) for line in lines]
+        _glyph_cache[font.font] = glyphs
+    return _glyph_cache[font.font]
+
+
+def _draw_clock(stdscr, glyphs, y, text, previous=""):
     """
+    Draw the characters of `text` that differ from the previously drawn text.
+    """
+    x = 0
+    for i, char in enumerate(text):
+        lines = glyphs[char]
+        if len(text) != len(previous) or char != previous[i]:
+            for row, line in enumerate(lines):
+                try:
+                    stdscr.addstr(y + row, x, line)
+                except curses.error:
+                    pass  # glyph doesn't fit on the screen
+        x += len(lines[0])
+
+
+def _get_timer(state, task_id):
+    """A task's timer in a daemon state, None if it isn't running."""
+    for timer in state["timers"]:
+        if timer["task_id"] == task_id:
+            return timer
+    return None
+
+
+def dummy_stopwatch(task_id, font):
+    """
+    Show a task with a curses stopwatch until its timer stops.
 
-    def show_time(stdscr, taskname, font):
-        QUIT_KEY = ord("q")
-        curses.echo()
-        curses.use_default_colors()
-        curses.curs_set(0)
-        stdscr.timeout(0)
+    Redraws once per second (on the second boundary since the task started) or as
+    soon as a key is pressed or the daemon reports a change. Follows the timer
+    when the task is switched for another, and shows the task's new name after a
+    rename.
+    """
+
+    def show_title(stdscr, taskname):
+        stdscr.clear()
         try:
-            stdscr.addstr(font.renderText(taskname))
+            stdscr.addstr(0, 0, font.renderText(taskname))
         except curses.error as e:
             stdscr.clear()
-            stdscr.addstr(font.renderText(taskname[:11] + "..."))
+            stdscr.addstr(0, 0, font.renderText(taskname[:11] + "..."))
             logger.warning(e)
-        start_time = datetime.now()
-        while os.path.exists(PID_FILE):
-            count = int(time.time() - start_time.timestamp())
-            stdscr.insstr(time_figlet_print(font, count))
-            ch = stdscr.getch()
-            stdscr.refresh()
-            # FIXME: #11 task summary is printed awkwardly over curses
-            # text on task completion
-            if ch == QUIT_KEY:
-                daemon_stop()
-            time.sleep(1)
-
-    curses.wrapper(show_time, taskname, font)
+        return stdscr.getyx()[0]
+
+    def show_time(stdscr, task_id, font):
+        """Returns the task to stop if the user quit, None if the timer stopped."""
+        QUIT_KEY = ord("q")
+        STDIN = 0  # curses reads keys from the terminal on stdin
+        watch = daemon_watch()
+        if not watch or not _get_timer(watch[2], task_id):
+            return None
+        client, stream, state = watch
+        curses.use_default_colors()
+        curses.curs_set(0)
+        stdscr.nodelay(True)
+        glyphs = _clock_glyphs(font)
+        timer = _get_timer(state, task_id)
+        y = show_title(stdscr, timer["task"])
+        start = timer["start"].timestamp()
+        drawn = ""
+        with client:
+            while True:
+                count = int(time.time() - start)
+                text = time_print(count)
+                _draw_clock(stdscr, glyphs, y, text, drawn)
+                drawn = text
+                stdscr.refresh()
+                # sleep until the next second boundary, a key press or a message
+                timeout = max(start + count + 1 - time.time(), 0)
+                ready, _, _ = select.select([STDIN, client], [], [], timeout)
+                if STDIN in ready and stdscr.getch() == QUIT_KEY:
+                    return task_id
+                if client in ready:
+                    state = _read_state(stream)
+                    if not state:
+                        return None  # the daemon was stopped elsewhere
+                    switched = state.get("switched")
+                    if switched and switched["from"] == task_id:
+                        task_id = switched["to"]
+                    shown, timer = timer, _get_timer(state, task_id)
+                    if not timer:
+                        return None  # the timer was stopped elsewhere
+                    if timer != shown:  # switched to another task or renamed
+                        y = show_title(stdscr, timer["task"])
+                        start = timer["start"].timestamp()
+                        drawn = ""
+
+    # stop after leaving curses, so the task summary is printed on the terminal
+    task_id = curses.wrapper(show_time, task_id, font)
+    if task_id:
+        daemon_stop(task_id)
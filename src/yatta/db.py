@@ -1,42 +1,101 @@
 import logging
 import os
+import sqlite3
+from datetime import datetime
+from itertools import islice
 
-import pandas as pd
+from click import BadParameter
 from sqlalchemy import (
     Column,
+    Date,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
+    cast,
     create_engine,
     event,
     func,
+    select,
 )
 from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker
-from tabulate import tabulate
+from sqlalchemy.orm import column_property, relationship, scoped_session, sessionmaker
 
+from yatta import profiling as profiling
 from yatta import utils as utils
-from yatta.config import Config
+from yatta.config import get_config
 from yatta.utils import get_app_dirs
 
 
+# PRAGMAs that can be set in the [database] config table, with their allowed
+# values or the type they are cast to
+SQLITE_PRAGMAS = {
+    "journal_mode": ("delete", "truncate", "persist", "memory", "wal", "off"),
+    "synchronous": ("off", "normal", "full", "extra"),
+    "temp_store": ("default", "file", "memory"),
+    "mmap_size": int,
+    "cache_size": int,
+    "busy_timeout": int,
+}
+
+
+def apply_pragmas(cursor, settings):
+    """
+    Set SQLite PRAGMAs on a connection, skipping invalid values.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor of the connection to configure.
+        settings (dict): PRAGMA names from SQLITE_PRAGMAS mapped to values.
+    """
+    for name, value in settings.items():
+        allowed = SQLITE_PRAGMAS[name]
+        try:
+            if allowed is int:
+                value = int(value)
+            elif str(value).lower() in allowed:
+                value = str(value).lower()
+            else:
+                raise ValueError(f"must be one of {', '.join(allowed)}")
+        except ValueError as e:
+            logger.warning(f"Ignoring database setting {name}={value!r}: {e}")
+            continue
+        cursor.execute(f"PRAGMA {name}={value}")
+
+
 @event.listens_for(Engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
+    config = get_config()
     cursor = dbapi_connection.cursor()
     cursor.execute("PRAGMA foreign_keys=ON")
+    apply_pragmas(
+        cursor, {name: _pragma_setting(config, name) for name in SQLITE_PRAGMAS}
+    )
     cursor.close()
 
 
+def _pragma_setting(config, name):
+    """
+    The configured value of a PRAGMA, or its default if the override is invalid,
+    so a bad setting never keeps the database from opening.
+    """
+    try:
+        return config.get_user_value("database", name)
+    except BadParameter as e:
+        default = config.default_dict["database"][name]
+        logger.warning(f"{e.format_message()} Using {default!r} instead.")
+        return default
+
+
 DATA_DIR, CONFIG_DIR, CACHE_DIR = get_app_dirs()
 DB_PATH = os.path.join(DATA_DIR, "yatta.db")
 
 logger = logging.getLogger(__name__)
 
 engine = create_engine(f"sqlite:///{DB_PATH}", echo=False)
+profiling.instrument(engine)
 Sessionmkr = sessionmaker(bind=engine)
-session = Sessionmkr()
 Base = declarative_base()
 
 
@@ -52,9 +111,10 @@ class Task(Base):
 
     records = relationship(
         "Record",
-        primaryjoin="and_(Task.id == Record.task_id, Task.name == Record.task_name)",
         lazy="dynamic",
         cascade="all, delete-orphan",
+        # records are removed by ON DELETE CASCADE, never loaded to be deleted
+        passive_deletes=True,
     )
 
     def __repr__(self):
@@ -64,6 +124,8 @@ class Task(Base):
         )
 
     def __str__(self):
+        from tabulate import tabulate
+
         headers = ["ID", "Task", "Tags", "Description", "Total"]
         data = [
             [
@@ -77,22 +139,30 @@ class Task(Base):
         return "\n" + tabulate(
             data,
             headers=headers,
-            tablefmt=Config().get_user_value("formatting", "table_style"),
+            tablefmt=get_config().get_user_value("formatting", "table_style"),
         )
 
 
 class Record(Base):
     __tablename__ = "records"
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    task_id = Column(
-        String, ForeignKey("tasks.id", onupdate="cascade", ondelete="cascade")
-    )
-    task_name = Column(
-        String, ForeignKey("tasks.name", onupdate="cascade", ondelete="cascade")
+    __table_args__ = (
+        Index("ix_records_start", "start"),
+        Index("ix_records_task_id_start", "task_id", "start"),
+        # never reuse the ID of a deleted or archived record
+        {"sqlite_autoincrement": True},
     )
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="cascade"))
     start = Column(DateTime, nullable=False)
     end = Column(DateTime, nullable=False)
     duration = Column(Integer, nullable=False)
+    # looked up from the task, so renaming a task leaves its records alone
+    task_name = column_property(
+        select([Task.name])
+        .where(Task.id == task_id)
+        .correlate_except(Task)
+        .label("task_name")
+    )
 
     def __repr__(self):
         return (
@@ -101,6 +171,8 @@ class Record(Base):
         )
 
     def __str__(self):
+        from tabulate import tabulate
+
         h = ["record_id", "task_id", "task", "start", "end", "duration"]
         s = [
             [
@@ -113,12 +185,291 @@ class Record(Base):
             ],
         ]
         return "\n" + tabulate(
-            s, headers=h, tablefmt=Config().get_user_value("formatting", "table_style"),
+            s,
+            headers=h,
+            tablefmt=get_config().get_user_value("formatting", "table_style"),
         )
 
 
-# add the above mappings to database, if they don't already exist
-Base.metadata.create_all(engine)
+class DailyTotal(Base):
+    """
+    Rollup of record durations per task and (start) day, kept up to date by the
+    triggers in SCHEMA_MIGRATIONS.
+    """
+
+    __tablename__ = "daily_totals"
+    __table_args__ = (Index("ix_daily_totals_day", "day"),)
+    task_id = Column(
+        Integer, ForeignKey("tasks.id", ondelete="cascade"), primary_key=True
+    )
+    day = Column(Date, primary_key=True)
+    seconds = Column(Integer, nullable=False, default=0)
+
+
+class Archive(Base):
+    """
+    Catalog entry of a per-year archive database holding records moved out of
+    the records table by archive_records().
+    """
+
+    __tablename__ = "archives"
+    year = Column(Integer, primary_key=True)
+    path = Column(String, nullable=False)
+    first_start = Column(DateTime)
+    last_start = Column(DateTime)
+    records = Column(Integer, nullable=False, default=0)
+
+
+class ActiveTimer(Base):
+    """
+    Timer of the stopwatch daemon. The daemon adds it when the task starts, and
+    it is removed when the task's record is saved, so it outlives a killed
+    daemon.
+    """
+
+    __tablename__ = "active_timers"
+    # removed with its task, and keeps running when the task is renamed
+    task_id = Column(
+        Integer, ForeignKey("tasks.id", ondelete="cascade"), primary_key=True
+    )
+    start = Column(DateTime, primary_key=True)
+    heartbeat = Column(DateTime)
+    task_name = column_property(
+        select([Task.name])
+        .where(Task.id == task_id)
+        .correlate_except(Task)
+        .label("task_name")
+    )
+
+
+# statements that add or remove a record (NEW or OLD) from its daily total
+_ROLLUP_ADD = """
+    INSERT OR IGNORE INTO daily_totals (task_id, day, seconds)
+    VALUES (NEW.task_id, date(NEW.start), 0);
+    UPDATE daily_totals SET seconds = seconds + NEW.duration
+    WHERE task_id = NEW.task_id AND day = date(NEW.start);
+"""
+_ROLLUP_REMOVE = """
+    UPDATE daily_totals SET seconds = seconds - OLD.duration
+    WHERE task_id = OLD.task_id AND day = date(OLD.start);
+    DELETE FROM daily_totals
+    WHERE task_id = OLD.task_id AND day = date(OLD.start) AND seconds <= 0;
+"""
+_ROLLUP_INSERT_TRIGGER = (
+    "CREATE TRIGGER IF NOT EXISTS records_rollup_insert AFTER INSERT ON records "
+    + f"BEGIN {_ROLLUP_ADD} END"
+)
+_ROLLUP_UPDATE_TRIGGER = (
+    "CREATE TRIGGER IF NOT EXISTS records_rollup_update "
+    + "AFTER UPDATE OF task_id, start, duration ON records "
+    + f"BEGIN {_ROLLUP_REMOVE} {_ROLLUP_ADD} END"
+)
+_ROLLUP_DELETE_TRIGGER = (
+    "CREATE TRIGGER IF NOT EXISTS records_rollup_delete AFTER DELETE ON records "
+    + f"BEGIN {_ROLLUP_REMOVE} END"
+)
+# statements that keep the task total in step with a record (NEW or OLD)
+_TOTAL_ADD = """
+    UPDATE tasks SET total = COALESCE(total, 0) + NEW.duration
+    WHERE id = NEW.task_id;
+"""
+_TOTAL_REMOVE = """
+    UPDATE tasks SET total = COALESCE(total, 0) - OLD.duration
+    WHERE id = OLD.task_id;
+"""
+_TOTAL_INSERT_TRIGGER = (
+    "CREATE TRIGGER IF NOT EXISTS records_total_insert AFTER INSERT ON records "
+    + f"BEGIN {_TOTAL_ADD} END"
+)
+_TOTAL_UPDATE_TRIGGER = (
+    "CREATE TRIGGER IF NOT EXISTS records_total_update "
+    + "AFTER UPDATE OF task_id, duration ON records "
+    + f"BEGIN {_TOTAL_REMOVE} {_TOTAL_ADD} END"
+)
+_TOTAL_DELETE_TRIGGER = (
+    "CREATE TRIGGER IF NOT EXISTS records_total_delete AFTER DELETE ON records "
+    + f"BEGIN {_TOTAL_REMOVE} END"
+)
+# tasks whose stored total differs from the sum of their records, including
+# archived ones (summed into the temp table archived_totals beforehand)
+_TOTAL_DRIFT = """
+    SELECT tasks.id, tasks.name, tasks.total, COALESCE(sums.seconds, 0)
+    FROM tasks LEFT JOIN (
+        SELECT task_id, SUM(seconds) AS seconds FROM (
+            SELECT task_id, SUM(duration) AS seconds FROM records GROUP BY task_id
+            UNION ALL SELECT task_id, seconds FROM archived_totals
+        ) GROUP BY task_id
+    ) AS sums ON tasks.id = sums.task_id
+    WHERE tasks.total IS NOT COALESCE(sums.seconds, 0)
+"""
+_BUMP_VERSION = "UPDATE data_version SET version = version + 1 WHERE name = '{}';"
+# writes counted by the data version of each table
+_VERSIONED = {
+    "tasks": ("INSERT", "UPDATE OF name", "DELETE"),
+    "records": ("INSERT", "UPDATE", "DELETE"),
+}
+
+
+def _version_trigger(table, action):
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS {table}_version_{action.split()[0].lower()} "
+        + f"AFTER {action} ON {table} BEGIN {_BUMP_VERSION.format(table)} END"
+    )
+
+
+# the records table as created by create_all
+_RECORDS_TABLE = (
+    "CREATE TABLE {} (id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, "
+    + 'task_id INTEGER, start DATETIME NOT NULL, "end" DATETIME NOT NULL, '
+    + "duration INTEGER NOT NULL, "
+    + "FOREIGN KEY(task_id) REFERENCES tasks (id) ON DELETE cascade)"
+)
+_RECORDS_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_records_start ON records (start)",
+    "CREATE INDEX IF NOT EXISTS ix_records_task_id_start ON records (task_id, start)",
+]
+# triggers on records, dropped along with the table when it is rebuilt
+_RECORDS_TRIGGERS = [
+    _ROLLUP_INSERT_TRIGGER,
+    _ROLLUP_UPDATE_TRIGGER,
+    _ROLLUP_DELETE_TRIGGER,
+    _TOTAL_INSERT_TRIGGER,
+    _TOTAL_UPDATE_TRIGGER,
+    _TOTAL_DELETE_TRIGGER,
+] + [_version_trigger("records", action) for action in _VERSIONED["records"]]
+REBUILD_ROLLUPS = [
+    "DELETE FROM daily_totals",
+    "INSERT INTO daily_totals (task_id, day, seconds) "
+    + "SELECT task_id, date(start), SUM(duration) FROM records "
+    + "GROUP BY task_id, date(start)",
+]
+# start new record IDs after the highest ID given, if they don't already
+_RESERVE_RECORD_IDS = [
+    "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'records'",
+    "INSERT INTO sqlite_sequence (name, seq) SELECT 'records', ? "
+    + "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'records')",
+]
+
+# Schema changes for databases created by earlier versions. Each entry is one
+# schema version; PRAGMA user_version records how many have been applied.
+# Statements must be idempotent, since new databases run them after create_all.
+SCHEMA_MIGRATIONS = [
+    # 1: secondary indexes on records (earlier versions also indexed
+    # task_name, which migration 7 drops along with the column)
+    _RECORDS_INDEXES,
+    # 2: daily rollup table, maintained by triggers on records
+    [
+        "CREATE TABLE IF NOT EXISTS daily_totals ("
+        + "task_id INTEGER NOT NULL REFERENCES tasks (id) ON DELETE CASCADE, "
+        + "day DATE NOT NULL, seconds INTEGER NOT NULL, "
+        + "PRIMARY KEY (task_id, day))",
+        "CREATE INDEX IF NOT EXISTS ix_daily_totals_day ON daily_totals (day)",
+        _ROLLUP_INSERT_TRIGGER,
+        _ROLLUP_UPDATE_TRIGGER,
+        _ROLLUP_DELETE_TRIGGER,
+    ]
+    + REBUILD_ROLLUPS,
+    # 3: task totals, maintained by triggers on records
+    [
+        _TOTAL_INSERT_TRIGGER,
+        _TOTAL_UPDATE_TRIGGER,
+        _TOTAL_DELETE_TRIGGER,
+        "UPDATE tasks SET total = (SELECT COALESCE(SUM(duration), 0) FROM records "
+        + "WHERE records.task_id = CAST(tasks.id AS TEXT))",
+    ],
+    # 4: per-table change counters, for caches outside the database
+    [
+        "CREATE TABLE IF NOT EXISTS data_version "
+        + "(name VARCHAR PRIMARY KEY, version INTEGER NOT NULL)",
+        "INSERT OR IGNORE INTO data_version VALUES ('tasks', 0), ('records', 0)",
+    ]
+    + [
+        _version_trigger(table, action)
+        for table, actions in _VERSIONED.items()
+        for action in actions
+    ],
+    # 5: catalog of per-year archive databases
+    [
+        "CREATE TABLE IF NOT EXISTS archives (year INTEGER NOT NULL PRIMARY KEY, "
+        + "path VARCHAR NOT NULL, first_start DATETIME, last_start DATETIME, "
+        + "records INTEGER NOT NULL)",
+    ],
+    # 6: timers of the stopwatch daemon
+    [
+        "CREATE TABLE IF NOT EXISTS active_timers ("
+        + "task_id INTEGER NOT NULL REFERENCES tasks (id) ON DELETE CASCADE, "
+        + "start DATETIME NOT NULL, heartbeat DATETIME, "
+        + "PRIMARY KEY (task_id, start))",
+    ],
+    # 7: records keyed by an integer task_id alone, without a copy of the task
+    # name, so renaming a task leaves its records alone, and with AUTOINCREMENT
+    # IDs so that archived IDs are never reused. SQLite can't drop columns or
+    # change their types, so the table is rebuilt, dropping its indexes and
+    # triggers.
+    [
+        "DROP TABLE IF EXISTS records_new",
+        _RECORDS_TABLE.format("records_new"),
+        'INSERT INTO records_new (id, task_id, start, "end", duration) '
+        + 'SELECT id, CAST(task_id AS INTEGER), start, "end", duration FROM records',
+        "DROP TABLE records",
+        "ALTER TABLE records_new RENAME TO records",
+    ]
+    + _RECORDS_INDEXES
+    + _RECORDS_TRIGGERS,
+]
+
+
+def migrate(bind):
+    """
+    Bring the database schema up to the latest version.
+
+    Args:
+        bind (sqlalchemy.engine.Engine): Engine for the database to migrate.
+
+    Returns:
+        version (int): Schema version after migrating.
+    """
+    with bind.begin() as connection:
+        version = connection.execute("PRAGMA user_version").scalar()
+        last_archived_id = None
+        if version < len(SCHEMA_MIGRATIONS):
+            last_archived_id = _migrate_archives(connection)
+        for version, statements in enumerate(
+            SCHEMA_MIGRATIONS[version:], start=version + 1
+        ):
+            logger.debug(f"Migrating database schema to version {version}")
+            for statement in statements:
+                connection.execute(statement)
+            connection.execute(f"PRAGMA user_version = {version}")
+        if last_archived_id is not None:
+            # archived records were numbered before IDs were AUTOINCREMENT
+            for statement in _RESERVE_RECORD_IDS:
+                connection.execute(statement, (last_archived_id,))
+    return version
+
+
+_db_ready = False
+
+
+def setup_db():
+    """
+    Create tables and migrate the schema, once per process, on first use.
+    """
+    global _db_ready
+    if not _db_ready:
+        # add the above mappings to database, if they don't already exist
+        Base.metadata.create_all(engine)
+        migrate(engine)
+        _db_ready = True
+
+
+def _new_session():
+    setup_db()
+    return Sessionmkr()
+
+
+# the session (and the database setup) is created when first used
+session = scoped_session(_new_session)
 
 
 def add_record(task, record):
@@ -129,27 +480,184 @@ def add_record(task, record):
     session.commit()
 
 
-def get_records(record_id=None, task_name_or_id=None):
+def save_timer(task, start, end):
+    """
+    Save the record of a stopped timer and remove the timer, in one transaction.
+
+    Only the caller that removes the timer saves a record, so a timer saved by
+    several processes at once gets a single record.
+
+    Args:
+        task (Task): Task that was timed.
+        start (datetime): Start of the timer.
+        end (datetime): End of the timer.
+
+    Returns:
+        record (Record): The saved record, or None if the timer was already saved.
+    """
+    task_id = task.id
+    # end any read transaction, so the delete sees timers removed meanwhile
+    session.commit()
+    removed = (
+        session.query(ActiveTimer)
+        .filter(ActiveTimer.task_id == task_id, ActiveTimer.start == start)
+        .delete(synchronize_session=False)
+    )
+    if not removed:
+        session.rollback()
+        return None
+    record = Record(
+        start=start,
+        end=end,
+        duration=int((end - start).total_seconds()),
+    )
+    task.records.append(record)
+    session.add(record)
+    session.commit()
+    return record
+
+
+def get_active_timers():
+    return session.query(ActiveTimer).order_by(ActiveTimer.start)
+
+
+RECORD_COLUMNS = ("id", "task_id", "task_name", "start", "end", "duration")
+
+
+def get_records(
+    record_id=None,
+    task_name_or_id=None,
+    before_id=None,
+    after=None,
+    newest_first=False,
+    limit=None,
+    archived=False,
+):
+    """
+    Query records, optionally one page at a time.
+
+    Args:
+        record_id (int): Only the record with this ID.
+        task_name_or_id (str or int): Only records of this task.
+        before_id (int): Only records with a lower ID (keyset pagination).
+        after (datetime): Only records started after this time.
+        newest_first (bool): Order by descending rather than ascending ID.
+        limit (int): Maximum number of records.
+        archived (bool): Include archived records started after `after`.
+
+    Returns:
+        query (sqlalchemy.orm.Query): Records ordered by ID; rows with the
+                                      columns of Record if archived.
+    """
+    entity = _archived_records(after) if archived else Record
+    if entity is Record:
+        query = session.query(Record)
+    else:
+        # rows rather than Records, which the identity map would merge if an
+        # archived record had the ID of another record
+        query = session.query(*[getattr(entity, name) for name in RECORD_COLUMNS])
     if record_id:
         try:
             record_id = int(record_id)
-            query = session.query(Record).filter(Record.id == record_id)
+            query = query.filter(entity.id == record_id)
         except ValueError:
             logger.warning("Record ID must be an integer!")
             # query all records instead
-            query = session.query(Record)
     elif task_name_or_id:
         # check if it's a name or an id
         try:
             task_name_or_id = int(task_name_or_id)
-            query = session.query(Record).filter(Record.task_id == task_name_or_id)
+            query = query.filter(entity.task_id == task_name_or_id)
         except ValueError:
-            query = session.query(Record).filter(Record.task_name == task_name_or_id)
+            task_id = session.query(Task.id).filter(Task.name == task_name_or_id)
+            query = query.filter(entity.task_id == task_id.as_scalar())
+    if before_id is not None:
+        query = query.filter(entity.id < before_id)
+    if after is not None:
+        query = query.filter(entity.start > after)
+    query = query.order_by(entity.id.desc() if newest_first else entity.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def get_period_totals(start, end, bucket="day"):
+    """
+    Sum task durations within a period from the daily rollup, grouped by SQLite.
+
+    Args:
+        start (datetime): Beginning of the period (inclusive), truncated to the day.
+        end (datetime): End of the period (exclusive), truncated to the day.
+        bucket (str): "day", "weekday", "week" (calendar week starting on monday),
+                      "month" or None for a single total per task.
+
+    Returns:
+        (pd.DataFrame): One row per bucket and task with columns "start" (first
+                        day in the bucket with any records), "task_id",
+                        "task_name" and "duration", plus "bucket" (first day of
+                        the bucket, or 0 = monday for weekday buckets).
+    """
+    import pandas as pd
+
+    def read():
+        query = _period_totals_query(start, end, bucket)
+        parse_dates = ["start"] if bucket in ("weekday", None) else ["start", "bucket"]
+        return pd.read_sql(query.statement, session.bind, parse_dates=parse_dates)
+
+    return _cached(("period_totals", start, end, bucket), read)
+
+
+# SQL expressions mapping a day to the key of the bucket it belongs to
+PERIOD_BUCKETS = {
+    "day": DailyTotal.day,
+    "weekday": (cast(func.strftime("%w", DailyTotal.day), Integer) + 6) % 7,
+    "week": func.date(DailyTotal.day, "weekday 0", "-6 days"),
+    "month": func.strftime("%Y-%m-01", DailyTotal.day),
+}
+# adds a (task_id, day, seconds) row to the daily totals
+_ADD_DAILY_TOTAL = (
+    "INSERT INTO daily_totals (task_id, day, seconds) VALUES (?, ?, ?) "
+    + "ON CONFLICT (task_id, day) DO UPDATE SET seconds = seconds + excluded.seconds"
+)
+# take the seconds of a task on a day out of its daily total and task total
+_REMOVE_TOTALS = [
+    "UPDATE daily_totals SET seconds = seconds - :seconds "
+    + "WHERE task_id = :task_id AND day = :day",
+    "DELETE FROM daily_totals "
+    + "WHERE task_id = :task_id AND day = :day AND seconds <= 0",
+    "UPDATE tasks SET total = COALESCE(total, 0) - :seconds WHERE id = :task_id",
+]
+
+
+def _period_totals_query(start, end, bucket):
+    columns = [func.min(DailyTotal.day).label("start")]
+    if bucket in PERIOD_BUCKETS:
+        group = [PERIOD_BUCKETS[bucket].label("bucket")]
+        columns += group
+    elif bucket is None:
+        group = []
     else:
-        query = session.query(Record)  # return all records
+        raise ValueError(f"Invalid bucket: {bucket}")
+    group += [DailyTotal.task_id, Task.name]
+    columns += [
+        DailyTotal.task_id,
+        Task.name.label("task_name"),
+        func.sum(DailyTotal.seconds).label("duration"),
+    ]
+    query = (
+        session.query(*columns)
+        .join(Task, Task.id == DailyTotal.task_id)
+        .filter(DailyTotal.day >= _day(start), DailyTotal.day < _day(end))
+        .group_by(*group)
+        .order_by("start", "task_name")
+    )
     return query
 
 
+def _day(dt):
+    return dt.date() if isinstance(dt, datetime) else dt
+
+
 def get_tasks(task_name_or_id=None):
     if task_name_or_id:
         # check if it's a name or an id
@@ -163,8 +671,130 @@ def get_tasks(task_name_or_id=None):
     return query
 
 
+def get_task_totals(task_name_or_id=None):
+    """
+    Query tasks along with their total duration summed from the daily rollup.
+    """
+    total = func.coalesce(func.sum(DailyTotal.seconds), 0).label("total")
+    return (
+        get_tasks(task_name_or_id)
+        .outerjoin(DailyTotal, DailyTotal.task_id == Task.id)
+        .with_entities(Task.id, Task.name, Task.tags, Task.description, total)
+        .group_by(Task.id)
+    )
+
+
+def rebuild_rollups():
+    """
+    Regenerate the daily rollup table from the records table and archives.
+    """
+    setup_db()
+    with engine.begin() as connection:
+        for statement in REBUILD_ROLLUPS:
+            connection.execute(statement)
+        # reports cached from the old rollups are stale
+        connection.execute(_BUMP_VERSION.format("records"))
+        for archive in _archive_connections(connection):
+            rows = archive.execute(
+                "SELECT task_id, date(start), SUM(duration) FROM records "
+                + "GROUP BY task_id, date(start)"
+            ).fetchall()
+            archive.close()
+            for row in rows:
+                connection.execute(_ADD_DAILY_TOTAL, row)
+
+
+# report results kept in memory by a long-running process (see cache_results),
+# as {key: (data versions, result)} in order of use; None when not caching
+_results = None
+RESULTS_CACHED = 32
+
+
+def cache_results():
+    """
+    Keep report query results in memory, reusing them until records or tasks
+    change. Only worth it in a process answering many commands, like `yatta
+    server`.
+    """
+    global _results
+    _results = {}
+
+
+def _data_versions():
+    setup_db()
+    with engine.connect() as connection:
+        query = "SELECT version FROM data_version ORDER BY name"
+        return tuple(version for (version,) in connection.execute(query))
+
+
+def _cached(key, compute):
+    """
+    The DataFrame returned by compute(), reused while results are cached and the
+    records and tasks are unchanged.
+    """
+    if _results is None:
+        return compute()
+    versions = _data_versions()
+    cached = _results.pop(key, None)
+    if cached is None or cached[0] != versions:
+        cached = (versions, compute())
+    _results[key] = cached
+    while len(_results) > RESULTS_CACHED:
+        del _results[next(iter(_results))]
+    # callers may modify the frames they get
+    return cached[1].copy()
+
+
+def get_data_version(table):
+    """
+    Change counter of a table, increased by every write to it.
+
+    Args:
+        table (str): 'tasks' or 'records'.
+
+    Returns:
+        version (int): Current version of the table's data.
+    """
+    setup_db()
+    with engine.connect() as connection:
+        return connection.execute(
+            "SELECT version FROM data_version WHERE name = ?", (table,)
+        ).scalar()
+
+
+def reconcile_totals():
+    """
+    Find task totals that have drifted from their records and fix them.
+
+    Returns:
+        drifted (list): Tuples of (task name, stored total, actual total).
+    """
+    setup_db()
+    with engine.begin() as connection:
+        connection.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS archived_totals (task_id, seconds)"
+        )
+        connection.execute("DELETE FROM archived_totals")
+        for archive in _archive_connections(connection):
+            rows = archive.execute(
+                "SELECT task_id, SUM(duration) FROM records GROUP BY task_id"
+            ).fetchall()
+            archive.close()
+            for row in rows:
+                connection.execute("INSERT INTO archived_totals VALUES (?, ?)", row)
+        drifted = connection.execute(_TOTAL_DRIFT).fetchall()
+        for task_id, _, _, actual in drifted:
+            connection.execute(
+                "UPDATE tasks SET total = ? WHERE id = ?", (actual, task_id)
+            )
+    return [(name, stored, actual) for _, name, stored, actual in drifted]
+
+
 def query_to_df(query):
-    df = pd.read_sql(query.statement, query.session.bind, index_col="id")
+    import pandas as pd
+
+    # read on the session's connection, which may have archives attached
+    df = pd.read_sql(query.statement, query.session.connection(), index_col="id")
     return df
 
 
@@ -181,21 +811,609 @@ def validate_task(task):
         return True
 
 
-def delete_task(task):
-    session.delete(task)
+def delete_tasks(tasks):
+    """
+    Delete tasks in one statement.
+
+    Their records and daily totals are removed by ON DELETE CASCADE, their
+    archived records are deleted from the archive databases.
+
+    Args:
+        tasks (list): Tasks to delete.
+    """
+    task_ids = [task.id for task in tasks]
+    session.query(Task).filter(Task.id.in_(task_ids)).delete(
+        synchronize_session="fetch"
+    )
+    _delete_archived(f"task_id IN ({', '.join('?' * len(task_ids))})", task_ids)
     session.commit()
 
 
-def delete_record(record):
-    session.delete(record)
+def delete_records(record_ids=None, task=None, before=None, shorter_than=None):
+    """
+    Delete all records matching the given filters in one statement, along with
+    the matching archived records.
+
+    Task totals and daily totals are fixed up by triggers in the same
+    transaction.
+
+    Args:
+        record_ids (list): Only records with these IDs.
+        task (Task): Only records of this task.
+        before (datetime): Only records started before this time.
+        shorter_than (int): Only records lasting fewer seconds than this.
+
+    Returns:
+        count (int): Number of records deleted.
+    """
+    query = session.query(Record)
+    # the same filters, for the archives
+    conditions, params = ["1"], []
+    if record_ids:
+        query = query.filter(Record.id.in_(record_ids))
+        conditions.append(f"id IN ({', '.join('?' * len(record_ids))})")
+        params += record_ids
+    if task is not None:
+        query = query.filter(Record.task_id == task.id)
+        conditions.append("task_id = ?")
+        params.append(task.id)
+    if before is not None:
+        query = query.filter(Record.start < before)
+        conditions.append("start < ?")
+        params.append(before.strftime(utils.DATETIME_FORMAT))
+    if shorter_than is not None:
+        query = query.filter(Record.duration < shorter_than)
+        conditions.append("duration < ?")
+        params.append(shorter_than)
+    count = query.delete(synchronize_session=False)
+    count += _delete_archived(" AND ".join(conditions), params)
     session.commit()
+    return count
 
 
-def update_task_total(task):
-    total = (
-        session.query(func.sum(Record.duration))
-        .filter(Record.task_id == task.id)
-        .first()[0]
+# bulk import: each batch is staged in a temp table, rows already present are
+# removed from it, and the rest is copied into records. Daily totals, task totals
+# and the data version are updated from the staged rows once per batch, instead
+# of by the per-row insert triggers.
+_IMPORT_STAGING = (
+    "CREATE TEMP TABLE IF NOT EXISTS import_staging "
+    + '(task_id INTEGER, start VARCHAR, "end" VARCHAR, duration INTEGER)'
+)
+_IMPORT_STAGED = [
+    # the first, uncorrelated EXISTS is evaluated once and skips the lookups
+    # when no record starts within the batch's period, e.g. for a fresh import
+    """
+    DELETE FROM import_staging WHERE EXISTS (
+        SELECT 1 FROM records WHERE start
+        BETWEEN (SELECT MIN(start) FROM import_staging)
+        AND (SELECT MAX(start) FROM import_staging)
+    ) AND EXISTS (
+        SELECT 1 FROM records AS r
+        WHERE r.task_id = import_staging.task_id
+        AND r.start = import_staging.start AND r."end" = import_staging."end"
     )
-    task.total = total
-    session.commit()
+    """,
+    """
+    INSERT INTO records (task_id, start, "end", duration)
+    SELECT task_id, start, "end", duration FROM import_staging ORDER BY start
+    """,
+    """
+    SELECT task_id, date(start), SUM(duration) FROM import_staging
+    GROUP BY task_id, date(start)
+    """,
+]
+# insert triggers on records, replaced by the statements above during an import
+_IMPORT_TRIGGERS = {
+    "records_rollup_insert": _ROLLUP_INSERT_TRIGGER,
+    "records_total_insert": _TOTAL_INSERT_TRIGGER,
+    "records_version_insert": _version_trigger("records", "INSERT"),
+}
+
+
+def _import_batch(cursor, batch):
+    """
+    Import a batch of (task_id, start, end, duration) rows, keyed by their first
+    three columns so that duplicates within the batch are dropped.
+    """
+    unique = batch.values()
+    cursor.execute("DELETE FROM import_staging")
+    cursor.executemany("INSERT INTO import_staging VALUES (?, ?, ?, ?)", unique)
+    cursor.execute(_IMPORT_STAGED[0])
+    imported = len(unique) - cursor.rowcount
+    if not imported:
+        return 0
+    # the triggers are dropped and recreated within the transaction
+    for trigger in _IMPORT_TRIGGERS:
+        cursor.execute(f"DROP TRIGGER {trigger}")
+    cursor.execute(_IMPORT_STAGED[1])
+    days = cursor.execute(_IMPORT_STAGED[2]).fetchall()
+    cursor.executemany(_ADD_DAILY_TOTAL, days)
+    totals = {}
+    for task_id, _, seconds in days:
+        totals[task_id] = totals.get(task_id, 0) + seconds
+    cursor.executemany(
+        "UPDATE tasks SET total = COALESCE(total, 0) + ? WHERE id = ?",
+        [(seconds, task_id) for task_id, seconds in totals.items()],
+    )
+    cursor.execute(_BUMP_VERSION.format("records"))
+    for trigger in _IMPORT_TRIGGERS.values():
+        cursor.execute(trigger)
+    return imported
+
+
+def import_records(rows, batch_size=50000):
+    """
+    Bulk insert records, skipping any that already exist, archived or not.
+
+    Tasks are created as needed and each batch is written in its own
+    transaction.
+
+    Args:
+        rows (iterable): Tuples of (task name, start, end, duration), where start
+                         and end are strings in utils.DATETIME_FORMAT.
+        batch_size (int): Number of records per transaction.
+
+    Returns:
+        (tuple): Number of records imported and number of duplicates skipped.
+    """
+    setup_db()
+    connection = engine.raw_connection()
+    # manage transactions by hand so DDL stays inside them
+    connection.connection.isolation_level = None
+    imported = total = 0
+    try:
+        cursor = connection.cursor()
+        cursor.execute(_IMPORT_STAGING)
+        task_ids = dict(cursor.execute("SELECT name, id FROM tasks"))
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                break
+            cursor.execute("BEGIN")
+            # new tasks in the order they first appear
+            for name in dict.fromkeys(row[0] for row in chunk):
+                if name not in task_ids:
+                    cursor.execute(
+                        "INSERT INTO tasks (name, total) VALUES (?, 0)", (name,)
+                    )
+                    task_ids[name] = cursor.lastrowid
+            batch = {}
+            for name, start, end, duration in chunk:
+                task_id = task_ids[name]
+                batch[task_id, start, end] = (task_id, start, end, duration)
+            starts = [start for _, start, _ in batch]
+            for key in _archived_keys(cursor, min(starts), max(starts)):
+                batch.pop(key, None)
+            imported += _import_batch(cursor, batch)
+            total += len(chunk)
+            cursor.execute("COMMIT")
+    except BaseException:
+        if connection.connection.in_transaction:
+            cursor.execute("ROLLBACK")
+        raise
+    finally:
+        connection.connection.isolation_level = ""
+        connection.close()
+    return imported, total - imported
+
+
+def export_records(task_name_or_id=None, start=None, end=None, chunk_size=10000):
+    """
+    Stream records in the format accepted by import_records.
+
+    Rows are fetched from the cursor in chunks, so memory use does not depend
+    on the number of records.
+
+    Args:
+        task_name_or_id (str or int): Only records of this task.
+        start (datetime): Only records started at or after this time.
+        end (datetime): Only records started before this time.
+        chunk_size (int): Number of rows fetched at a time.
+
+    Yields:
+        (tuple): Task name, start, end and duration of a record, ordered by start.
+    """
+    arm = (
+        'SELECT tasks.name, records.start, records."end", records.duration '
+        + "FROM {}.records AS records JOIN tasks ON tasks.id = records.task_id"
+    )
+    conditions, params = [], []
+    if task_name_or_id:
+        try:
+            params.append(int(task_name_or_id))
+            conditions.append("records.task_id = ?")
+        except ValueError:
+            params.append(task_name_or_id)
+            conditions.append("tasks.name = ?")
+    if start is not None:
+        params.append(start.strftime(utils.DATETIME_FORMAT))
+        conditions.append("records.start >= ?")
+    if end is not None:
+        params.append(end.strftime(utils.DATETIME_FORMAT))
+        conditions.append("records.start < ?")
+    if conditions:
+        arm += " WHERE " + " AND ".join(conditions)
+    setup_db()
+    connection = engine.raw_connection()
+    try:
+        schemas = ["main"] + _attach_archives(connection, start, end)
+        # SQLite merges the arms, each read in order from its start index
+        query = " UNION ALL ".join(arm.format(schema) for schema in schemas)
+        cursor = connection.cursor()
+        cursor.execute(query + " ORDER BY start", params * len(schemas))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        connection.close()
+
+
+# archives: records older than a cutoff live in one database file per year,
+# listed in the archives table and attached to a connection only when a query
+# reaches into their date range. Daily totals and task totals keep counting
+# archived records, so reports never need the archives.
+ARCHIVE_LIMIT = 10  # databases SQLite can attach at once
+_ARCHIVE_COLUMNS = 'id, task_id, start, "end", duration'
+_ARCHIVE_TABLE = (
+    "CREATE TABLE {} (id INTEGER PRIMARY KEY, task_id INTEGER, "
+    + 'start DATETIME NOT NULL, "end" DATETIME NOT NULL, duration INTEGER NOT NULL)'
+)
+ARCHIVE_SCHEMA = [_ARCHIVE_TABLE.format("records")] + _RECORDS_INDEXES
+# schema changes for archives created by earlier versions, applied like
+# SCHEMA_MIGRATIONS when an archive is opened or the main database migrated
+ARCHIVE_MIGRATIONS = [
+    # 1: integer task_id without task_name, like migration 7 of records
+    [
+        "DROP TABLE IF EXISTS records_new",
+        _ARCHIVE_TABLE.format("records_new"),
+        f"INSERT INTO records_new ({_ARCHIVE_COLUMNS}) "
+        + 'SELECT id, CAST(task_id AS INTEGER), start, "end", duration FROM records',
+        "DROP TABLE records",
+        "ALTER TABLE records_new RENAME TO records",
+    ]
+    + _RECORDS_INDEXES,
+]
+
+
+def _archive_schema(year):
+    return f"archive_{year}"
+
+
+def _open_archive(path):
+    """
+    Connect to an archive database, creating or migrating its schema first.
+
+    Args:
+        path (str): Path of the archive, relative to the data dir.
+
+    Returns:
+        (sqlite3.Connection): Connection to the archive; the caller closes it.
+    """
+    connection = sqlite3.connect(os.path.join(DATA_DIR, path))
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version == len(ARCHIVE_MIGRATIONS):
+        return connection
+    exists = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'records'"
+    ).fetchone()
+    if exists:
+        statements = [
+            statement
+            for migration in ARCHIVE_MIGRATIONS[version:]
+            for statement in migration
+        ]
+    else:
+        statements = ARCHIVE_SCHEMA
+    # manage the transaction by hand so DDL stays inside it
+    connection.isolation_level = None
+    try:
+        connection.execute("BEGIN")
+        for statement in statements:
+            connection.execute(statement)
+        connection.execute(f"PRAGMA user_version = {len(ARCHIVE_MIGRATIONS)}")
+        connection.execute("COMMIT")
+    except BaseException:
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        connection.close()
+        raise
+    connection.isolation_level = ""
+    return connection
+
+
+def _migrate_archives(connection):
+    """
+    Bring the archives listed in a database up to the latest archive schema.
+
+    Returns:
+        last_id (int): Highest ID of an archived record, or None.
+    """
+    catalog = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'archives'"
+    ).scalar()
+    last_id = None
+    for (path,) in (
+        connection.execute("SELECT path FROM archives").fetchall() if catalog else []
+    ):
+        archive = _open_archive(path)
+        try:
+            (archived_id,) = archive.execute("SELECT MAX(id) FROM records").fetchone()
+        finally:
+            archive.close()
+        if archived_id is not None:
+            last_id = max(last_id or 0, archived_id)
+    return last_id
+
+
+def _archive_connections(connection):
+    """
+    Open each archive database in turn, oldest first.
+
+    Args:
+        connection: Connection to the main database, to read the catalog.
+
+    Yields:
+        (sqlite3.Connection): Connection to an archive; the caller closes it.
+    """
+    for (path,) in connection.execute(
+        "SELECT path FROM archives ORDER BY year"
+    ).fetchall():
+        yield _open_archive(path)
+
+
+def _attach_archives(dbapi_connection, start=None, end=None):
+    """
+    Attach the archives holding records started within [start, end) to a
+    connection, detaching any others.
+
+    Args:
+        dbapi_connection (sqlite3.Connection): Connection to the main database.
+        start (datetime): Beginning of the period, or None for no lower bound.
+        end (datetime): End of the period, or None for no upper bound.
+
+    Returns:
+        schemas (list): Schema names of the attached archives, oldest first.
+    """
+    query, params = "SELECT year, path FROM archives WHERE records > 0", []
+    if start is not None:
+        query += " AND last_start >= ?"
+        params.append(start.strftime(utils.DATETIME_FORMAT))
+    if end is not None:
+        query += " AND first_start < ?"
+        params.append(end.strftime(utils.DATETIME_FORMAT))
+    archives = {
+        _archive_schema(year): path
+        for year, path in dbapi_connection.execute(query + " ORDER BY year", params)
+    }
+    if len(archives) > ARCHIVE_LIMIT:
+        raise ValueError(
+            f"The period spans {len(archives)} archives, but at most "
+            + f"{ARCHIVE_LIMIT} can be read at once. Choose a shorter period."
+        )
+    attached = {name for _, name, _ in dbapi_connection.execute("PRAGMA database_list")}
+    for schema in attached - set(archives) - {"main", "temp"}:
+        dbapi_connection.execute(f"DETACH DATABASE {schema}")
+    for schema, path in archives.items():
+        if schema not in attached:
+            dbapi_connection.execute(
+                f"ATTACH DATABASE ? AS {schema}", (os.path.join(DATA_DIR, path),)
+            )
+    return list(archives)
+
+
+def _archived_records(start=None, end=None):
+    """
+    Record entity reading the records table together with the archives that
+    overlap [start, end), attached to the session's connection.
+    """
+    from sqlalchemy import column, select, table, union_all
+    from sqlalchemy.orm import aliased
+
+    schemas = _attach_archives(session.connection().connection, start, end)
+    if not schemas:
+        return Record
+    columns = Record.__table__.columns
+    archives = [
+        table("records", *[column(c.name, c.type) for c in columns], schema=schema)
+        for schema in schemas
+    ]
+
+    def _select(records):
+        # the task_name column_property would lose its label when adapted
+        task_name = (
+            select([Task.name])
+            .where(Task.id == records.c.task_id)
+            .as_scalar()
+            .label("task_name")
+        )
+        return select([records, task_name])
+
+    records = union_all(*[_select(t) for t in [Record.__table__] + archives])
+    return aliased(Record, records.alias("records"), adapt_on_names=True)
+
+
+def _delete_archived(where, params):
+    """
+    Delete the archived records matching a condition and update the archive
+    catalog. Daily totals and task totals count archived records, so the
+    records are taken out of them too.
+
+    Args:
+        where (str): SQL condition on the records table of an archive.
+        params (list): Parameters of the condition.
+
+    Returns:
+        count (int): Number of records deleted.
+    """
+    count = 0
+    for year, path in session.query(Archive.year, Archive.path).all():
+        connection = _open_archive(path)
+        try:
+            with connection:
+                days = connection.execute(
+                    "SELECT task_id, date(start), SUM(duration) FROM records "
+                    + f"WHERE {where} GROUP BY task_id, date(start)",
+                    params,
+                ).fetchall()
+                if not days:
+                    continue
+                count += connection.execute(
+                    f"DELETE FROM records WHERE {where}", params
+                ).rowcount
+                first, last, records = connection.execute(
+                    "SELECT MIN(start), MAX(start), COUNT(*) FROM records"
+                ).fetchone()
+        finally:
+            connection.close()
+        for task_id, day, seconds in days:
+            for statement in _REMOVE_TOTALS:
+                session.execute(
+                    statement, {"task_id": task_id, "day": day, "seconds": seconds}
+                )
+        session.execute(
+            "UPDATE archives SET first_start = :first, last_start = :last, "
+            + "records = :records WHERE year = :year",
+            {"first": first, "last": last, "records": records, "year": year},
+        )
+    if count:
+        session.execute(_BUMP_VERSION.format("records"))
+    return count
+
+
+def _archived_keys(cursor, first, last):
+    """
+    Task ID, start and end of the archived records started within [first, last].
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the main database, to read the catalog.
+        first (str): Earliest start, in utils.DATETIME_FORMAT.
+        last (str): Latest start, in utils.DATETIME_FORMAT.
+
+    Returns:
+        keys (set): Tuples of (task_id, start, end).
+    """
+    keys = set()
+    for (path,) in cursor.execute(
+        "SELECT path FROM archives WHERE records > 0 "
+        + "AND last_start >= ? AND first_start <= ?",
+        (first, last),
+    ).fetchall():
+        archive = _open_archive(path)
+        try:
+            keys.update(
+                archive.execute(
+                    'SELECT task_id, start, "end" FROM records '
+                    + "WHERE start BETWEEN ? AND ?",
+                    (first, last),
+                )
+            )
+        finally:
+            archive.close()
+    return keys
+
+
+def get_archives():
+    return session.query(Archive).order_by(Archive.year)
+
+
+def archive_records(before):
+    """
+    Move records started before a cutoff into per-year archive databases.
+
+    Daily totals and task totals are left as they are, so reports and task
+    totals still count archived records. Each year is moved in one transaction.
+
+    Args:
+        before (datetime): Cutoff; records started before it are archived.
+
+    Returns:
+        moved (dict): Number of records moved into each year's archive.
+
+    Raises:
+        ValueError: If a record has the ID of a different archived record; that
+                    year's records are left in place.
+    """
+    setup_db()
+    cutoff = before.strftime(utils.DATETIME_FORMAT)
+    connection = engine.raw_connection()
+    # manage transactions by hand so DDL stays inside them
+    connection.connection.isolation_level = None
+    moved = {}
+    try:
+        cursor = connection.cursor()
+        years = [
+            int(year)
+            for (year,) in cursor.execute(
+                "SELECT DISTINCT strftime('%Y', start) FROM records WHERE start < ?",
+                (cutoff,),
+            ).fetchall()
+        ]
+        for year in years:
+            schema, path = _archive_schema(year), f"yatta-{year}.db"
+            _open_archive(path).close()
+            cursor.execute(
+                f"ATTACH DATABASE ? AS {schema}", (os.path.join(DATA_DIR, path),)
+            )
+            selection = (
+                "FROM records WHERE start >= ? AND start < ?",
+                (f"{year}-01-01", min(cutoff, f"{year + 1}-01-01")),
+            )
+            cursor.execute("BEGIN")
+            # skip copies left by a move interrupted between the commits of the
+            # two databases; any other record with the same ID aborts the move
+            try:
+                cursor.execute(
+                    f"INSERT INTO {schema}.records ({_ARCHIVE_COLUMNS}) "
+                    + f"SELECT {_ARCHIVE_COLUMNS} "
+                    + selection[0]
+                    + f" AND NOT EXISTS (SELECT 1 FROM {schema}.records AS copy "
+                    + "WHERE copy.id = records.id "
+                    + "AND copy.task_id IS records.task_id "
+                    + "AND copy.start = records.start "
+                    + 'AND copy."end" = records."end" '
+                    + "AND copy.duration = records.duration)",
+                    selection[1],
+                )
+            except sqlite3.IntegrityError:
+                raise ValueError(
+                    f"Records from {year} have the IDs of other records in {path}, "
+                    + "so they were not archived."
+                )
+            # keep the archived time in daily totals and task totals
+            cursor.execute("DROP TRIGGER records_rollup_delete")
+            cursor.execute("DROP TRIGGER records_total_delete")
+            cursor.execute("DELETE " + selection[0], selection[1])
+            moved[year] = cursor.rowcount
+            cursor.execute(_ROLLUP_DELETE_TRIGGER)
+            cursor.execute(_TOTAL_DELETE_TRIGGER)
+            cursor.execute(
+                "INSERT OR REPLACE INTO archives "
+                + "SELECT ?, ?, MIN(start), MAX(start), COUNT(*) "
+                + f"FROM {schema}.records",
+                (year, path),
+            )
+            cursor.execute("COMMIT")
+            cursor.execute(f"DETACH DATABASE {schema}")
+    except BaseException:
+        if connection.connection.in_transaction:
+            cursor.execute("ROLLBACK")
+        raise
+    finally:
+        connection.connection.isolation_level = ""
+        connection.close()
+    return moved
+
+
+def vacuum():
+    """
+    Rebuild the database file, returning the space freed by archiving.
+    """
+    setup_db()
+    connection = engine.raw_connection()
+    try:
+        connection.execute("VACUUM")
+    finally:
+        connection.close()
@@ -0,0 +1,111 @@
+"""
+Report periods: the date range and bucket size of a timesheet or plot.
+
+Kept apart from yatta.plotting so commands can resolve a period without
+importing pandas.
+"""
+from datetime import datetime, timedelta
+
+import click
+
+# bucket each report period is split into, see yatta.db.get_period_totals()
+PERIOD_BUCKETS = {
+    "day": None,
+    "week": "weekday",
+    "month": "week",
+    "quarter": "week",
+    "year": "month",
+}
+
+
+def _period_start(period, date):
+    """
+    Find the start of the report period containing a date.
+
+    Args:
+        period (string): "day", "week", "month", "quarter" or "year".
+        date (datetime): Any time within the period.
+
+    Returns:
+        (datetime): Midnight on the first day of the period.
+    """
+    day = datetime(*date.timetuple()[:3])
+    if period == "day":
+        return day
+    elif period == "week":
+        return day - timedelta(days=day.weekday())
+    elif period == "month":
+        return day.replace(day=1)
+    elif period == "quarter":
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    elif period == "year":
+        return day.replace(month=1, day=1)
+    else:
+        raise ValueError(f"Invalid period: {period}")
+
+
+def _period_end(period, start_date):
+    """
+    Find the (exclusive) end of a report period.
+
+    Args:
+        period (string): "day", "week", "month", "quarter" or "year".
+        start_date (datetime): Start of the period.
+
+    Returns:
+        (datetime): Start of the following period.
+    """
+    if period == "day":
+        return start_date + timedelta(days=1)
+    elif period == "week":
+        return start_date + timedelta(days=7)
+    elif period in ("month", "quarter"):
+        year, month = start_date.timetuple()[:2]
+        month += 0 if period == "month" else 2
+        return datetime(year + month // 12, month % 12 + 1, 1)
+    elif period == "year":
+        return datetime(start_date.year + 1, 1, 1)
+    else:
+        raise ValueError(f"Invalid period: {period}")
+
+
+def _range_bucket(start_date, end_date):
+    """
+    Pick the bucket for a custom report range, aiming for at most ~15 rows.
+    """
+    days = (end_date - start_date).days
+    if days <= 1:
+        return None
+    elif days <= 15:
+        return "day"
+    elif days <= 105:
+        return "week"
+    return "month"
+
+
+def report_range(period, date=None, from_date=None, to_date=None):
+    """
+    Resolve a report period to its start, end and bucket.
+
+    Args:
+        period (string): "day", "week", "month", "quarter" or "year", ignored if
+                         from_date is given.
+        date (datetime): Any time within the period.
+        from_date (datetime): First day of a custom range.
+        to_date (datetime): Last day (inclusive) of a custom range, default today.
+
+    Returns:
+        (tuple): Start (inclusive) and end (exclusive) datetime, and the bucket
+                 to pass to yatta.db.get_period_totals().
+
+    Raises:
+        click.UsageError: If to_date is given without from_date.
+    """
+    if from_date is None and to_date is not None:
+        raise click.UsageError("--to needs --from, the first day of the range.")
+    if from_date is not None:
+        start_date = _period_start("day", from_date)
+        end_date = _period_end("day", _period_start("day", to_date or datetime.now()))
+        return start_date, end_date, _range_bucket(start_date, end_date)
+    start_date = _period_start(period, date or datetime.now())
+    return start_date, _period_end(period, start_date), PERIOD_BUCKETS[period]
@@ -1,4 +1,5 @@
 import logging
+import sys
 from datetime import datetime, timedelta
 
 import colorama as co
@@ -10,7 +11,7 @@ from yatta import utils as utils
 logger = logging.getLogger(__name__)
 
 plot_unit = "▇"
-co.init(autoreset=True)
+RESET = co.Style.RESET_ALL
 
 days = {0: "mon", 1: "tue", 2: "wed", 3: "thu", 4: "fri", 5: "sat", 6: "sun"}
 
@@ -44,133 +45,90 @@ def _weekday_to_label(weekday):
     return days[weekday]
 
 
-def _month_split(year, month):
+def _date_label(first, last=None):
     """
-    Split month into calendar weeks.
+    Label a day, or a range of days, leaving out the current year.
+    """
+    fmt = "%d %b" if (last or first).year == datetime.now().year else "%d %b %Y"
+    if last is None:
+        return f"{days[first.weekday()]} {first.strftime(fmt)}"
+    head = "%d" if (first.year, first.month) == (last.year, last.month) else "%d %b"
+    return f"{first.strftime(head)}-{last.strftime(fmt)}"
+
+
+def _bucket_labels(keys, bucket, start_date, end_date):
+    """
+    Labels for the buckets of a report, with week ranges clipped to the report.
+    """
+    if bucket == "weekday":
+        return [days[key] for key in keys]
+    elif bucket == "day":
+        return [_date_label(key) for key in keys]
+    elif bucket == "week":
+        last = end_date - timedelta(days=1)
+        return [
+            _date_label(max(key, start_date), min(key + timedelta(days=6), last))
+            for key in keys
+        ]
+    elif bucket == "month":
+        last = end_date - timedelta(days=1)
+        same_year = start_date.year == last.year == datetime.now().year
+        fmt = "%b" if same_year else "%b %Y"
+        return [key.strftime(fmt) for key in keys]
+    raise ValueError(f"Invalid bucket: {bucket}")
+
+
+def _task_order(df, bucket):
+    """
+    Order task names like the reports always have: by name for a single bucket,
+    otherwise by their first bucket, breaking ties by name.
+
+    Totals are daily, so tasks first worked on the same day are ordered by name
+    rather than by the time of their first record.
 
     Args:
-        year (int)
-        month (int)
+        df (pd.DataFrame): Dataframe with "task_name" columns, and "bucket"
+                           unless bucket is None.
+        bucket (string): Bucket the totals were grouped by, or None.
 
     Returns:
-        weeks (dict): Dict of tuples with start/end datetime for each calendar week.
+        (pd.Index): Unique task names.
     """
-    _date = datetime(year, month, 1)
-    dow = _date.weekday()
-    weeks = {}
-    i = 0
-    while _date.month == month:
-        year, month, day = _date.timetuple()[:3]
-        try:
-            weeks[i] = (
-                datetime(year, month, day),
-                datetime(year, month, day + (6 - dow)),
-            )
-        except ValueError:
-            # adjust end datetime if it would end in a new month
-            weeks[i] = (
-                datetime(year, month, day),
-                datetime(year, month + 1, 1) - timedelta(days=1),
-            )
-        try:
-            _date += timedelta(days=7)
-        except ValueError:
-            # adjust end datetime if it would end in a new month
-            _date = datetime(year, month + 1, 1) - timedelta(days=1)
-        i += 1
-
-    return weeks
-
-
-def _preproc_data(data, period, start_date):
+    if bucket is None:
+        return pd.Index(sorted(df["task_name"].unique()))
+    first = df.groupby("task_name")["bucket"].min().reset_index()
+    return pd.Index(first.sort_values(["bucket", "task_name"])["task_name"])
+
+
+def _preproc_data(data, bucket, start_date, end_date):
     """
-    Take dataframe returned from yatta.db.query_to_df() and format for
-    timesheet or plotting in hbar_stack()
+    Take bucketed totals returned from yatta.db.get_period_totals() and format
+    them for timesheet or plotting in hbar() and hbar_stack()
 
     Args:
-        data (pd.DataFrame): Dataframe from yatta.db.query_to_df()
+        data (pd.DataFrame): Task totals from yatta.db.get_period_totals()
+        bucket (string): Bucket the totals were grouped by, or None.
+        start_date (datetime): Start of the report (inclusive).
+        end_date (datetime): End of the report (exclusive).
 
     Returns:
         data (pd.DataFrame): Dataframe with string index labels and unique tasks as
                              columns
     """
-    if period == "day":
-        df = data[
-            (data["start"] >= start_date)
-            & (data["start"] < start_date + timedelta(days=1))
-        ]
-        if df.empty:
-            return df
-        df = df.groupby(["task_name", "task_id"]).sum().droplevel("task_id").T
-        df.columns = df.columns.values
-        data_fmt = df
-    elif period == "week":
-        df = data[
-            (data["start"] >= start_date)
-            & (data["start"] < start_date + timedelta(days=7))
-        ]
-        if df.empty:
-            return df
-        # break up into days, format df
-        group = df.groupby(["start", "task_name"])
-        df = group.sum().reset_index()
-        df["weekday"] = df["start"].dt.weekday.apply(_weekday_to_label)
-        # build properly formatted dataframe
-        data_fmt = pd.DataFrame(index=days.values(), columns=df["task_name"].unique())
-        for col in data_fmt.columns:
-            task_df = df.loc[df["task_name"] == col]
-            data_fmt.loc[task_df["weekday"], col] = task_df.groupby(["weekday"]).sum()[
-                "duration"
-            ]
-        data_fmt = data_fmt.dropna(axis=0, how="all").fillna(0)
-    elif period == "month":
-        year, month, day = start_date.timetuple()[:3]
-        df = data[
-            (data["start"] >= start_date)
-            & (data["start"] < datetime(year, month + 1, day))
-        ].sort_values(["start"])
-        if df.empty:
-            return df
-        # Split data into calendar weeks...
-        df["week"] = 0
-        weeks = _month_split(year, month)
-        for week, week_range in weeks.items():
-            df.loc[
-                (df["start"] >= week_range[0]) & (df["start"] < week_range[1]), "week"
-            ] = week
-        df = df.groupby(["week", "task_name"]).sum()
-        tmp = pd.DataFrame(
-            columns=df.index.get_level_values(1).unique().values,
-            index=df.index.get_level_values(0).unique().values,
-        )
-        data_fmt = df.loc[df.index.get_level_values(0) == 0].T
-        for col in tmp.columns:
-            for week in tmp.index:
-                val = df.loc[
-                    (df.index.get_level_values(1) == col)
-                    & (df.index.get_level_values(0) == week),
-                    "duration",
-                ].values
-                try:
-                    tmp.loc[week, col] = val[0]
-                except IndexError:
-                    tmp.loc[week, col] = 0
-        # convert from week index to date range
-        if year == datetime.now().year:
-            tmp.index = [
-                f"{weeks[i][0].strftime('%d')}-{weeks[i][1].strftime('%d %b')}"
-                for i in tmp.index
-            ]
-        else:
-            tmp.index = [
-                f"{weeks[i][0].strftime('%d')}-{weeks[i][1].strftime('%d %b %Y')}"
-                for i in tmp.index
-            ]
-
-        data_fmt = tmp
+    if data.empty:
+        return data
+    if bucket is None:
+        data_fmt = data.set_index("task_name")[["duration"]].T
+        data_fmt = data_fmt[_task_order(data, bucket)]
     else:
-        logger.error("Invalid plot period!")
-
+        # pivot tasks into columns
+        data_fmt = (
+            data.set_index(["bucket", "task_name"])["duration"]
+            .unstack(fill_value=0)
+            .reindex(columns=_task_order(data, bucket))
+        )
+        data_fmt.index = _bucket_labels(data_fmt.index, bucket, start_date, end_date)
+    data_fmt.columns = data_fmt.columns.values
     return data_fmt
 
 
@@ -179,83 +137,133 @@ def _normalize_data(y, columns=50, norm_factor=1):
     Normalize dependent variable to screen width.
 
     Args:
-        y (np.array): Numpy array of ints or floats.
+        y (np.array): Numpy array of ints or floats, of any shape.
         columns (int): Maximum screen columns.
 
     Returns:
-        y (np.array): Normalized list of ints.
+        y (np.array): Normalized array of ints, rounded half to even.
+    """
+    return np.rint(np.asarray(y, dtype=float) / norm_factor * columns).astype(int)
+
+
+def _rank_columns(norm):
+    """
+    Column order of each row by descending value, with ties broken like
+    pd.Series.sort_values(ascending=False).
     """
-    y = (y / norm_factor) * columns
-    y = [int(np.round(val, 0)) for val in y]
-    return y
+    n = norm.shape[1]
+    return (n - 1 - norm[:, ::-1].argsort(axis=1, kind="quicksort"))[:, ::-1]
 
 
-def hbar(data, columns=50):
+def _use_color(stream):
+    # colorama strips colors from output that isn't a terminal, do the same
+    return stream.isatty()
+
+
+def _write(frame, color):
+    """
+    Write a whole frame to stdout with a single call.
+    """
+    if color and sys.platform == "win32":
+        co.init()  # translate ANSI codes for the Windows console
+    sys.stdout.write(frame)
+    sys.stdout.flush()
+
+
+def hbar(data, columns=50, color=None):
     """
     Print horizontal bar chart to stdout.
 
     Args:
-        data (pd.Series): Data to plot.
+        data (pd.DataFrame): Data to plot, one 'duration' row.
         columns (int): Maximum screen columns.
+        color (bool): Use colors, by default if stdout is a terminal.
 
     Returns:
         None
     """
-    norm_factor = data.values.max()
-    data_norm = data.apply(_normalize_data, args=([columns, norm_factor]))
-    data_norm = data_norm.T.sort_values("duration", ascending=False).T
-    print()
-    for n, col in enumerate(data_norm.columns):
-        val = data_norm[col].values[0]
-        s = plot_unit * val
-        print(
-            f"{co.Fore.RESET}{utils.time_print(data[col].values[0])} "
-            + f"{fcolors[(n % len(fcolors))]}{s} {col}"
-        )
+    if color is None:
+        color = _use_color(sys.stdout)
+    _write(hbar_frame(data, columns, color), color)
+
 
+def hbar_frame(data, columns=50, color=False):
+    """
+    Render the horizontal bar chart printed by hbar().
 
-def hbar_stack(data, columns=50, show_legend=True):
+    Returns:
+        (str): The chart, ending in a newline.
+    """
+    values = data.to_numpy()[0]
+    norm = _normalize_data(values, columns, values.max())
+    lines = [""]
+    for n, i in enumerate(_rank_columns(norm[np.newaxis])[0]):
+        time = utils.time_print(values[i])
+        bar = f"{plot_unit * norm[i]} {data.columns[i]}"
+        if color:
+            fc = fcolors[n % len(fcolors)]
+            lines.append(f"{co.Fore.RESET}{time} {fc}{bar}{RESET}")
+        else:
+            lines.append(f"{time} {bar}")
+    return "\n".join(lines) + "\n"
+
+
+def hbar_stack(data, columns=50, show_legend=True, color=None):
     """
     Print horizontal bar chart to stdout.
 
     Args:
         data (pd.DataFrame): Data to plot.
         columns (int): Maximum screen columns.
+        show_legend (bool): Print a color legend below the chart.
+        color (bool): Use colors, by default if stdout is a terminal.
 
     Returns:
         None
     """
-    labels = data.index
-    norm_factor = data.T.sum().max()
-    data_norm = data.apply(_normalize_data, args=([columns, norm_factor]))
-    legend = {}
-    print()
-    for i in range(len(data_norm.index)):
-        print(f"{co.Fore.BLUE}{str(labels[i])}: ", end="")
-        sorted_row = data_norm.iloc[i].sort_values(ascending=False)
-        for n, val in enumerate(sorted_row):
-            fc = fcolors[n % len(fcolors)]
-            label = sorted_row.index[n]
-            if label not in legend:
-                legend[label] = fc
-            s = plot_unit * val
-            print(f"{legend[label]}{s}", end="")
-        print(f" {utils.time_print(data.iloc[i].sum())}")
+    if color is None:
+        color = _use_color(sys.stdout)
+    _write(hbar_stack_frame(data, columns, show_legend, color), color)
+
+
+def hbar_stack_frame(data, columns=50, show_legend=True, color=False):
+    """
+    Render the stacked horizontal bar chart printed by hbar_stack().
+
+    Returns:
+        (str): The chart, ending in a newline.
+    """
+    values = data.to_numpy()
+    norm = _normalize_data(values, columns, values.sum(axis=1).max())
+    order = _rank_columns(norm)
+    totals = values.sum(axis=1)
+    tasks = data.columns
+    # tasks keep the color of their rank in the first row
+    legend = {tasks[i]: fcolors[n % len(fcolors)] for n, i in enumerate(order[0])}
+    lines = [""]
+    for row, label in enumerate(data.index):
+        bars = [(tasks[i], plot_unit * norm[row, i]) for i in order[row]]
+        total = utils.time_print(totals[row])
+        if color:
+            bars = "".join(f"{legend[task]}{bar}" for task, bar in bars)
+            lines.append(f"{co.Fore.BLUE}{label}: {RESET}{bars}{RESET} {total}")
+        else:
+            lines.append(f"{label}: {''.join(bar for _, bar in bars)} {total}")
 
     # color legend
     # pad legend to same column as actual plotted data
     # eg: "mon: " --> legend_pad = 5, "01-08 Jun: " --> legend_pad = 11
     if show_legend:
-        legend_pad = len(data_norm.index.values[0]) + 2
-        pad = " " * legend_pad
-        print()
-        print(pad, end="")
-        i = 1
+        pad = " " * (len(data.index.values[0]) + 2)
         rows = int(columns / 10)
-        for label, fc in legend.items():
-            if i % rows != 0:
-                print(f"{fc}{plot_unit*3} {label} ", end="  ")
-            else:
-                print(f"\n{pad}{fc}{plot_unit*3} {label} ", end="  ")
-            i += 1
-        print()
+        entries = [f"{plot_unit * 3} {task} " for task in legend]
+        if color:
+            entries = [f"{fc}{e}{RESET}" for fc, e in zip(legend.values(), entries)]
+        lines.append("")
+        legend_lines = [pad]
+        for i, entry in enumerate(entries, 1):
+            if i % rows == 0:
+                legend_lines.append(pad)
+            legend_lines[-1] += entry + "  "
+        lines.extend(legend_lines)
+    return "\n".join(lines) + "\n"
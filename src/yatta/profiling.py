@@ -0,0 +1,244 @@
+"""
+Profiling of a single yatta invocation.
+
+`yatta --profile COMMAND` reports the wall time spent in each phase of the
+command (imports, connecting to the database, SQL, preprocessing, rendering),
+`--profile-memory` adds the peak memory allocated while it ran. `--profile-dump`
+writes cProfile stats to the cache dir, and setting the YATTA_TRACE environment
+variable logs every SQL statement with its duration and row count.
+
+Nothing is measured unless one of these is enabled, so phase() is cheap enough
+to leave in the commands.
+"""
+import logging
+import os
+import sys
+import time
+import weakref
+from contextlib import contextmanager
+
+# first imported by yatta.console, close to interpreter startup
+STARTED = time.perf_counter()
+SLOWEST_STATEMENTS = 5
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)  # only logs while tracing
+
+
+def tracing():
+    """
+    Whether YATTA_TRACE is set; read on every check, since commands run by
+    `yatta server` get the environment of their client.
+    """
+    return os.environ.get("YATTA_TRACE", "") not in ("", "0")
+
+
+class Profile:
+    """
+    Exclusive wall time per phase: time spent in a nested phase is counted
+    for the nested phase only, so the phases add up to the total.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.statements = []  # (seconds, rows, statement)
+        self._stack = []  # [name, start, time spent in nested phases]
+
+    def enter(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def exit(self):
+        name, start, nested = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        self.phases[name] = self.phases.get(name, 0.0) + elapsed - nested
+        if self._stack:
+            self._stack[-1][2] += elapsed
+        return elapsed
+
+    def report(self, command, peak_memory=None):
+        """
+        Lines summarizing the profile, slowest phases first.
+        """
+        total = time.perf_counter() - STARTED
+        while self._stack:  # phases left open by an error
+            self.exit()
+        phases = dict(self.phases)
+        phases["other"] = total - sum(phases.values())
+        n_statements = len(self.statements)
+        lines = [f"Profile of yatta {command or ''}".rstrip() + ":"]
+        for name, seconds in sorted(phases.items(), key=lambda p: -p[1]):
+            if name == "sql":
+                name = f"sql ({n_statements} statements)"
+            lines.append(f"  {name:<26}{seconds * 1e3:>10.1f}ms")
+        lines.append(f"  {'total':<26}{total * 1e3:>10.1f}ms")
+        if peak_memory is not None:
+            lines.append(f"  {'peak memory':<26}{peak_memory / 2 ** 20:>10.1f}MiB")
+        if self.statements:
+            lines.append("Slowest SQL statements:")
+            for seconds, rows, statement in sorted(self.statements, reverse=True)[
+                :SLOWEST_STATEMENTS
+            ]:
+                lines.append(f"  {seconds * 1e3:>8.2f}ms {rows:>6} rows  {statement}")
+        return lines
+
+
+_profile = None  # the active Profile, if any
+_instrumented = weakref.WeakSet()  # engines with timing listeners
+
+
+def start(memory=False):
+    """
+    Start profiling phases until report() is called.
+
+    Args:
+        memory (bool): Also trace the peak memory allocated by Python, which
+            slows the command down several times.
+    """
+    import builtins
+    import tracemalloc
+
+    global _profile
+    _profile = Profile()
+    _profile.phases["startup"] = _profile.started - STARTED
+    if memory:
+        tracemalloc.start()
+    # attribute imports done inside commands to their own phase
+    import_ = builtins.__import__
+
+    def timed_import(*args, **kwargs):
+        _profile.enter("imports")
+        try:
+            return import_(*args, **kwargs)
+        finally:
+            _profile.exit()
+
+    builtins.__import__ = timed_import
+    timed_import.original = import_
+    _instrument_db()
+
+
+def start_tracing():
+    """
+    Log SQL statements from now on if YATTA_TRACE is set.
+    """
+    if tracing():
+        _instrument_db()
+
+
+def _instrument_db():
+    if "yatta.db" in sys.modules:  # imported before profiling or tracing started
+        instrument(sys.modules["yatta.db"].engine)
+
+
+def report(command=None):
+    """
+    Stop profiling and print the report to stderr.
+    """
+    import builtins
+    import tracemalloc
+
+    global _profile
+    builtins.__import__ = getattr(
+        builtins.__import__, "original", builtins.__import__
+    )
+    peak = None
+    if tracemalloc.is_tracing():
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    print("\n".join(_profile.report(command, peak)), file=sys.stderr, flush=True)
+    _profile = None
+
+
+@contextmanager
+def phase(name):
+    """
+    Attribute the time spent in a block to a phase while profiling.
+    """
+    if _profile is None:
+        yield
+        return
+    _profile.enter(name)
+    try:
+        yield
+    finally:
+        _profile.exit()
+
+
+def dump_stats(command, cache_dir):
+    """
+    Profile the rest of the invocation with cProfile.
+
+    Returns:
+        stop (callable): Stops profiling and writes the stats to a file in
+            cache_dir, returning its path.
+    """
+    import cProfile
+    from datetime import datetime
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+    def stop():
+        profiler.disable()
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(cache_dir, f"profile-{command}-{stamp}.prof")
+        profiler.dump_stats(path)
+        return path
+
+    return stop
+
+
+def _statement_summary(statement):
+    return " ".join(statement.split())
+
+
+def instrument(engine):
+    """
+    Time connections and statements of an engine, if profiling or tracing.
+    """
+    if (_profile is None and not tracing()) or engine in _instrumented:
+        return
+    from sqlalchemy import event
+
+    _instrumented.add(engine)
+
+    @event.listens_for(engine, "do_connect")
+    def before_connect(dialect, connection_record, cargs, cparams):
+        if _profile is not None:
+            _profile.enter("db connect")
+
+    @event.listens_for(engine, "connect")
+    def after_connect(dbapi_connection, connection_record):
+        if _profile is not None:
+            _profile.exit()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if _profile is not None:
+            _profile.enter("sql")
+        conn.info.setdefault("statement_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["statement_start"].pop()
+        if _profile is not None:
+            _profile.exit()
+        # SELECTs report no row count until they are fetched
+        rows = cursor.rowcount if cursor.rowcount >= 0 else "-"
+        if _profile is not None:
+            _profile.statements.append(
+                (elapsed, rows, _statement_summary(statement)[:100])
+            )
+        if tracing():
+            logger.info(
+                f"{elapsed * 1e3:.2f}ms {rows} rows: {_statement_summary(statement)}"
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def on_error(context):
+        if context.cursor is None:  # failed before reaching the cursor
+            return
+        context.connection.info["statement_start"].pop()
+        if _profile is not None:
+            _profile.exit()
@@ -0,0 +1,204 @@
+"""
+Resident process answering yatta commands forwarded by yatta.client.
+
+The server imports the commands and their dependencies, sets up the database and
+loads the config once, then runs each forwarded command in turn as if it had
+been invoked in the client's working directory and environment, with stdout and
+stderr sent back over the connection (see yatta.client.FRAME_HEADER). Report
+query results are kept in memory until the records or tasks change.
+"""
+import atexit
+import io
+import json
+import logging
+import os
+import signal
+import sys
+from contextlib import contextmanager
+
+from yatta.client import ENV_PREFIX, FRAME_HEADER, SERVED_COMMANDS, SOCKET_FILE
+from yatta.daemon import REQUEST_TIMEOUT, Daemon, listen, same_user
+from yatta.utils import get_app_dirs
+
+DATA_DIR, CONFIG_DIR, CACHE_DIR = get_app_dirs()
+PID_FILE = os.path.join(CACHE_DIR, "server.pid")
+
+logger = logging.getLogger(__name__)
+
+
+class _FrameWriter(io.RawIOBase):
+    """
+    Binary stream sending everything written to it as frames of one kind.
+    """
+
+    def __init__(self, conn, kind, isatty=False):
+        self.conn = conn
+        self.kind = kind
+        self._isatty = isatty
+
+    def writable(self):
+        return True
+
+    def isatty(self):
+        # colored output follows the client's terminal
+        return self._isatty
+
+    def write(self, data):
+        self.conn.sendall(FRAME_HEADER.pack(self.kind, len(data)) + bytes(data))
+        return len(data)
+
+
+def _text_stream(conn, kind, isatty=False):
+    return io.TextIOWrapper(
+        io.BufferedWriter(_FrameWriter(conn, kind, isatty)),
+        encoding="utf-8",
+        errors="replace",
+    )
+
+
+class _Stderr:
+    """
+    Logging stream following sys.stderr, so warnings reach the current client.
+    """
+
+    def write(self, message):
+        sys.stderr.write(message)
+
+    def flush(self):
+        sys.stderr.flush()
+
+
+@contextmanager
+def _client_context(request, stdout, stderr):
+    """
+    Run a block in the client's working directory, umask and environment, with
+    its output redirected.
+    """
+    cwd, environ = os.getcwd(), dict(os.environ)
+    saved_streams = sys.stdout, sys.stderr
+    umask = os.umask(request["umask"])
+    try:
+        os.chdir(request["cwd"])
+        for name in [name for name in os.environ if name.startswith(ENV_PREFIX)]:
+            del os.environ[name]
+        os.environ.update(request["env"])
+        os.environ["COLUMNS"] = str(request["columns"])
+        sys.stdout, sys.stderr = stdout, stderr
+        yield
+    finally:
+        sys.stdout, sys.stderr = saved_streams
+        os.chdir(cwd)
+        os.umask(umask)
+        os.environ.clear()
+        os.environ.update(environ)
+
+
+class CommandServer(Daemon):
+    """
+    Answers one forwarded command at a time on a unix socket.
+
+    Requests are a single line of JSON with the "argv", "cwd", "umask",
+    "columns", "isatty" and "env" of the client, see yatta.client.forward(). Only
+    SERVED_COMMANDS are run, anything else is answered with exit status 2. Only
+    the user running the server can connect.
+    """
+
+    def __init__(self, pidfile=PID_FILE, sockfile=SOCKET_FILE):
+        Daemon.__init__(self, pidfile)
+        self.sockfile = sockfile
+
+    def run(self):
+        atexit.register(self.delsock)
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        self.serve()
+
+    def delsock(self):
+        if os.path.exists(self.sockfile):
+            os.remove(self.sockfile)
+
+    def warm_up(self):
+        """Import the served commands and set up the database and config."""
+        import pandas  # noqa: F401 imported by the report commands on first use
+
+        from yatta import console as console
+        from yatta import db as db
+        from yatta import plotting  # noqa: F401
+        from yatta.config import get_config
+
+        # replace the handler of `yatta server` itself, which logs to the
+        # terminal the server was started from
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        logging.basicConfig(
+            format="--> %(levelname)s in %(name)s: %(message)s", stream=_Stderr()
+        )
+        for name in SERVED_COMMANDS:
+            console.main.get_command(None, name)
+        db.setup_db()
+        db.cache_results()
+        get_config()
+
+    def serve(self):
+        self.warm_up()
+        self.delsock()
+        server = listen(self.sockfile)
+        with server:
+            while True:
+                conn, _ = server.accept()
+                with conn:
+                    self.handle(conn)
+
+    def handle(self, conn):
+        if not same_user(conn):
+            logger.warning("Refused a request from another user")
+            return
+        # a client that sends nothing mustn't hold up the others
+        conn.settimeout(REQUEST_TIMEOUT)
+        try:
+            request = json.loads(conn.makefile("rb").readline())
+            argv = request["argv"]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Bad request: {e}")
+            return
+        # output may be paged, so wait for the client to read it
+        conn.settimeout(None)
+        stdout = _text_stream(conn, b"o", request.get("isatty", False))
+        stderr = _text_stream(conn, b"e")
+        try:
+            if not argv or argv[0] not in SERVED_COMMANDS:
+                print(f"yatta server can't run {' '.join(argv)}", file=stderr)
+                status = 2
+            else:
+                try:
+                    with _client_context(request, stdout, stderr):
+                        status = self.run_command(argv)
+                except FileNotFoundError as e:  # working directory was removed
+                    print(e, file=stderr)
+                    status = 1
+            stdout.flush()
+            stderr.flush()
+            payload = str(status).encode()
+            conn.sendall(FRAME_HEADER.pack(b"x", len(payload)) + payload)
+        except OSError as e:  # e.g. the client was interrupted
+            logger.warning(f"Failed to answer request: {e}")
+
+    @staticmethod
+    def run_command(argv):
+        """Run a command like the CLI would, returning its exit status."""
+        from yatta import console as console
+        from yatta import db as db
+
+        try:
+            console.main.main(args=argv, prog_name="yatta")
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                return e.code or 0
+            print(e.code, file=sys.stderr)
+            return 1
+        except Exception:
+            logger.exception(f"yatta {' '.join(argv)} failed")
+            return 1
+        finally:
+            db.session.remove()
+        return 0
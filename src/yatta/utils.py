@@ -1,6 +1,5 @@
 import logging
 import os
-import time
 from datetime import datetime
 
 from appdirs import user_cache_dir, user_config_dir, user_data_dir
@@ -9,6 +8,7 @@ APP_NAME = "yatta"
 CACHE_DIR = user_cache_dir(APP_NAME)
 TMP_FILE = os.path.join(CACHE_DIR, "active_task")
 PID_FILE = os.path.join(CACHE_DIR, "yatta.pid")
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
 
 logger = logging.getLogger(__name__)
 
@@ -73,29 +73,27 @@ def time_figlet_print(font, count):
     return font.renderText(time_format(hour, min, sec))
 
 
-def stopwatch(taskname):
-    start_time = datetime.now()
-    while True:
-        end_time = datetime.now()
-        duration = (end_time - start_time).seconds
-        _write_tmp_info(taskname, start_time, end_time, duration)
-        time.sleep(1)
-
-
-def _write_tmp_info(taskname, start, end, duration):
-    with open(TMP_FILE, "w") as f:
-        f.write(f"{start}\n{end}\n{duration}\n{taskname}\n{time_print(duration)}")
-
+def _write_tmp_info(timers):
+    """
+    Atomically write the active task file, handy for shell prompts, or remove it
+    if no tasks are tracked. Each task has three lines: the start time, the start
+    time as a unix timestamp and the task name.
 
-def _read_tmp_info():
-    with open(TMP_FILE, "r") as f:
-        # ignoring the formatting duration, this is intended for external
-        # tools accessing the tmp file
-        start, end, duration, taskname, _ = f.read().split("\n")
-        start = datetime.strptime(start, "%Y-%m-%d %H:%M:%S.%f")
-        end = datetime.strptime(end, "%Y-%m-%d %H:%M:%S.%f")
-        duration = int(duration)
-    return (start, end, duration, taskname)
+    Args:
+        timers (dict): Start times of the tracked tasks, by task name.
+    """
+    if not timers:
+        if os.path.exists(TMP_FILE):
+            os.remove(TMP_FILE)
+        return
+    tmp_file = f"{TMP_FILE}.{os.getpid()}.tmp"
+    with open(tmp_file, "w") as f:
+        for taskname, start in timers.items():
+            f.write(
+                f"{start.strftime(DATETIME_FORMAT)}\n{int(start.timestamp())}\n"
+                + f"{taskname}\n"
+            )
+    os.replace(tmp_file, TMP_FILE)
 
 
 def _last_day_of_month(any_day):
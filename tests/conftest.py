@@ -0,0 +1,22 @@
+# shared fixtures; point yatta at throwaway app dirs before any yatta import
+import os
+import tempfile
+
+import pytest
+
+_tmp_dir = tempfile.mkdtemp(prefix="yatta-tests-")
+for _var in ("XDG_DATA_HOME", "XDG_CONFIG_HOME", "XDG_CACHE_HOME"):
+    os.environ[_var] = os.path.join(_tmp_dir, _var.lower())
+    os.makedirs(os.environ[_var], exist_ok=True)
+
+
+@pytest.fixture
+def db():
+    from yatta import db as db
+
+    yield db
+    db.session.rollback()
+    db.session.query(db.Record).delete()
+    db.session.query(db.Task).delete()
+    db.session.query(db.ActiveTimer).delete()
+    db.session.commit()
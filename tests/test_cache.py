@@ -0,0 +1,85 @@
+# unit tests for the report cache
+from datetime import datetime, timedelta
+
+import pytest
+
+from yatta import cache as cache
+
+
+@pytest.fixture
+def report_cache(db):
+    db.setup_db()
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+def _render(output):
+    calls = []
+
+    def render():
+        calls.append(output)
+        return output
+
+    return render, calls
+
+
+def test_cached_output(report_cache, db):
+    render, calls = _render("report\n")
+    for _ in range(3):
+        assert report_cache.cached_output("plot", ("week",), render) == "report\n"
+    assert len(calls) == 1
+    # other arguments are cached separately
+    other, other_calls = _render("other\n")
+    assert report_cache.cached_output("plot", ("month",), other) == "other\n"
+    assert len(other_calls) == 1
+    assert report_cache.stats() == dict(entries=2, size=13, hits=2, misses=2)
+
+
+def test_writes_invalidate(report_cache, db):
+    render, calls = _render("report\n")
+    report_cache.cached_output("timesheet", (), render)
+    task = db.Task(name="write", total=0)
+    start = datetime(2020, 6, 1, 9)
+    end = start + timedelta(seconds=60)
+    db.add_record(task, db.Record(start=start, end=end, duration=60))
+    report_cache.cached_output("timesheet", (), render)
+    assert len(calls) == 2
+    assert report_cache.stats()["entries"] == 1
+
+
+def test_rebuild_rollups_invalidates(report_cache, db):
+    render, calls = _render("report\n")
+    report_cache.cached_output("timesheet", ("-w",), render)
+    db.rebuild_rollups()
+    report_cache.cached_output("timesheet", ("-w",), render)
+    assert len(calls) == 2
+
+
+def test_config_changes_invalidate(report_cache, monkeypatch):
+    render, calls = _render("report\n")
+    report_cache.cached_output("timesheet", (), render)
+    monkeypatch.setenv("YATTA_FORMATTING_TABLE_STYLE", "plain")
+    report_cache.cached_output("timesheet", (), render)
+    assert len(calls) == 2
+
+
+def test_least_recently_used_evicted(report_cache, monkeypatch):
+    monkeypatch.setenv("YATTA_CACHE_MAX_SIZE", "10")
+    for key in ("a", "b", "c"):
+        report_cache.cached_output("plot", (key,), _render("1234\n")[0])
+    # only the two newest entries fit
+    assert report_cache.stats()["entries"] == 2
+    render, calls = _render("1234\n")
+    report_cache.cached_output("plot", ("a",), render)
+    report_cache.cached_output("plot", ("c",), render)
+    assert calls == ["1234\n"]
+
+
+def test_disabled(report_cache, monkeypatch):
+    monkeypatch.setenv("YATTA_CACHE_MAX_SIZE", "0")
+    render, calls = _render("report\n")
+    report_cache.cached_output("plot", (), render)
+    report_cache.cached_output("plot", (), render)
+    assert len(calls) == 2
+    assert report_cache.stats()["misses"] == 0
@@ -0,0 +1,16 @@
+# unit tests for the completion_helpers module
+from yatta import completion_helpers as completion_helpers
+
+
+def test_task_index_follows_task_changes(db):
+    db.session.add(db.Task(name="write", total=0))
+    db.session.commit()
+    assert completion_helpers.get_matching_tasks(None, [], "w") == ["write"]
+    task = db.Task(name="work", total=0)
+    db.session.add(task)
+    db.session.commit()
+    assert completion_helpers.get_matching_tasks(None, [], "w") == ["work", "write"]
+    task.name = "rework"
+    db.session.commit()
+    assert completion_helpers.get_matching_tasks(None, [], "") == ["rework", "write"]
+    assert completion_helpers.get_matching_tasks(None, [], "x") == []
@@ -0,0 +1,84 @@
+# unit tests for the config module
+import os
+
+import pytest
+
+from yatta import config as config
+
+
+@pytest.fixture
+def fresh_config():
+    config._config = None
+    if os.path.exists(config.CONFIG_FILE):
+        os.remove(config.CONFIG_FILE)
+    yield
+    config._config = None
+
+
+def test_reading_does_not_write(fresh_config):
+    assert config.get_config().get_user_value("plotting", "columns") == 75
+    assert not os.path.exists(config.CONFIG_FILE)
+
+
+def test_config_is_cached(fresh_config):
+    assert config.get_config() is config.get_config()
+
+
+def test_set_user_value_writes_only_on_change(fresh_config):
+    cfg = config.get_config()
+    cfg.set_user_value("plotting", "columns", 75)
+    assert not os.path.exists(config.CONFIG_FILE)
+    cfg.set_user_value("plotting", "columns", 100)
+    stamp = os.stat(config.CONFIG_FILE).st_mtime_ns
+    cfg.set_user_value("plotting", "columns", 100)
+    assert os.stat(config.CONFIG_FILE).st_mtime_ns == stamp
+    config._config = None
+    assert config.get_config().get_user_value("plotting", "columns") == 100
+
+
+def test_reload_when_file_changes(fresh_config):
+    cfg = config.get_config()
+    cfg.set_user_value("formatting", "table_style", "plain")
+    with open(config.CONFIG_FILE) as f:
+        content = f.read().replace('"plain"', '"github"')
+    with open(config.CONFIG_FILE, "w") as f:
+        f.write(content)
+    stat = os.stat(config.CONFIG_FILE)
+    os.utime(config.CONFIG_FILE, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert config.get_config().get_user_value("formatting", "table_style") == "github"
+
+
+def test_environment_override(fresh_config, monkeypatch):
+    monkeypatch.setenv("YATTA_PLOTTING_COLUMNS", "120")
+    assert config.get_config().get_user_value("plotting", "columns") == 120
+    assert not os.path.exists(config.CONFIG_FILE)
+
+
+@pytest.mark.parametrize(
+    "value, expected", [("false", False), ("No", False), ("1", True)]
+)
+def test_environment_override_bool(fresh_config, monkeypatch, value, expected):
+    monkeypatch.setenv("YATTA_PLOTTING_SHOW_LEGEND", value)
+    assert config.get_config().get_user_value("plotting", "show_legend") is expected
+
+
+@pytest.mark.parametrize(
+    "name", ["YATTA_PLOTTING_COLUMNS", "YATTA_PLOTTING_SHOW_LEGEND"]
+)
+def test_environment_override_invalid(fresh_config, monkeypatch, name):
+    import click
+
+    monkeypatch.setenv(name, "wide")
+    table, key = name.lower().split("_", 2)[1:]
+    with pytest.raises(click.BadParameter, match="wide") as e:
+        config.get_config().get_user_value(table, key)
+    assert e.value.param_hint == name
+
+
+def test_new_tables_get_default_settings(fresh_config):
+    with open(config.CONFIG_FILE, "w") as f:
+        f.write('[general]\nrun_in_background = "true"\n')
+    cfg = config.get_config()
+    # booleans were written as strings by older versions
+    assert cfg.get_user_value("general", "run_in_background") is True
+    assert cfg.get_user_value("database", "journal_mode") == "wal"
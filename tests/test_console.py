@@ -1,4 +1,8 @@
 # unit tests for the console module
+import os
+import subprocess
+import sys
+
 import pytest
 from click.testing import CliRunner
 
@@ -13,3 +17,69 @@ def runner():
 def test_main_succeeds(runner):
     result = runner.invoke(main)
     assert result.exit_code == 0
+
+
+# modules that the cli must not import just to start up or check status
+HEAVY_MODULES = {"numpy", "pandas", "parsedatetime", "pyfiglet", "sqlalchemy"}
+STARTUP_BUDGET_US = 300_000
+
+
+def _import_times(*args, env=None, returncode=0):
+    """
+    Run the cli in a fresh interpreter with `-X importtime`, returning the
+    cumulative import time (us) of each top level import and the output.
+    """
+    code = "import sys; from yatta.console import main; main(sys.argv[1:], 'yatta')"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code, *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        env=env,
+    )
+    assert proc.returncode == returncode, proc.stderr
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.partition(":")[2].split("|")
+        times[name.rstrip()] = int(cumulative)
+    return times, proc.stdout
+
+
+@pytest.mark.parametrize("args", [["--help"], ["status"], ["plot", "--help"]])
+def test_startup_is_lightweight(args):
+    times, _ = _import_times(*args)
+    imported = {name.strip().split(".")[0] for name in times}
+    assert not HEAVY_MODULES & imported
+    top_level = sum(us for name, us in times.items() if not name.startswith(" "))
+    assert top_level < STARTUP_BUDGET_US
+
+
+def test_task_completion_is_lightweight(db):
+    for name in ("writing", "reading", "wrestling"):
+        db.session.add(db.Task(name=name, total=0))
+    db.session.commit()
+    env = dict(
+        os.environ,
+        _YATTA_COMPLETE="complete",
+        COMP_WORDS="yatta start wr",
+        COMP_CWORD="2",
+    )
+    for _ in range(2):  # build the index, then read it
+        # click exits with status 1 after printing completions
+        times, output = _import_times(env=env, returncode=1)
+        assert output.split() == ["wrestling", "writing"]
+        imported = {name.strip().split(".")[0] for name in times}
+        assert not HEAVY_MODULES & imported
+
+
+def test_profile_reports_phases(db):
+    runner = CliRunner(mix_stderr=False)
+    result = runner.invoke(main, ["--profile", "list", "tasks"])
+    assert result.exit_code == 0, result.stderr
+    report = result.stderr.splitlines()
+    assert report[0] == "Profile of yatta list:"
+    phases = {line.split()[0] for line in report[1:] if line.startswith("  ")}
+    assert {"imports", "sql", "render", "total"} <= phases
+    assert "Slowest SQL statements:" in report
@@ -0,0 +1,229 @@
+# unit tests for the daemon module
+import os
+import threading
+from datetime import datetime, timedelta
+
+import pyfiglet
+import pytest
+
+from yatta import daemon as daemon
+
+
+def _task_id(db, name):
+    task = db.get_tasks(name).first()
+    if not task:
+        task = db.Task(name=name, total=0)
+        db.session.add(task)
+        db.session.commit()
+    return task.id
+
+
+@pytest.fixture
+def stopwatch(db, tmp_path):
+    db.setup_db()
+    # added by start or switch before they send their requests
+    for name in ("write docs", "read", "meeting"):
+        _task_id(db, name)
+    sockfile, pidfile = str(tmp_path / "yatta.sock"), str(tmp_path / "yatta.pid")
+    with open(pidfile, "w") as f:  # written by daemonize()
+        f.write(f"{os.getpid()}\n")
+    stopwatch = daemon.StopwatchDaemon(pidfile, "write docs", sockfile=sockfile)
+    thread = threading.Thread(target=stopwatch.serve)
+    thread.start()
+    while not os.path.exists(sockfile):
+        pass
+    yield stopwatch
+    if stopwatch.running:
+        daemon.daemon_request("stop", sockfile, all=True)
+    thread.join()
+    assert not os.path.exists(daemon.TMP_FILE)
+    # removed by the daemon itself, so a new one can start right away
+    assert not os.path.exists(sockfile)
+    assert not os.path.exists(pidfile)
+
+
+def _rows(db):
+    db.session.expire_all()
+    return [(t.task_name, t.start) for t in db.get_active_timers()]
+
+
+def test_status(stopwatch, db):
+    state = daemon.daemon_request("status", stopwatch.sockfile)
+    task_id = _task_id(db, "write docs")
+    assert state["timers"] == [
+        {"task_id": task_id, "task": "write docs", "start": stopwatch.timers[task_id]}
+    ]
+    assert state["now"] >= state["timers"][0]["start"]
+
+
+def test_socket_is_private(stopwatch):
+    import socket
+    import stat
+
+    assert stat.S_IMODE(os.stat(stopwatch.sockfile).st_mode) == 0o600
+    left, right = socket.socketpair()
+    with left, right:
+        assert daemon.same_user(left)
+
+
+def test_switch(stopwatch):
+    state = daemon.daemon_request("switch", stopwatch.sockfile, task="read")
+    assert [timer["task"] for timer in state["stopped"]] == ["write docs"]
+    new_state = daemon.daemon_request("status", stopwatch.sockfile)
+    assert [timer["task"] for timer in new_state["timers"]] == ["read"]
+    # the new task starts exactly when the previous one ended
+    assert new_state["timers"][0]["start"] == state["now"]
+
+
+def test_stop(stopwatch, db):
+    state = daemon.daemon_request("stop", stopwatch.sockfile)
+    assert state["stopped"][0]["task"] == "write docs"
+    assert state["timers"] == []
+    # the last timer stopped, so the daemon exits
+    assert not stopwatch.running
+    # the timer stays until its record is saved
+    assert _rows(db) == [("write docs", state["stopped"][0]["start"])]
+
+
+def test_concurrent_timers(stopwatch, db):
+    sockfile = stopwatch.sockfile
+    daemon.daemon_request("start", sockfile, task="meeting")
+    error = daemon.daemon_request("start", sockfile, task="meeting")["error"]
+    assert error == "You are already tracking meeting."
+    state = daemon.daemon_request("status", sockfile)
+    assert [timer["task"] for timer in state["timers"]] == ["write docs", "meeting"]
+    assert [row[0] for row in _rows(db)] == ["write docs", "meeting"]
+    assert "Name one of" in daemon.daemon_request("stop", sockfile)["error"]
+    state = daemon.daemon_request("stop", sockfile, task="meeting")
+    assert [timer["task"] for timer in state["timers"]] == ["write docs"]
+    assert stopwatch.running
+    with open(daemon.TMP_FILE) as f:
+        assert f.read().split("\n")[2] == "write docs"
+
+
+def test_stop_saves_orphaned_timers(db, capsys):
+    start = datetime(2020, 6, 1, 9)
+    db.session.add(
+        db.ActiveTimer(
+            task_id=_task_id(db, "on call"),
+            start=start,
+            heartbeat=start + timedelta(minutes=5),
+        )
+    )
+    db.session.commit()
+    daemon.daemon_stop()
+    record = db.get_records().one()
+    assert (record.task_name, record.start) == ("on call", start)
+    assert _rows(db) == []
+
+
+def test_timer_started_meanwhile_is_not_orphaned(stopwatch, monkeypatch):
+    request = daemon.daemon_request
+
+    def start_then_request(cmd, sockfile=stopwatch.sockfile, **kwargs):
+        if cmd == "status":
+            request("start", sockfile, task="meeting")
+        return request(cmd, sockfile, **kwargs)
+
+    monkeypatch.setattr(daemon, "daemon_request", start_then_request)
+    orphans, state = daemon.orphaned_timers()
+    assert orphans == []
+    assert [timer["task"] for timer in state["timers"]] == ["write docs", "meeting"]
+
+
+def test_timer_is_saved_once(db):
+    start = datetime(2020, 6, 1, 9)
+    task = db.get_tasks(_task_id(db, "on call")).one()
+    db.session.add(db.ActiveTimer(task_id=task.id, start=start))
+    db.session.commit()
+    end = start + timedelta(minutes=5)
+    assert db.save_timer(task, start, end).duration == 300
+    assert db.save_timer(task, start, end) is None
+    assert db.get_records().count() == 1
+
+
+def _save_stopped(state):
+    for timer in state["stopped"]:
+        task_id, name, start = timer["task_id"], timer["task"], timer["start"]
+        daemon.save_record(task_id, name, start, state["now"])
+
+
+def test_rename_tracked_task(stopwatch, db):
+    from click.testing import CliRunner
+
+    from yatta.console import main
+
+    result = CliRunner().invoke(main, ["edit", "tasks", "write docs", "-n", "docs"])
+    assert result.exit_code == 0
+    state = daemon.daemon_request("status", stopwatch.sockfile)
+    assert [timer["task"] for timer in state["timers"]] == ["docs"]
+    with open(daemon.TMP_FILE) as f:
+        assert f.read().split("\n")[2] == "docs"
+    _save_stopped(daemon.daemon_request("stop", stopwatch.sockfile, task="docs"))
+    assert db.get_records().one().task_name == "docs"
+    assert _rows(db) == []
+
+
+def test_delete_tracked_task(stopwatch, db, capsys):
+    db.delete_tasks(db.get_tasks("write docs").all())
+    # the timer is removed along with its task
+    assert _rows(db) == []
+    _save_stopped(daemon.daemon_request("stop", stopwatch.sockfile))
+    assert "write docs no longer exists" in capsys.readouterr().out
+    assert db.get_records().count() == 0
+
+
+def test_no_daemon(tmp_path):
+    assert daemon.daemon_request("status", str(tmp_path / "yatta.sock")) is None
+
+
+def test_watch(stopwatch, db):
+    client, stream, state = daemon.daemon_watch(stopwatch.sockfile)
+    with client:
+        assert state["timers"][0]["task"] == "write docs"
+        daemon.daemon_request("switch", stopwatch.sockfile, task="read")
+        state = daemon._read_state(stream)
+        read = _task_id(db, "read")
+        assert state["switched"] == {"from": _task_id(db, "write docs"), "to": read}
+        assert daemon._get_timer(state, read)["start"] == state["now"]
+        daemon.daemon_request("stop", stopwatch.sockfile)
+        assert daemon._read_state(stream)["timers"] == []
+        assert daemon._read_state(stream) is None
+
+
+def test_watch_leaves_later_states_to_select(stopwatch):
+    import select
+
+    client, stream, state = daemon.daemon_watch(stopwatch.sockfile)
+    with client:
+        daemon.daemon_request("start", stopwatch.sockfile, task="meeting")
+        daemon.daemon_request("stop", stopwatch.sockfile, task="meeting")
+        assert len(daemon._read_state(stream)["timers"]) == 2
+        # the second state must not be stuck in a buffer select can't see
+        assert select.select([client], [], [], 1)[0] == [client]
+        assert len(daemon._read_state(stream)["timers"]) == 1
+
+
+class FakeScreen:
+    def __init__(self):
+        self.calls = []
+
+    def addstr(self, y, x, text):
+        self.calls.append((y, x, text))
+
+
+def test_draw_clock_redraws_changed_digits():
+    font = pyfiglet.Figlet("doom")
+    glyphs = daemon._clock_glyphs(font)
+    assert daemon._clock_glyphs(font) is glyphs
+    digit_widths = {len(glyphs[c][0]) for c in "0123456789"}
+    assert len(digit_widths) == 1
+    screen = FakeScreen()
+    daemon._draw_clock(screen, glyphs, 5, "00:00:09")
+    height = len(glyphs["0"])
+    assert len(screen.calls) == 8 * height
+    screen.calls = []
+    daemon._draw_clock(screen, glyphs, 5, "00:00:10", "00:00:09")
+    # only the two seconds digits changed
+    assert len(screen.calls) == 2 * height
+    assert {y for y, x, text in screen.calls} == set(range(5, 5 + height))
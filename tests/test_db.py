@@ -0,0 +1,440 @@
+# unit tests for the db module
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+
+def _add(db, task_name, start, duration):
+    task = db.get_tasks(task_name).first()
+    if not task:
+        task = db.Task(name=task_name, total=0)
+    record = db.Record(
+        start=start, end=start + timedelta(seconds=duration), duration=duration
+    )
+    db.add_record(task, record)
+    return record
+
+
+def test_get_period_totals_filters_period(db):
+    _add(db, "write", datetime(2020, 6, 1, 9), 60)
+    _add(db, "write", datetime(2020, 6, 1, 13), 30)
+    _add(db, "write", datetime(2020, 6, 2, 9), 10)
+    _add(db, "read", datetime(2020, 5, 31, 23), 600)
+    df = db.get_period_totals(datetime(2020, 6, 1), datetime(2020, 6, 2), None)
+    assert df[["task_name", "duration"]].values.tolist() == [["write", 90]]
+
+
+def test_get_period_totals_buckets(db):
+    # 2020-06-01 is a monday, 2020-06-07 a sunday
+    _add(db, "write", datetime(2020, 6, 1, 9), 60)
+    _add(db, "write", datetime(2020, 6, 1, 13), 30)
+    _add(db, "write", datetime(2020, 6, 7, 9), 10)
+    _add(db, "write", datetime(2020, 6, 8, 9), 5)
+    start, end = datetime(2020, 6, 1), datetime(2020, 7, 1)
+    by_day = db.get_period_totals(start, end, "day")
+    assert by_day["duration"].tolist() == [90, 10, 5]
+    assert by_day["start"].iloc[0] == datetime(2020, 6, 1)
+    by_week = db.get_period_totals(start, end, "week")
+    assert by_week["duration"].tolist() == [100, 5]
+    assert by_week["bucket"].tolist() == [
+        pd.Timestamp(2020, 6, 1),
+        pd.Timestamp(2020, 6, 8),
+    ]
+    by_weekday = db.get_period_totals(start, end, "weekday")
+    assert dict(zip(by_weekday["bucket"], by_weekday["duration"])) == {0: 95, 6: 10}
+    by_month = db.get_period_totals(datetime(2020, 1, 1), datetime(2021, 1, 1), "month")
+    assert by_month[["bucket", "duration"]].values.tolist() == [
+        [pd.Timestamp(2020, 6, 1), 105]
+    ]
+
+
+def test_cached_period_totals(db, monkeypatch):
+    monkeypatch.setattr(db, "_results", None)
+    db.cache_results()
+    _add(db, "write", datetime(2020, 6, 1, 9), 60)
+    start, end = datetime(2020, 6, 1), datetime(2020, 6, 2)
+    totals = db.get_period_totals(start, end, None)
+    totals["duration"] = 0  # callers get a copy
+    assert db.get_period_totals(start, end, None)["duration"].tolist() == [60]
+    assert len(db._results) == 1
+    # new records invalidate the cached totals
+    _add(db, "write", datetime(2020, 6, 1, 13), 30)
+    assert db.get_period_totals(start, end, None)["duration"].tolist() == [90]
+
+
+def _rollup(db):
+    return sorted(
+        (row.task_id, str(row.day), row.seconds)
+        for row in db.session.query(db.DailyTotal)
+    )
+
+
+def test_rollup_follows_record_changes(db):
+    first = _add(db, "write", datetime(2020, 6, 1, 9), 60)
+    _add(db, "write", datetime(2020, 6, 1, 13), 30)
+    task_id = int(first.task_id)
+    assert _rollup(db) == [(task_id, "2020-06-01", 90)]
+    # move a record to the next day
+    first.start = datetime(2020, 6, 2, 9)
+    first.duration = 20
+    db.session.commit()
+    assert _rollup(db) == [(task_id, "2020-06-01", 30), (task_id, "2020-06-02", 20)]
+    db.delete_records([first.id])
+    assert _rollup(db) == [(task_id, "2020-06-01", 30)]
+    db.delete_tasks([db.get_tasks(task_id).first()])
+    assert _rollup(db) == []
+
+
+def test_task_total_follows_record_changes(db):
+    first = _add(db, "write", datetime(2020, 6, 1, 9), 60)
+    second = _add(db, "write", datetime(2020, 6, 1, 13), 30)
+    task = db.get_tasks("write").first()
+    assert task.total == 90
+    first.duration = 20
+    db.session.commit()
+    assert task.total == 50
+    other = _add(db, "read", datetime(2020, 6, 1, 9), 10)
+    second.task_id = other.task_id
+    db.session.commit()
+    assert (task.total, db.get_tasks("read").first().total) == (20, 40)
+    db.delete_records([first.id])
+    assert task.total == 0
+
+
+def test_reconcile_totals(db):
+    _add(db, "write", datetime(2020, 6, 1, 9), 60)
+    _add(db, "read", datetime(2020, 6, 1, 13), 30)
+    db.session.execute("UPDATE tasks SET total = 5 WHERE name = 'read'")
+    db.session.commit()
+    assert db.reconcile_totals() == [("read", 5, 30)]
+    assert db.reconcile_totals() == []
+    assert db.get_tasks("read").first().total == 30
+
+
+def test_rebuild_rollups(db):
+    _add(db, "write", datetime(2020, 6, 1, 9), 60)
+    _add(db, "read", datetime(2020, 6, 1, 13), 30)
+    expected = _rollup(db)
+    db.session.execute("UPDATE daily_totals SET seconds = 0")
+    db.session.commit()
+    version = db.get_data_version("records")
+    db.rebuild_rollups()
+    assert _rollup(db) == expected
+    assert db.get_data_version("records") > version
+
+
+def test_get_task_totals(db):
+    _add(db, "write", datetime(2020, 6, 1, 9), 60)
+    _add(db, "write", datetime(2020, 6, 3, 9), 30)
+    db.session.add(db.Task(name="idle", total=0))
+    db.session.commit()
+    totals = {row.name: row.total for row in db.get_task_totals()}
+    assert totals == {"write": 90, "idle": 0}
+
+
+def _query_plan(db, query):
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    params = [compiled.params[name] for name in compiled.positiontup]
+    connection = db.engine.raw_connection()
+    try:
+        rows = connection.execute("EXPLAIN QUERY PLAN " + str(compiled), params)
+        return [row[-1] for row in rows]
+    finally:
+        connection.close()
+
+
+def _assert_no_records_scan(plan):
+    assert not [step for step in plan if step.startswith("SCAN")], plan
+    assert [step for step in plan if "INDEX" in step], plan
+
+
+def test_record_queries_use_indexes(db):
+    _assert_no_records_scan(_query_plan(db, db.get_records(task_name_or_id=1)))
+    _assert_no_records_scan(_query_plan(db, db.get_records(task_name_or_id="write")))
+    start, end = datetime(2020, 6, 1), datetime(2020, 7, 1)
+    for bucket in ("day", "week", "weekday", None):
+        query = db._period_totals_query(start, end, bucket)
+        _assert_no_records_scan(_query_plan(db, query))
+    query = db.session.query(db.func.sum(db.Record.duration)).filter(
+        db.Record.task_id == 1
+    )
+    _assert_no_records_scan(_query_plan(db, query))
+
+
+def _remove_archives(db):
+    import os
+
+    for archive in db.get_archives():
+        os.remove(os.path.join(db.DATA_DIR, archive.path))
+    db.session.query(db.Archive).delete()
+    db.session.commit()
+
+
+def test_archive_never_reuses_ids(db):
+    _add(db, "write", datetime(2019, 6, 1, 9), 60)
+    newest = _add(db, "write", datetime(2020, 6, 1, 9), 30).id
+    try:
+        assert db.archive_records(datetime(2020, 1, 1)) == {2019: 1}
+        db.delete_records(record_ids=[newest])
+        assert _add(db, "write", datetime(2019, 6, 2, 9), 10).id > newest
+        assert db.archive_records(datetime(2020, 1, 1)) == {2019: 1}
+        db.session.expire_all()
+        assert [row[3] for row in db.export_records()] == [60, 10]
+        assert db.get_tasks("write").first().total == 70
+        assert db.reconcile_totals() == []
+    finally:
+        _remove_archives(db)
+
+
+def test_archive_refuses_clashing_ids(db):
+    import pytest
+
+    old = _add(db, "write", datetime(2019, 6, 1, 9), 60)
+    archived = {"id": old.id, "task_id": old.task_id}
+    try:
+        assert db.archive_records(datetime(2020, 1, 1)) == {2019: 1}
+        # e.g. a record added by hand
+        db.session.execute(
+            'INSERT INTO records (id, task_id, start, "end", duration) '
+            + "VALUES (:id, :task_id, '2019-06-02 09:00:00.000000', "
+            + "'2019-06-02 09:00:20.000000', 20)",
+            archived,
+        )
+        db.session.commit()
+        with pytest.raises(ValueError, match="2019"):
+            db.archive_records(datetime(2020, 1, 1))
+        db.session.expire_all()
+        assert [r.duration for r in db.get_records()] == [20]
+        assert [a.records for a in db.get_archives()] == [1]
+        # both records are listed, although they share an ID
+        records = db.get_records(archived=True)
+        assert sorted(r.duration for r in records) == [20, 60]
+    finally:
+        _remove_archives(db)
+
+
+def test_delete_archived_records(db):
+    _add(db, "write", datetime(2019, 6, 1, 9), 60)
+    _add(db, "write", datetime(2019, 6, 2, 9), 600)
+    _add(db, "write", datetime(2020, 6, 1, 9), 30)
+    try:
+        assert db.archive_records(datetime(2020, 1, 1)) == {2019: 2}
+        version = db.get_data_version("records")
+        assert db.delete_records(before=datetime(2020, 6, 1), shorter_than=100) == 1
+        assert db.get_data_version("records") > version
+        db.session.expire_all()
+        assert [row[3] for row in db.export_records()] == [600, 30]
+        assert db.get_tasks("write").one().total == 630
+        days = db.get_period_totals(datetime(2019, 1, 1), datetime(2021, 1, 1), "day")
+        assert days["duration"].tolist() == [600, 30]
+        assert [(a.records, a.first_start) for a in db.get_archives()] == [
+            (1, datetime(2019, 6, 2, 9))
+        ]
+        assert db.reconcile_totals() == []
+    finally:
+        _remove_archives(db)
+
+
+def test_import_skips_archived_records(db):
+    _add(db, "write", datetime(2019, 6, 1, 9), 60)
+    _add(db, "write", datetime(2020, 6, 1, 9), 30)
+    try:
+        db.archive_records(datetime(2020, 1, 1))
+        rows = list(db.export_records())
+        assert db.import_records(rows, batch_size=1) == (0, 2)
+        db.session.expire_all()
+        assert db.get_tasks("write").one().total == 90
+        assert db.reconcile_totals() == []
+    finally:
+        _remove_archives(db)
+
+
+def test_migrate_old_database(db, tmp_path):
+    from sqlalchemy import create_engine, inspect
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    db.Base.metadata.tables["tasks"].create(engine)
+    engine.execute(
+        "CREATE TABLE records (id INTEGER PRIMARY KEY, task_id VARCHAR, "
+        + "task_name VARCHAR, start DATETIME NOT NULL, "
+        + '"end" DATETIME NOT NULL, duration INTEGER NOT NULL)'
+    )
+    engine.execute("INSERT INTO tasks (id, name) VALUES (3, 'write')")
+    engine.execute(
+        "INSERT INTO records VALUES (1, '3', 'write', "
+        + "'2020-06-01 09:00:00.000000', '2020-06-01 09:01:00.000000', 60)"
+    )
+    assert db.migrate(engine) == len(db.SCHEMA_MIGRATIONS)
+    indexes = {index["name"] for index in inspect(engine).get_indexes("records")}
+    assert indexes == {"ix_records_start", "ix_records_task_id_start"}
+    columns = [column["name"] for column in inspect(engine).get_columns("records")]
+    assert columns == ["id", "task_id", "start", "end", "duration"]
+    assert engine.execute("SELECT typeof(task_id) FROM records").scalar() == "integer"
+    sql = "SELECT sql FROM sqlite_master WHERE name = 'records'"
+    assert "AUTOINCREMENT" in engine.execute(sql).scalar()
+    # totals were built from the records, and the rebuilt table keeps them in step
+    assert engine.execute("SELECT total FROM tasks").scalar() == 60
+    engine.execute("DELETE FROM records")
+    assert engine.execute("SELECT total FROM tasks").scalar() == 0
+    assert engine.execute("SELECT COUNT(*) FROM daily_totals").scalar() == 0
+    # migrations only run once
+    assert db.migrate(engine) == len(db.SCHEMA_MIGRATIONS)
+
+
+def test_rename_task_leaves_records(db):
+    _add(db, "write", datetime(2020, 6, 1, 9), 60)
+    version = db.get_data_version("records")
+    db.get_tasks("write").first().name = "draft"
+    db.session.commit()
+    assert db.get_data_version("records") == version
+    assert db.get_records(task_name_or_id="draft").one().task_name == "draft"
+
+
+def test_get_records_pages(db):
+    records = [_add(db, "write", datetime(2020, 6, day, 9), 60) for day in (1, 2, 3)]
+    ids = [record.id for record in records]
+    page = db.get_records(newest_first=True, limit=2).all()
+    assert [record.id for record in page] == ids[:0:-1]
+    page = db.get_records(newest_first=True, limit=2, before_id=page[-1].id).all()
+    assert [record.id for record in page] == ids[:1]
+    after = db.get_records(after=datetime(2020, 6, 1, 12)).all()
+    assert [record.id for record in after] == ids[1:]
+    assert db.get_records(newest_first=True).first().id == ids[-1]
+
+
+def test_import_records_skips_duplicates(db):
+    _add(db, "write", datetime(2020, 6, 1, 9), 60)
+    rows = [
+        ("write", "2020-06-01 09:00:00.000000", "2020-06-01 09:01:00.000000", 60),
+        ("write", "2020-06-02 09:00:00.000000", "2020-06-02 09:02:00.000000", 120),
+        ("read", "2020-06-02 10:00:00.000000", "2020-06-02 10:00:30.000000", 30),
+        ("read", "2020-06-02 10:00:00.000000", "2020-06-02 10:00:30.000000", 30),
+    ]
+    version = db.get_data_version("records")
+    assert db.import_records(rows, batch_size=2) == (2, 2)
+    assert db.get_data_version("records") == version + 2  # once per batch
+    assert db.import_records(rows) == (0, 4)
+    assert db.get_data_version("records") == version + 2
+    db.session.expire_all()
+    totals = {task.name: task.total for task in db.get_tasks()}
+    assert totals == {"write": 180, "read": 30}
+    day = db.get_period_totals(datetime(2020, 6, 2), datetime(2020, 6, 3))
+    assert dict(zip(day.task_name, day.duration)) == {"read": 30, "write": 120}
+    # the insert triggers are back after the import
+    _add(db, "read", datetime(2020, 6, 2, 11), 10)
+    db.session.expire_all()
+    assert db.get_tasks("read").one().total == 40
+
+
+def test_export_records_roundtrip(db):
+    for day in (1, 2, 3):
+        _add(db, "write", datetime(2020, 6, day, 9), 60 * day)
+    _add(db, "read", datetime(2020, 6, 2, 10), 30)
+    rows = list(db.export_records(chunk_size=2))
+    assert [row[0] for row in rows] == ["write", "write", "read", "write"]
+    assert rows[1] == (
+        "write",
+        "2020-06-02 09:00:00.000000",
+        "2020-06-02 09:02:00.000000",
+        120,
+    )
+    assert db.import_records(rows) == (0, 4)
+    assert len(list(db.export_records("read"))) == 1
+    period = db.export_records(start=datetime(2020, 6, 2), end=datetime(2020, 6, 3))
+    assert len(list(period)) == 2
+
+
+def test_connections_use_database_settings(db):
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        assert cursor.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+        assert cursor.execute("PRAGMA busy_timeout").fetchone() == (5000,)
+        db.apply_pragmas(cursor, {"synchronous": "sideways", "cache_size": "-2000"})
+        assert cursor.execute("PRAGMA synchronous").fetchone() == (1,)  # normal
+        assert cursor.execute("PRAGMA cache_size").fetchone() == (-2000,)
+    finally:
+        connection.close()
+
+
+def test_invalid_database_override_falls_back_to_default(db, monkeypatch, caplog):
+    monkeypatch.setenv("YATTA_DATABASE_CACHE_SIZE", "abc")
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        assert cursor.execute("PRAGMA cache_size").fetchone() == (-16000,)
+    finally:
+        connection.close()
+    assert "YATTA_DATABASE_CACHE_SIZE" in caplog.text
+
+
+def test_delete_records_with_filters(db):
+    _add(db, "write", datetime(2020, 6, 1, 9), 60)
+    _add(db, "write", datetime(2020, 6, 2, 9), 20)
+    _add(db, "write", datetime(2020, 6, 3, 9), 600)
+    _add(db, "read", datetime(2020, 6, 1, 9), 10)
+    write = db.get_tasks("write").first()
+    assert db.delete_records(task=write, shorter_than=100) == 2
+    assert db.delete_records(before=datetime(2020, 6, 2)) == 1
+    assert [record.duration for record in db.get_records()] == [600]
+    assert write.total == 600
+    assert db.get_tasks("read").first().total == 0
+    assert _rollup(db) == [(write.id, "2020-06-03", 600)]
+
+
+def test_delete_tasks_cascades_in_sql(db):
+    from sqlalchemy import event
+
+    _add(db, "write", datetime(2020, 6, 1, 9), 60)
+    _add(db, "read", datetime(2020, 6, 1, 9), 10)
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        db.delete_tasks([db.get_tasks("write").first()])
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+    assert not any("FROM records" in statement for statement in statements)
+    assert [task.name for task in db.get_tasks()] == ["read"]
+    assert [record.task_name for record in db.get_records()] == ["read"]
+    assert len(_rollup(db)) == 1
+
+
+def test_archive_records(db):
+    import os
+
+    _add(db, "write", datetime(2019, 6, 1, 9), 60)
+    _add(db, "write", datetime(2020, 6, 1, 9), 30)
+    _add(db, "read", datetime(2020, 6, 2, 9), 10)
+    _add(db, "read", datetime(2021, 6, 1, 9), 20)
+    rollup = _rollup(db)
+    try:
+        assert db.archive_records(datetime(2021, 1, 1)) == {2019: 1, 2020: 2}
+        db.session.expire_all()
+        assert [a.records for a in db.get_archives()] == [1, 2]
+        assert [r.duration for r in db.get_records()] == [20]
+        assert [r.duration for r in db.get_records(archived=True)] == [60, 30, 10, 20]
+        recent = db.get_records(after=datetime(2020, 1, 1), archived=True)
+        assert [r.duration for r in recent] == [30, 10, 20]
+        assert [r.task_name for r in recent] == ["write", "read", "read"]
+        recent = db.get_records(
+            task_name_or_id="read", after=datetime(2020, 1, 1), archived=True
+        )
+        assert [r.duration for r in recent] == [10, 20]
+        # reports and totals still count archived records
+        assert _rollup(db) == rollup
+        assert db.get_tasks("write").first().total == 90
+        assert db.reconcile_totals() == []
+        db.rebuild_rollups()
+        assert _rollup(db) == rollup
+        rows = list(db.export_records())
+        assert [row[3] for row in rows] == [60, 30, 10, 20]
+        db.delete_tasks([db.get_tasks("write").first()])
+        db.session.expire_all()
+        assert [a.records for a in db.get_archives()] == [0, 1]
+        assert [row[3] for row in db.export_records()] == [10, 20]
+    finally:
+        for archive in db.get_archives():
+            os.remove(os.path.join(db.DATA_DIR, archive.path))
+        db.session.query(db.Archive).delete()
+        db.session.commit()
@@ -0,0 +1,30 @@
+# unit tests for the delete commands
+from datetime import datetime, timedelta
+
+import pytest
+from click.testing import CliRunner
+
+from yatta.commands import delete as delete
+
+
+def _add_record(db):
+    task = db.get_tasks("write").first() or db.Task(name="write", total=0)
+    start = datetime(2020, 6, 1, 9)
+    db.add_record(
+        task, db.Record(start=start, end=start + timedelta(minutes=1), duration=60)
+    )
+
+
+@pytest.mark.parametrize("before", ["garbage", "2020-13-45", "last yaer"])
+def test_records_before_invalid_date(db, before):
+    _add_record(db)
+    result = CliRunner().invoke(delete.records, ["--before", before, "--yes"])
+    assert result.exit_code == 2
+    assert f"'{before}' is not a date" in result.output
+    assert db.get_records().count() == 1
+
+
+def test_records_before_date(db):
+    _add_record(db)
+    result = CliRunner().invoke(delete.records, ["--before", "2020-06-02", "--yes"])
+    assert "Deleted 1 record(s)!" in result.output
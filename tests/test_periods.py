@@ -0,0 +1,34 @@
+# unit tests for the periods module
+from datetime import datetime
+
+import click
+import pytest
+
+from yatta.periods import report_range
+
+
+def test_report_range():
+    date = datetime(2019, 11, 14, 15, 30)
+    assert report_range("day", date) == (
+        datetime(2019, 11, 14),
+        datetime(2019, 11, 15),
+        None,
+    )
+    assert report_range("week", date)[:2] == (
+        datetime(2019, 11, 11),
+        datetime(2019, 11, 18),
+    )
+    assert report_range("quarter", date) == (
+        datetime(2019, 10, 1),
+        datetime(2020, 1, 1),
+        "week",
+    )
+    assert report_range("year", date) == (
+        datetime(2019, 1, 1),
+        datetime(2020, 1, 1),
+        "month",
+    )
+    custom = report_range(None, from_date=date, to_date=datetime(2019, 11, 20))
+    assert custom == (datetime(2019, 11, 14), datetime(2019, 11, 21), "day")
+    with pytest.raises(click.UsageError, match="--from"):
+        report_range("week", date, to_date=datetime(2019, 11, 20))
@@ -0,0 +1,109 @@
+# unit tests for the plotting module
+from datetime import datetime
+
+import pandas as pd
+
+from yatta import plotting as plt
+from yatta.periods import report_range
+
+
+def _frame(rows):
+    return pd.DataFrame(
+        rows, columns=["start", "bucket", "task_id", "task_name", "duration"]
+    )
+
+
+def test_preproc_week():
+    data = _frame(
+        [
+            (datetime(2020, 6, 1), 0, "1", "write", 60),
+            (datetime(2020, 6, 3), 2, "2", "read", 30),
+            (datetime(2020, 6, 3), 2, "1", "write", 10),
+        ]
+    )
+    start, end = datetime(2020, 6, 1), datetime(2020, 6, 8)
+    df = plt._preproc_data(data, "weekday", start, end)
+    assert list(df.index) == ["mon", "wed"]
+    assert list(df.columns) == ["write", "read"]
+    assert df.values.tolist() == [[60, 0], [10, 30]]
+
+
+def test_preproc_month_calendar_weeks():
+    # december 2019 starts on a sunday
+    data = _frame(
+        [
+            (datetime(2019, 12, 1), datetime(2019, 11, 25), "1", "write", 60),
+            (datetime(2019, 12, 2), datetime(2019, 12, 2), "1", "write", 10),
+            (datetime(2019, 12, 9), datetime(2019, 12, 9), "2", "read", 30),
+            (datetime(2019, 12, 31), datetime(2019, 12, 30), "2", "read", 5),
+        ]
+    )
+    start, end, bucket = report_range("month", datetime(2019, 12, 14))
+    assert (start, end, bucket) == (datetime(2019, 12, 1), datetime(2020, 1, 1), "week")
+    df = plt._preproc_data(data, bucket, start, end)
+    assert list(df.index) == [
+        "01-01 Dec 2019",
+        "02-08 Dec 2019",
+        "09-15 Dec 2019",
+        "30-31 Dec 2019",
+    ]
+    assert list(df.columns) == ["write", "read"]
+    assert df.values.tolist() == [[60, 0], [10, 0], [0, 30], [0, 5]]
+
+
+def test_preproc_year_months():
+    data = _frame(
+        [
+            (datetime(2019, 1, 3), datetime(2019, 1, 1), "1", "write", 60),
+            (datetime(2019, 3, 5), datetime(2019, 3, 1), "1", "write", 10),
+        ]
+    )
+    start, end, bucket = report_range("year", datetime(2019, 6, 1))
+    df = plt._preproc_data(data, bucket, start, end)
+    assert list(df.index) == ["Jan 2019", "Mar 2019"]
+    assert df["write"].tolist() == [60, 10]
+
+
+def test_preproc_task_order():
+    # like the reports before daily totals, tasks are ordered by their first
+    # bucket and then by name, not by the day they were first worked on
+    data = _frame(
+        [
+            (datetime(2019, 12, 3), datetime(2019, 12, 2), "1", "write", 60),
+            (datetime(2019, 12, 4), datetime(2019, 12, 2), "2", "read", 30),
+            (datetime(2019, 12, 1), datetime(2019, 11, 25), "3", "plan", 10),
+        ]
+    )
+    start, end, bucket = report_range("month", datetime(2019, 12, 14))
+    df = plt._preproc_data(data, bucket, start, end)
+    assert list(df.columns) == ["plan", "read", "write"]
+    df = plt._preproc_data(data.drop(columns="bucket"), None, start, end)
+    assert list(df.columns) == ["plan", "read", "write"]
+
+
+def test_rank_columns_breaks_ties_like_pandas():
+    import numpy as np
+
+    norm = np.random.default_rng(0).integers(0, 3, (20, 40))
+    order = plt._rank_columns(norm)
+    for row, ranks in zip(norm, order):
+        expected = pd.Series(row).sort_values(ascending=False).index
+        assert list(ranks) == list(expected)
+
+
+def test_hbar_stack_renders_one_frame(capsys):
+    data = pd.DataFrame(
+        [[3600, 1800], [0, 3600]], index=["mon", "tue"], columns=["write", "read"]
+    )
+    plt.hbar_stack(data, columns=20, color=False)
+    assert capsys.readouterr().out == (
+        "\n"
+        + "mon: ▇▇▇▇▇▇▇▇▇▇▇▇▇▇▇▇▇▇▇▇ 01:30:00\n"
+        + "tue: ▇▇▇▇▇▇▇▇▇▇▇▇▇ 01:00:00\n"
+        + "\n"
+        + "     ▇▇▇ write   \n"
+        + "     ▇▇▇ read   \n"
+    )
+    plt.hbar_stack(data, columns=20, show_legend=False, color=True)
+    out = capsys.readouterr().out
+    assert out.count(plt.fcolors[0]) == 2 and out.count(plt.fcolors[1]) == 2
@@ -0,0 +1,38 @@
+# unit tests for the profiling module
+import time
+
+from yatta import profiling
+
+
+def test_phases_are_exclusive():
+    profile = profiling.Profile()
+    profile.enter("outer")
+    time.sleep(0.02)
+    profile.enter("inner")
+    time.sleep(0.02)
+    profile.exit()
+    profile.exit()
+    assert 0.02 <= profile.phases["inner"] < profile.phases["outer"] + 0.02
+    assert profile.phases["outer"] < 0.04
+
+
+def test_phase_is_a_noop_unless_profiling():
+    assert profiling._profile is None
+    with profiling.phase("render"):
+        pass
+
+
+def test_trace_follows_environment(monkeypatch, caplog):
+    import logging
+
+    from sqlalchemy import create_engine
+
+    engine = create_engine("sqlite://")
+    profiling.instrument(engine)
+    assert engine not in profiling._instrumented
+    # e.g. set by the client of `yatta server` after the engine was created
+    monkeypatch.setenv("YATTA_TRACE", "1")
+    profiling.instrument(engine)
+    with caplog.at_level(logging.INFO, logger="yatta.profiling"):
+        engine.execute("SELECT 1")
+    assert "rows: SELECT 1" in caplog.text
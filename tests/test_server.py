@@ -0,0 +1,117 @@
+# unit tests for the command server and its client
+import os
+import subprocess
+import sys
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from click.testing import CliRunner
+
+from yatta import client as client
+from yatta.console import main
+from yatta.server import CommandServer
+
+
+@pytest.fixture
+def server(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "_results", None)
+    sockfile = str(tmp_path / "server.sock")
+    server = CommandServer(str(tmp_path / "server.pid"), sockfile)
+    # serves until the test process exits
+    threading.Thread(target=server.serve, daemon=True).start()
+    while not os.path.exists(sockfile):
+        pass
+    yield server
+
+
+def _add(db, task_name, start, duration):
+    task = db.get_tasks(task_name).first() or db.Task(name=task_name, total=0)
+    db.add_record(
+        task,
+        db.Record(
+            start=start, end=start + timedelta(seconds=duration), duration=duration
+        ),
+    )
+
+
+def test_forward_matches_in_process(server, db, capsys):
+    _add(db, "write docs", datetime.now() - timedelta(hours=1), 600)
+    for argv in (["list", "tasks"], ["plot", "-d"], ["timesheet", "-w"]):
+        expected = CliRunner().invoke(main, argv).output
+        assert client.forward(argv, server.sockfile) == 0
+        assert capsys.readouterr().out == expected
+    # the cached totals are refreshed by new records
+    _add(db, "read", datetime.now() - timedelta(minutes=30), 60)
+    assert client.forward(["plot", "-d"], server.sockfile) == 0
+    assert "read" in capsys.readouterr().out
+
+
+def test_forward_in_client_context(server, db, tmp_path, monkeypatch, capsys):
+    _add(db, "write docs", datetime(2020, 6, 1, 9), 600)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("YATTA_FORMATTING_TABLE_STYLE", "plain")
+    assert client.forward(["export", "-o", "records.csv"], server.sockfile) == 0
+    assert (tmp_path / "records.csv").read_text().startswith("task,start,end")
+    assert client.forward(["list", "tasks"], server.sockfile) == 0
+    assert "+--" not in capsys.readouterr().out
+
+
+def test_forward_errors(server, capsys):
+    assert client.forward(["list", "bogus"], server.sockfile) == 2
+    assert "No such command 'bogus'" in capsys.readouterr().err
+
+
+def test_server_socket_is_private(server, monkeypatch, capsys):
+    import socket
+    import stat
+
+    from yatta import server as server_module
+
+    assert stat.S_IMODE(os.stat(server.sockfile).st_mode) == 0o600
+    # a client that never sends its request is dropped after the timeout
+    monkeypatch.setattr(server_module, "REQUEST_TIMEOUT", 0.1)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as silent:
+        silent.connect(server.sockfile)
+        assert client.forward(["list", "tasks"], server.sockfile) == 0
+
+
+def test_forward_traces_sql(server, monkeypatch, capsys):
+    monkeypatch.setenv("YATTA_TRACE", "1")
+    assert client.forward(["list", "tasks"], server.sockfile) == 0
+    assert "rows: SELECT" in capsys.readouterr().err
+
+
+def test_foreground_server_pidfile(monkeypatch):
+    from yatta import server as server_module
+
+    pids = []
+
+    def serve(self):
+        with open(self.pidfile) as f:
+            pids.append(int(f.read()))
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(CommandServer, "serve", serve)
+    # run() would exit the test process on SIGTERM
+    monkeypatch.setattr(server_module.signal, "signal", lambda *args: None)
+    result = CliRunner().invoke(main, ["server", "--foreground"])
+    assert result.exit_code == 0
+    assert pids == [os.getpid()]
+    assert not os.path.exists(server_module.PID_FILE)
+
+
+def test_forward_falls_back(tmp_path):
+    # commands that prompt or edit always run in process
+    assert client.forward(["delete", "task"], client.SOCKET_FILE) is None
+    assert client.forward([], client.SOCKET_FILE) is None
+    assert client.forward(["list", "tasks"], str(tmp_path / "none.sock")) is None
+
+
+def test_client_is_lightweight():
+    code = "import sys, yatta.client; print(' '.join(sys.modules))"
+    modules = subprocess.run(
+        [sys.executable, "-c", code], stdout=subprocess.PIPE, universal_newlines=True
+    ).stdout.split()
+    assert "click" not in modules
+    assert "yatta.console" not in modules
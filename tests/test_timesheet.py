@@ -0,0 +1,24 @@
+# unit tests for the timesheet command
+from datetime import datetime, timedelta
+
+from click.testing import CliRunner
+
+from yatta.commands.timesheet import timesheet
+from yatta.plotting import days
+
+
+def test_day_is_labelled_by_weekday(db):
+    task = db.get_tasks("write").first() or db.Task(name="write", total=0)
+    start = datetime.now().replace(hour=0, minute=1)
+    db.add_record(
+        task, db.Record(start=start, end=start + timedelta(minutes=1), duration=60)
+    )
+    output = CliRunner().invoke(timesheet, ["-d"]).output
+    row = output.splitlines()[-2]
+    assert row.split("|")[1].strip() == days[start.weekday()]
+
+
+def test_to_needs_from(db):
+    result = CliRunner().invoke(timesheet, ["--to", "2020-06-01"])
+    assert result.exit_code == 2
+    assert "--to needs --from" in result.output
@@ -0,0 +1,48 @@
+# unit tests for the import and export commands
+import io
+
+import click
+import pytest
+
+from yatta.commands import transfer as transfer
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("2020-06-01 09:00:00.000000", "2020-06-01 09:00:00.000000"),
+        ("2020-06-01T09:00:00.5", "2020-06-01 09:00:00.500000"),
+        ("2020-06-01 09:00:00", "2020-06-01 09:00:00.000000"),
+        ("2020-06-01T09:00", "2020-06-01 09:00:00.000000"),
+        ("2020-06-01", "2020-06-01 00:00:00.000000"),
+    ],
+)
+def test_canonical(value, expected):
+    assert transfer._canonical(value) == expected
+
+
+def test_parse_rows():
+    rows = [{"task": "write", "start": "2020-06-01T09:00", "end": "2020-06-01T09:01"}]
+    assert list(transfer._parse_rows(rows, transfer._jsonl_fields)) == [
+        ("write", "2020-06-01 09:00:00.000000", "2020-06-01 09:01:00.000000", 60)
+    ]
+    rows = [{"task": "write", "start": "yesterday", "end": "2020-06-01"}]
+    with pytest.raises(click.ClickException, match="line 1"):
+        list(transfer._parse_rows(rows, transfer._jsonl_fields))
+
+
+def test_read_csv_rows():
+    stream = io.StringIO(
+        "end,task,start\n2020-06-01 09:01,write,2020-06-01 09:00\n2020-06-02\n"
+    )
+    rows = transfer._parse_rows(*transfer._read_rows(stream, "csv"))
+    assert next(rows) == (
+        "write",
+        "2020-06-01 09:00:00.000000",
+        "2020-06-01 09:01:00.000000",
+        60,
+    )
+    with pytest.raises(click.ClickException, match="line 2"):
+        next(rows)
+    with pytest.raises(click.ClickException, match="start"):
+        transfer._read_rows(io.StringIO("task,end\n"), "csv")
@@ -1,4 +1,7 @@
 # unit tests for the utils module
+import os
+from datetime import datetime, timedelta
+
 import pyfiglet
 
 from yatta import utils as utils
@@ -25,3 +28,19 @@ def test_time_figlet_print():
     font = pyfiglet.Figlet("doom")
     time_str = font.renderText("00:03:22")
     assert time_str == utils.time_figlet_print(font, count)
+
+
+def test_write_tmp_info():
+    start = datetime(2020, 6, 1, 9, 0, 0)
+    utils._write_tmp_info({"write docs": start, "meeting": start + timedelta(hours=1)})
+    assert not [f for f in os.listdir(utils.CACHE_DIR) if f.endswith(".tmp")]
+    with open(utils.TMP_FILE) as f:
+        lines = f.read().split("\n")
+    assert lines[:3] == [
+        "2020-06-01 09:00:00.000000",
+        str(int(start.timestamp())),
+        "write docs",
+    ]
+    assert lines[5] == "meeting"
+    utils._write_tmp_info({})
+    assert not os.path.exists(utils.TMP_FILE)